@@ -1,6 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from openai import OpenAI
-import os
+from starlette.concurrency import run_in_threadpool
 import re
 from datamodel import (
     AnalyzeEncounterRequest,
@@ -9,21 +8,10 @@ from datamodel import (
     PotentialIssue,
     RecommendedTest
 )
+from llm_client import llm, LLMUnavailableError
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
-# Configure Groq API (OpenAI-compatible)
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY environment variable not set")
-
-# Create Groq client using OpenAI-compatible interface
-client = OpenAI(
-    api_key=GROQ_API_KEY,
-    base_url="https://api.groq.com/openai/v1",
-)
-print("Groq API configured successfully!")
-
 
 def create_prompt(request: AnalyzeEncounterRequest) -> str:
     """Create prompt with patient data"""
@@ -159,8 +147,10 @@ async def analyze_encounter(request: AnalyzeEncounterRequest) -> AnalyzeEncounte
     prompt = create_prompt(request)
     
     try:
-        # Call Groq API (OpenAI-compatible)
-        response = client.chat.completions.create(
+        # Call Groq API (OpenAI-compatible) off the event loop, through the
+        # circuit breaker; hedged to LLM_HEDGE_MODEL when one is configured
+        response = await run_in_threadpool(
+            llm.create_hedged,
             model="openai/gpt-oss-20b",
             messages=[
                 {"role": "system", "content": "You are a medical diagnostic assistant."},
@@ -181,6 +171,20 @@ async def analyze_encounter(request: AnalyzeEncounterRequest) -> AnalyzeEncounte
             potentialIssues=issues,
             recommendedTests=tests
         )
+    except LLMUnavailableError as e:
+        # Degraded: fail fast instead of holding a worker while Groq is down
+        print(f"Groq API unavailable: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI analysis is temporarily unavailable: {e}",
+            headers={"Retry-After": str(int(e.retry_after_s) or 1)},
+        )
     except Exception as e:
         print(f"Error calling Groq API: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/llm-status")
+async def llm_status():
+    """Report LLM client configuration and circuit breaker state."""
+    return {"success": True, "llm": llm.status()}
@@ -1,6 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from openai import OpenAI
-import os
+from starlette.concurrency import run_in_threadpool
 import json
 import re
 import base64
@@ -10,22 +9,11 @@ from datamodel import (
     SpecialistAnalysis,
     SpecialistFinding,
 )
+from llm_client import llm, LLMUnavailableError
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
-# Configure Groq API for vision analysis
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    print("WARNING: GROQ_API_KEY not set. X-ray analysis will not work.")
-else:
-    print("Groq Vision API configured successfully!")
-
-# Create Groq client (OpenAI-compatible)
-client = OpenAI(
-    api_key=GROQ_API_KEY,
-    base_url="https://api.groq.com/openai/v1",
-) if GROQ_API_KEY else None
-
+# Groq vision analysis goes through the shared, circuit-broken LLM client
 # Enhanced specialist prompts with clear role definitions
 SPECIALIST_PROMPTS = {
     "Cardiologist": """You are Dr. Heart, an expert Cardiologist with 20 years of experience reading chest X-rays for cardiac conditions.
@@ -178,7 +166,7 @@ async def analyze_xray(request: XrayAnalysisRequest) -> XrayAnalysisResponse:
     Uses Groq's vision model (Llama 4 Scout) for accurate medical image analysis.
     """
     
-    if not client:
+    if not llm.available:
         raise HTTPException(
             status_code=500,
             detail="GROQ_API_KEY not configured. Cannot perform image analysis."
@@ -209,7 +197,8 @@ async def analyze_xray(request: XrayAnalysisRequest) -> XrayAnalysisResponse:
             )
             
             try:
-                response = client.chat.completions.create(
+                response = await run_in_threadpool(
+                    llm.create,
                     model="meta-llama/llama-4-scout-17b-16e-instruct",
                     messages=[
                         {
@@ -242,6 +231,9 @@ async def analyze_xray(request: XrayAnalysisRequest) -> XrayAnalysisResponse:
                     for f in analysis.findings:
                         print(f"  - {f.title} ({f.severity})")
                 
+            except LLMUnavailableError:
+                # Breaker open / saturated: fail the whole request fast
+                raise
             except Exception as e:
                 print(f"Error getting {specialist} analysis: {e}")
                 analyses.append(SpecialistAnalysis(
@@ -286,6 +278,13 @@ async def analyze_xray(request: XrayAnalysisRequest) -> XrayAnalysisResponse:
             overall_summary=overall_summary
         )
         
+    except LLMUnavailableError as e:
+        print(f"Groq Vision API unavailable: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Image analysis is temporarily unavailable: {e}",
+            headers={"Retry-After": str(int(e.retry_after_s) or 1)},
+        )
     except Exception as e:
         print(f"Error in X-ray analysis: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import create_client, Client
+from db import get_supabase, get_supabase_public
 from typing import Optional
 import jwt
 from datetime import datetime, timedelta
@@ -18,11 +18,6 @@ from config import settings
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 security = HTTPBearer()
 
-# Initialize Supabase client
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_PUBLISHABLE_KEY)
-# For admin operations (creating users in doctors table)
-supabase_admin: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SECRET_KEY)
-
 
 def create_access_token(data: dict) -> str:
     """Create JWT access token"""
@@ -59,7 +54,7 @@ async def signup(request: SignUpRequest):
     """
     try:
         # Create auth user in Supabase
-        auth_response = supabase.auth.sign_up(
+        auth_response = get_supabase_public().auth.sign_up(
             credentials={
                 "email": request.email,
                 "password": request.password
@@ -88,7 +83,7 @@ async def signup(request: SignUpRequest):
             "specialization": request.specialization
         }
         
-        doctor_response = supabase_admin.table("doctors").insert(doctor_data).execute()
+        doctor_response = get_supabase().table("doctors").insert(doctor_data).execute()
         
         # Create custom JWT token
         access_token = create_access_token({
@@ -128,7 +123,7 @@ async def signin(request: SignInRequest):
     """
     try:
         # Sign in with Supabase
-        auth_response = supabase.auth.sign_in_with_password(
+        auth_response = get_supabase_public().auth.sign_in_with_password(
             credentials={
                 "email": request.email,
                 "password": request.password
@@ -144,7 +139,7 @@ async def signin(request: SignInRequest):
         user_id = auth_response.user.id
         
         # Get doctor details from doctors table
-        doctor_response = supabase.table("doctors").select("*").eq("id", user_id).execute()
+        doctor_response = get_supabase_public().table("doctors").select("*").eq("id", user_id).execute()
         
         doctor_data = None
         if doctor_response.data and len(doctor_response.data) > 0:
@@ -189,7 +184,7 @@ async def signout(current_user: dict = Depends(verify_token)):
     Invalidates the Supabase session.
     """
     try:
-        supabase.auth.sign_out()
+        get_supabase_public().auth.sign_out()
         return MessageResponse(message="Successfully signed out")
     except Exception as e:
         raise HTTPException(
@@ -206,7 +201,7 @@ async def get_profile(current_user: dict = Depends(verify_token)):
     try:
         user_id = current_user.get("sub")
         
-        doctor_response = supabase.table("doctors").select("*").eq("id", user_id).execute()
+        doctor_response = get_supabase_public().table("doctors").select("*").eq("id", user_id).execute()
         
         if not doctor_response.data or len(doctor_response.data) == 0:
             raise HTTPException(
@@ -250,7 +245,7 @@ async def update_profile(
             )
         
         # Update doctor record
-        doctor_response = supabase.table("doctors").update(update_data).eq("id", user_id).execute()
+        doctor_response = get_supabase_public().table("doctors").update(update_data).eq("id", user_id).execute()
         
         if not doctor_response.data or len(doctor_response.data) == 0:
             raise HTTPException(
@@ -275,7 +270,7 @@ async def reset_password(request: PasswordResetRequest):
     Send password reset email to the user.
     """
     try:
-        supabase.auth.reset_password_email(request.email)
+        get_supabase_public().auth.reset_password_email(request.email)
         return MessageResponse(
             message="Password reset link sent to your email"
         )
@@ -13,70 +13,95 @@ Pipeline:
      storage of embeddings / entities).
   3. **Retrieval** — query ChromaDB with the source encounter (or free text)
      and return the top-K most similar past cases ranked by cosine similarity.
+     Encounter lookups (``/similar``) are dense rankings, served from the
+     precomputed neighbour lists; free-text ``/search`` is fused with a BM25
+     keyword ranking when hybrid search is on.
 
 Endpoints:
   POST /case-similarity/index/{encounter_id}      – index one encounter
-  POST /case-similarity/index-all/{doctor_id}      – batch-index all for a doctor
+  POST /case-similarity/index-all                  – background job: index everything
+  POST /case-similarity/index-all/{doctor_id}      – background job: index one doctor
+  GET  /case-similarity/jobs                       – list reindex jobs
+  GET  /case-similarity/jobs/{job_id}              – job progress / throughput
+  POST /case-similarity/jobs/{job_id}/cancel       – cancel (resumable)
+  POST /case-similarity/jobs/{job_id}/resume       – resume from checkpoint
+  POST /case-similarity/sync                       – incremental sync since watermark
+  POST /case-similarity/reconcile                  – repair drift between table and index
   GET  /case-similarity/similar/{encounter_id}     – find similar past cases
+  POST /case-similarity/similar/batch              – similar cases for many encounters
   POST /case-similarity/search                     – search by free-text query
   GET  /case-similarity/stats                      – vector DB statistics
+  POST /case-similarity/snapshots                  – export the index to a snapshot file
+  GET  /case-similarity/snapshots                  – list snapshots
+  GET  /case-similarity/snapshots/{name}           – download a snapshot
+  POST /case-similarity/snapshots/{name}/restore   – import a snapshot (bulk upsert)
 """
 
+import asyncio
+import fcntl
 import os
+import time
 import uuid
-from typing import Optional
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
 from fastapi import APIRouter, HTTPException, Query
-from supabase import create_client, Client
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from db import get_supabase
 
 from datamodel import (
     SimilarCaseResult,
     SimilarCasesResponse,
+    SimilarCasesBatchRequest,
+    SimilarCasesBatchResponse,
     EmbedEncounterResponse,
     FreeTextSearchRequest,
+    ReindexJob,
+    ReindexJobListResponse,
+    IndexSyncResponse,
+    IndexReconcileResponse,
+    VectorSnapshot,
+    VectorSnapshotImportResponse,
 )
-from vector_service import VectorService
+from case_text import CASE_TEXT_COLUMNS, CASE_TEXT_VERSION, build_case_text, case_document
+from reconciler import RECONCILE_BUCKETS, reconcile
+from reindex_jobs import ReindexJobError, ReindexJobManager
+from vector_service import SYNC_STATE_PATH, VectorService
+from vector_snapshot import SNAPSHOT_DIR, SnapshotError, default_name, read_manifest, snapshot_path
 
 router = APIRouter(prefix="/case-similarity", tags=["Case Similarity"])
 
-# Supabase client  (still used to read encounters / doctors — NOT for vectors)
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_SECRET_KEY"),
-)
+# Encounters fetched / encoded / upserted per backfill chunk
+BACKFILL_PAGE_SIZE = int(os.getenv("BACKFILL_PAGE_SIZE", "500"))
+
+# Upper bound on encounter ids per batch similar-case lookup
+SIMILAR_BATCH_MAX_IDS = int(os.getenv("SIMILAR_BATCH_MAX_IDS", "100"))
+
+# Background reindex jobs (checkpointed next to the ChromaDB data)
+reindex_jobs = ReindexJobManager()
+
+# Held by the worker running an incremental sync (see sync_new_encounters)
+SYNC_LOCK_PATH = f"{SYNC_STATE_PATH}.lock"
 
 # Lazy-initialised vector service (model loads on first use)
 _vs: Optional[VectorService] = None
 
 
-def _get_vs() -> VectorService:
+async def _get_vs() -> VectorService:
     global _vs
     if _vs is None:
-        _vs = VectorService.get_instance()
+        _vs = await VectorService.aget_instance()
     return _vs
 
 
 # ---------------------------------------------------------------------------
-# Text helpers
+# Data helpers
 # ---------------------------------------------------------------------------
 
-def build_case_text(encounter: dict) -> str:
-    """Build a single text string from encounter fields."""
-    fields = [
-        ("Chief Complaint", encounter.get("chief_complaint")),
-        ("Diagnosis", encounter.get("diagnosis")),
-        ("History", encounter.get("history_of_illness")),
-        ("Physical Exam", encounter.get("physical_exam")),
-        ("Medications", encounter.get("medications")),
-        ("Allergies", encounter.get("allergies")),
-    ]
-    parts = [f"{label}: {value}" for label, value in fields if value]
-    return " | ".join(parts) if parts else ""
-
-
 def _fetch_encounter(encounter_id: str) -> dict:
     resp = (
-        supabase.table("encounters")
+        get_supabase().table("encounters")
         .select("*")
         .eq("id", encounter_id)
         .maybe_single()
@@ -87,11 +112,45 @@ def _fetch_encounter(encounter_id: str) -> dict:
     return resp.data
 
 
+def _fetch_encounters(encounter_ids: List[str]) -> List[dict]:
+    """Case-text columns of many encounters in one query (unknown ids are absent)."""
+    resp = (
+        get_supabase().table("encounters")
+        .select(CASE_TEXT_COLUMNS)
+        .in_("id", encounter_ids)
+        .execute()
+    )
+    return resp.data or []
+
+
+def _doctor_names(doctor_ids: List[str]) -> Dict[str, str]:
+    ids = sorted({d for d in doctor_ids if d})
+    if not ids:
+        return {}
+    resp = get_supabase().table("doctors").select("id, name").in_("id", ids).execute()
+    return {row["id"]: row.get("name") or "Unknown" for row in resp.data or []}
+
+
+def _similar_case(r: Dict[str, Any], doctor_name: str) -> SimilarCaseResult:
+    return SimilarCaseResult(
+        encounter_id=r["encounter_id"],
+        doctor_id=r.get("doctor_id", ""),
+        doctor_name=doctor_name,
+        patient_id=r.get("patient_id", ""),
+        diagnosis=r.get("diagnosis", ""),
+        chief_complaint=r.get("chief_complaint", ""),
+        treatments=r.get("treatments", ""),
+        case_summary=r.get("case_summary", ""),
+        similarity_score=r["similarity_score"],
+        similarity_method=r["similarity_method"],
+    )
+
+
 def _doctor_name(doctor_id: str) -> str:
     if not doctor_id:
         return "Unknown"
     doc_resp = (
-        supabase.table("doctors")
+        get_supabase().table("doctors")
         .select("name")
         .eq("id", doctor_id)
         .maybe_single()
@@ -100,6 +159,82 @@ def _doctor_name(doctor_id: str) -> str:
     return doc_resp.data.get("name", "Unknown") if doc_resp.data else "Unknown"
 
 
+def _index_batch(encounters: List[dict]) -> List[Dict[str, Any]]:
+    """Turn encounter rows into ``index_encounters_batch`` input (skipping empty ones)."""
+    return [doc for doc in map(case_document, encounters) if doc]
+
+
+def _fetch_page(after_id: Optional[str], doctor_id: Optional[str], page_size: int) -> List[dict]:
+    """One keyset page of encounters ordered by id, strictly after *after_id*."""
+    query = get_supabase().table("encounters").select(CASE_TEXT_COLUMNS)
+    if doctor_id:
+        query = query.eq("doctor_id", doctor_id)
+    if after_id:
+        query = query.gt("id", after_id)
+    return query.order("id").limit(page_size).execute().data or []
+
+
+def _fetch_new_page(watermark: Optional[Dict[str, str]], page_size: int) -> List[dict]:
+    """One page of encounters created after *watermark*, ordered by (created_at, id)."""
+    query = get_supabase().table("encounters").select(f"{CASE_TEXT_COLUMNS}, created_at")
+    if watermark:
+        ts, eid = watermark["created_at"], watermark["encounter_id"]
+        query = query.or_(f'created_at.gt."{ts}",and(created_at.eq."{ts}",id.gt.{eid})')
+    return query.order("created_at").order("id").limit(page_size).execute().data or []
+
+
+async def _backfill_pages(
+    after_id: Optional[str],
+    page_size: int,
+    doctor_id: Optional[str] = None,
+    force: bool = False,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream encounters after *after_id* into the index one keyset page at a
+    time, yielding ``{"cursor", "scanned", "indexed"}`` per page.
+
+    Each page is encoded and upserted before it is yielded, while the next
+    page is already being fetched, so at most two pages are held in memory
+    no matter how large the table is.  Unless *force* is set, encounters
+    whose stored fingerprint still matches are skipped without encoding.
+    """
+    vs = await _get_vs()
+    next_page = asyncio.ensure_future(run_in_threadpool(_fetch_page, after_id, doctor_id, page_size))
+    try:
+        while next_page is not None:
+            page = await next_page
+            if not page:
+                return
+            next_page = None
+            if len(page) == page_size:
+                next_page = asyncio.ensure_future(
+                    run_in_threadpool(_fetch_page, page[-1]["id"], doctor_id, page_size)
+                )
+
+            batch = _index_batch(page)
+            if force:
+                indexed = await vs.aindex_encounters_batch(batch)
+            else:
+                indexed, _ = await vs.aindex_encounters_changed(batch)
+            yield {"cursor": page[-1]["id"], "scanned": len(page), "indexed": indexed}
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+
+async def _start_reindex(doctor_id: Optional[str], rate_limit: Optional[float], force: bool) -> dict:
+    try:
+        return await reindex_jobs.start(
+            lambda after_id, page_size: _backfill_pages(after_id, page_size, doctor_id, force),
+            doctor_id=doctor_id,
+            rate_limit=rate_limit,
+            page_size=BACKFILL_PAGE_SIZE,
+            force=force,
+        )
+    except ReindexJobError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
@@ -117,21 +252,12 @@ async def index_encounter(encounter_id: str):
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid encounter ID format")
 
-    encounter = _fetch_encounter(encounter_id)
-    case_text = build_case_text(encounter)
-    if not case_text:
+    document = case_document(_fetch_encounter(encounter_id))
+    if not document:
         raise HTTPException(status_code=400, detail="Encounter has no text fields to index")
 
-    vs = _get_vs()
-    dim = vs.index_encounter(
-        encounter_id=encounter_id,
-        case_text=case_text,
-        doctor_id=encounter.get("doctor_id", ""),
-        patient_id=encounter.get("patient_id", ""),
-        diagnosis=encounter.get("diagnosis", ""),
-        chief_complaint=encounter.get("chief_complaint", ""),
-        treatments=encounter.get("medications", ""),
-    )
+    vs = await _get_vs()
+    dim = await vs.aindex_encounter(**document)
 
     return EmbedEncounterResponse(
         success=True,
@@ -141,43 +267,19 @@ async def index_encounter(encounter_id: str):
     )
 
 
-@router.post("/index-all/{doctor_id}", response_model=dict)
-async def index_all_encounters(doctor_id: str):
-    """Batch-index ALL encounters for a given doctor using BERT."""
+@router.post("/index-all/{doctor_id}", response_model=ReindexJob, status_code=202)
+async def index_all_encounters(
+    doctor_id: str,
+    rate_limit: Optional[float] = Query(None, ge=0, description="Encounters per second (0 = unlimited)"),
+    force: bool = Query(False, description="Re-embed even if the fingerprint is unchanged"),
+):
+    """Start a background job indexing ALL encounters for a given doctor."""
     try:
         uuid.UUID(doctor_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid doctor ID format")
 
-    resp = supabase.table("encounters").select("*").eq("doctor_id", doctor_id).execute()
-    encounters = resp.data or []
-    if not encounters:
-        return {"success": True, "indexed": 0, "message": "No encounters found for this doctor"}
-
-    vs = _get_vs()
-    batch = []
-    for enc in encounters:
-        text = build_case_text(enc)
-        if not text:
-            continue
-        batch.append({
-            "encounter_id": enc["id"],
-            "case_text": text,
-            "doctor_id": enc.get("doctor_id", ""),
-            "patient_id": enc.get("patient_id", ""),
-            "diagnosis": enc.get("diagnosis", ""),
-            "chief_complaint": enc.get("chief_complaint", ""),
-            "treatments": enc.get("medications", ""),
-        })
-
-    count = vs.index_encounters_batch(batch)
-
-    return {
-        "success": True,
-        "indexed": count,
-        "embedding_dim": vs.stats["embedding_dim"],
-        "message": f"Indexed {count} encounters for doctor {doctor_id} (BERT + ChromaDB)",
-    }
+    return await _start_reindex(doctor_id, rate_limit, force)
 
 
 @router.get("/similar/{encounter_id}", response_model=SimilarCasesResponse)
@@ -189,8 +291,11 @@ async def get_similar_cases(
     """
     Find the top-K most similar past cases using BERT cosine similarity.
 
-    Pipeline:
-      1. Encode the query encounter text with BERT
+    A dense ranking, with or without hybrid search (a whole case text as a
+    BM25 query mostly matches boilerplate; fusion is for ``/search``).
+    Served from the encounter's precomputed neighbour list when it has one
+    (not for ``same_doctor_only``); otherwise a live search:
+      1. Reuse the encounter's stored vector (or encode its text with BERT)
       2. Query ChromaDB for nearest neighbours (cosine)
       3. Return ranked results
     """
@@ -204,39 +309,104 @@ async def get_similar_cases(
     if not case_text:
         raise HTTPException(status_code=400, detail="Encounter has no text fields to compare")
 
-    vs = _get_vs()
+    vs = await _get_vs()
 
     doctor_id_filter = encounter.get("doctor_id") if same_doctor_only else None
 
-    results = vs.query_similar(
-        text=case_text,
-        top_k=top_k,
-        exclude_id=encounter_id,
-        doctor_id=doctor_id_filter,
-    )
-
-    similar = [
-        SimilarCaseResult(
-            encounter_id=r["encounter_id"],
-            doctor_id=r.get("doctor_id", ""),
-            doctor_name=_doctor_name(r.get("doctor_id", "")),
-            patient_id=r.get("patient_id", ""),
-            diagnosis=r.get("diagnosis", ""),
-            chief_complaint=r.get("chief_complaint", ""),
-            treatments=r.get("treatments", ""),
-            case_summary=r.get("case_summary", ""),
-            similarity_score=r["similarity_score"],
-            similarity_method="bert-cosine",
+    # Precomputed neighbour list first; live (dense) search when there is none
+    results = None
+    method = "BERT + ChromaDB (precomputed)"
+    if not same_doctor_only:
+        results = await vs.aprecomputed_similar(
+            encounter_id, case_text, top_k=top_k, text_version=CASE_TEXT_VERSION
+        )
+    if results is None:
+        method = "BERT + ChromaDB"
+        results = await vs.aquery_similar(
+            text=case_text,
+            top_k=top_k,
+            exclude_id=encounter_id,
+            doctor_id=doctor_id_filter,
+            source_id=encounter_id,
+            hybrid=False,
         )
-        for r in results
-    ]
+
+    similar = [_similar_case(r, _doctor_name(r.get("doctor_id", ""))) for r in results]
 
     return SimilarCasesResponse(
         encounter_id=encounter_id,
         query_summary=case_text,
         similar_cases=similar,
-        total_cases_searched=vs.total_indexed,
-        similarity_method="BERT + ChromaDB",
+        total_cases_searched=await vs.atotal_indexed(),
+        similarity_method=method,
+    )
+
+
+@router.post("/similar/batch", response_model=SimilarCasesBatchResponse)
+async def get_similar_cases_batch(request: SimilarCasesBatchRequest):
+    """
+    Similar past cases for many encounters in one call (case review, audits).
+
+    Fetches every encounter in one Supabase query, reuses stored vectors
+    (encoding only the rest, as one batch) and runs the nearest-neighbour
+    searches as one batched vector query.  Dense rankings, as
+    ``/similar/{encounter_id}``.  Results are keyed by encounter ID.
+    """
+    encounter_ids = list(dict.fromkeys(request.encounter_ids))
+    if not encounter_ids:
+        raise HTTPException(status_code=400, detail="encounter_ids is required")
+    if len(encounter_ids) > SIMILAR_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {SIMILAR_BATCH_MAX_IDS} encounter ids per request",
+        )
+    if not 1 <= request.top_k <= 20:
+        raise HTTPException(status_code=400, detail="top_k must be between 1 and 20")
+    for encounter_id in encounter_ids:
+        try:
+            uuid.UUID(encounter_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid encounter ID format: {encounter_id}")
+
+    rows = {row["id"]: row for row in await run_in_threadpool(_fetch_encounters, encounter_ids)}
+    queries = []
+    for encounter_id in encounter_ids:
+        row = rows.get(encounter_id)
+        case_text = build_case_text(row) if row else ""
+        if case_text:
+            queries.append({
+                "encounter_id": encounter_id,
+                "case_text": case_text,
+                "doctor_id": row.get("doctor_id") or "",
+            })
+
+    vs = await _get_vs()
+    results = await vs.aquery_similar_batch(
+        queries, top_k=request.top_k, same_doctor_only=request.same_doctor_only, hybrid=False
+    )
+    names = await run_in_threadpool(
+        _doctor_names, [r.get("doctor_id", "") for hits in results.values() for r in hits]
+    )
+
+    method = "BERT + ChromaDB"
+    total = await vs.atotal_indexed()
+    return SimilarCasesBatchResponse(
+        results={
+            q["encounter_id"]: SimilarCasesResponse(
+                encounter_id=q["encounter_id"],
+                query_summary=q["case_text"],
+                similar_cases=[
+                    _similar_case(r, names.get(r.get("doctor_id", ""), "Unknown"))
+                    for r in results[q["encounter_id"]]
+                ],
+                total_cases_searched=total,
+                similarity_method=method,
+            )
+            for q in queries
+        },
+        not_found=[eid for eid in encounter_ids if eid not in results],
+        total_cases_searched=total,
+        similarity_method=method,
     )
 
 
@@ -245,91 +415,278 @@ async def search_by_text(request: FreeTextSearchRequest):
     """
     Search for similar cases using free-text input (symptoms, diagnosis, etc.).
 
-    Encodes the query with BERT and searches ChromaDB for the nearest cases.
+    Encodes the query with BERT and searches ChromaDB for the nearest cases,
+    fused with a BM25 keyword ranking so exact drug / diagnosis terms match.
     """
     if not request.query.strip():
         raise HTTPException(status_code=400, detail="Query text is required")
 
-    vs = _get_vs()
+    vs = await _get_vs()
 
-    results = vs.query_similar(
+    results = await vs.aquery_similar(
         text=request.query,
         top_k=request.top_k,
     )
 
-    similar = [
-        SimilarCaseResult(
-            encounter_id=r["encounter_id"],
-            doctor_id=r.get("doctor_id", ""),
-            doctor_name=_doctor_name(r.get("doctor_id", "")),
-            patient_id=r.get("patient_id", ""),
-            diagnosis=r.get("diagnosis", ""),
-            chief_complaint=r.get("chief_complaint", ""),
-            treatments=r.get("treatments", ""),
-            case_summary=r.get("case_summary", ""),
-            similarity_score=r["similarity_score"],
-            similarity_method="bert-cosine",
-        )
-        for r in results
-    ]
+    similar = [_similar_case(r, _doctor_name(r.get("doctor_id", ""))) for r in results]
 
     return SimilarCasesResponse(
         encounter_id="",
         query_summary=request.query,
         similar_cases=similar,
-        total_cases_searched=vs.total_indexed,
-        similarity_method="BERT + ChromaDB",
+        total_cases_searched=await vs.atotal_indexed(),
+        similarity_method="BERT + BM25 (RRF)" if vs.hybrid else "BERT + ChromaDB",
+    )
+
+
+@router.post("/index-all", response_model=ReindexJob, status_code=202)
+async def index_all_encounters_global(
+    rate_limit: Optional[float] = Query(None, ge=0, description="Encounters per second (0 = unlimited)"),
+    force: bool = Query(False, description="Re-embed even if the fingerprint is unchanged"),
+):
+    """
+    Start a background job bulk-indexing ALL encounters from ALL doctors
+    into ChromaDB.  Run this once to backfill existing encounters.
+
+    Pages through ``encounters`` by id (keyset pagination) in chunks of
+    ``BACKFILL_PAGE_SIZE``, checkpointing the cursor after every page.
+    Encounters whose content fingerprint is unchanged are not re-embedded
+    unless ``force`` is set.  Poll ``GET /case-similarity/jobs/{job_id}``
+    for progress.
+    """
+    return await _start_reindex(None, rate_limit, force)
+
+
+@contextmanager
+def _sync_lock() -> Iterator[bool]:
+    """
+    Try to take the sync lock without waiting; yields whether it was taken.
+
+    A ``flock`` on its own open file, so it excludes a second sync in this
+    worker as well as in every other worker.
+    """
+    os.makedirs(os.path.dirname(SYNC_LOCK_PATH) or ".", exist_ok=True)
+    with open(SYNC_LOCK_PATH, "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+@router.post("/sync", response_model=IndexSyncResponse)
+async def sync_new_encounters():
+    """
+    Incremental sync: index only encounters created after the stored
+    watermark, re-embedding only those whose fingerprint changed.
+
+    The watermark advances after every page, so an interrupted sync picks
+    up where it stopped.  The first sync (no watermark yet) walks the whole
+    table once, skipping anything a backfill already embedded.  One sync
+    runs at a time across all workers: another request gets a 409 while it
+    does, rather than walking the same pages and racing on the watermark.
+    """
+    vs = await _get_vs()
+    started = time.perf_counter()
+    scanned = indexed = skipped = 0
+
+    with _sync_lock() as acquired:
+        if not acquired:
+            raise HTTPException(status_code=409, detail="A sync is already in progress")
+        while True:
+            watermark = await vs.aget_sync_watermark()
+            page = await run_in_threadpool(_fetch_new_page, watermark, BACKFILL_PAGE_SIZE)
+            if not page:
+                break
+            batch = _index_batch(page)
+            page_indexed, page_skipped = await vs.aindex_encounters_changed(batch)
+            scanned += len(page)
+            indexed += page_indexed
+            skipped += page_skipped
+            await vs.aset_sync_watermark(page[-1]["created_at"], page[-1]["id"])
+            if len(page) < BACKFILL_PAGE_SIZE:
+                break
+
+    return IndexSyncResponse(
+        success=True,
+        scanned=scanned,
+        indexed=indexed,
+        skipped=skipped,
+        watermark=await vs.aget_sync_watermark(),
+        elapsed_s=round(time.perf_counter() - started, 3),
     )
 
 
-@router.post("/index-all", response_model=dict)
-async def index_all_encounters_global():
+@router.post("/reconcile", response_model=IndexReconcileResponse)
+async def reconcile_index(
+    dry_run: bool = Query(False, description="Report the drift without repairing it"),
+    buckets: int = Query(RECONCILE_BUCKETS, ge=1, le=65536, description="Hashed id buckets"),
+):
     """
-    Bulk-index ALL encounters from ALL doctors into ChromaDB.
-    Run this once to backfill existing encounters.
+    Compare the ``encounters`` table with the index and repair only what
+    differs: index encounters that are missing (e.g. a failed auto-index on
+    save) or stale, delete documents of encounters that no longer exist.
+
+    Ids are hashed into ``buckets`` buckets and a digest of each bucket's
+    ``(id, fingerprint)`` pairs is compared on both sides; matching buckets
+    are skipped without a per-id diff (see ``reconciler.py``).
     """
-    resp = supabase.table("encounters").select("*").execute()
-    encounters = resp.data or []
-    if not encounters:
-        return {"success": True, "indexed": 0, "message": "No encounters found"}
-
-    vs = _get_vs()
-    batch = []
-    for enc in encounters:
-        text = build_case_text(enc)
-        if not text:
-            continue
-        batch.append({
-            "encounter_id": enc["id"],
-            "case_text": text,
-            "doctor_id": enc.get("doctor_id", ""),
-            "patient_id": enc.get("patient_id", ""),
-            "diagnosis": enc.get("diagnosis", ""),
-            "chief_complaint": enc.get("chief_complaint", ""),
-            "treatments": enc.get("medications", ""),
-        })
-
-    count = vs.index_encounters_batch(batch)
+    vs = await _get_vs()
+    result = await run_in_threadpool(
+        reconcile,
+        vs,
+        lambda after_id, page_size: _fetch_page(after_id, None, page_size),
+        _fetch_encounters,
+        buckets=buckets,
+        page_size=BACKFILL_PAGE_SIZE,
+        dry_run=dry_run,
+    )
+    return IndexReconcileResponse(success=True, **result)
 
-    return {
-        "success": True,
-        "indexed": count,
-        "total_in_db": len(encounters),
-        "embedding_dim": vs.stats["embedding_dim"],
-        "message": f"Backfilled {count} encounters from all doctors into ChromaDB",
-    }
+
+@router.get("/jobs", response_model=ReindexJobListResponse)
+async def list_reindex_jobs():
+    """List background reindex jobs, newest first."""
+    jobs = await run_in_threadpool(reindex_jobs.list)
+    return ReindexJobListResponse(jobs=jobs, total=len(jobs))
+
+
+@router.get("/jobs/{job_id}", response_model=ReindexJob)
+async def get_reindex_job(job_id: str):
+    """Progress and throughput of one reindex job."""
+    try:
+        return await run_in_threadpool(reindex_jobs.get, job_id)
+    except ReindexJobError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=ReindexJob)
+async def cancel_reindex_job(job_id: str):
+    """Stop a reindex job after its current page; it can be resumed later."""
+    try:
+        return await run_in_threadpool(reindex_jobs.cancel, job_id)
+    except ReindexJobError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/jobs/{job_id}/resume", response_model=ReindexJob)
+async def resume_reindex_job(job_id: str):
+    """Continue a cancelled, failed or interrupted job from its checkpoint."""
+    try:
+        job = await run_in_threadpool(reindex_jobs.get, job_id)
+        return await reindex_jobs.resume(
+            job_id,
+            lambda after_id, page_size: _backfill_pages(
+                after_id, page_size, job["doctor_id"], job.get("force", False)
+            ),
+        )
+    except ReindexJobError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 
 @router.get("/stats")
 async def get_stats():
     """Return statistics about the BERT vector service and ChromaDB."""
-    vs = _get_vs()
+    vs = await _get_vs()
     return {
         "success": True,
-        "vector_service": vs.stats,
+        "vector_service": await vs.astats(),
+        "case_text_version": CASE_TEXT_VERSION,
         "description": (
             "Case similarity uses sentence-transformers (BERT) to encode "
             "clinical text into dense vectors and ChromaDB for fast "
             "cosine-similarity retrieval."
         ),
     }
+
+
+# ---------------------------------------------------------------------------
+# Snapshots (node bootstrap / restore without re-encoding)
+# ---------------------------------------------------------------------------
+
+def _snapshot_info(path: str, manifest: Dict[str, Any]) -> VectorSnapshot:
+    return VectorSnapshot(
+        name=os.path.basename(path),
+        size_bytes=os.path.getsize(path),
+        **{k: manifest.get(k) for k in VectorSnapshot.model_fields if k not in ("name", "size_bytes")},
+    )
+
+
+@router.post("/snapshots", response_model=VectorSnapshot, status_code=201)
+async def create_snapshot(name: Optional[str] = Query(None, description="File name (default: timestamped)")):
+    """
+    Export every indexed encounter (ids, vectors, texts, metadata, model
+    name, case-text version) to one compressed file in ``SNAPSHOT_DIR``.
+    """
+    try:
+        path = snapshot_path(name or default_name())
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    vs = await _get_vs()
+    manifest = await run_in_threadpool(vs.export_snapshot, path, CASE_TEXT_VERSION)
+    return _snapshot_info(path, manifest)
+
+
+@router.get("/snapshots", response_model=List[VectorSnapshot])
+async def list_snapshots():
+    """Snapshots in ``SNAPSHOT_DIR``, newest first."""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    snapshots = []
+    for entry in sorted(os.listdir(SNAPSHOT_DIR), reverse=True):
+        if not entry.endswith(".zip"):
+            continue
+        path = os.path.join(SNAPSHOT_DIR, entry)
+        try:
+            snapshots.append(_snapshot_info(path, read_manifest(path)))
+        except SnapshotError as e:
+            print(f"Warning: skipping snapshot {entry}: {e}")
+    return snapshots
+
+
+@router.get("/snapshots/{name}")
+async def download_snapshot(name: str):
+    """Download a snapshot, e.g. to import it on a new node."""
+    try:
+        path = snapshot_path(name)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return FileResponse(path, media_type="application/zip", filename=os.path.basename(path))
+
+
+@router.post("/snapshots/{name}/restore", response_model=VectorSnapshotImportResponse)
+async def restore_snapshot(
+    name: str,
+    replace: bool = Query(False, description="Drop the current index before importing"),
+):
+    """
+    Bulk-upsert a snapshot from ``SNAPSHOT_DIR`` into the index.  The
+    snapshot must come from the same embedding model; vectors are not
+    re-encoded.
+    """
+    try:
+        path = snapshot_path(name)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    vs = await _get_vs()
+    try:
+        result = await run_in_threadpool(
+            vs.import_snapshot, path, replace=replace, case_text_version=CASE_TEXT_VERSION
+        )
+    except SnapshotError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return VectorSnapshotImportResponse(
+        success=True,
+        snapshot=_snapshot_info(path, result),
+        imported=result["imported"],
+        elapsed_s=result["elapsed_s"],
+        text_version_matches=result["text_version_matches"],
+    )
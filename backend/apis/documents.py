@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
-from supabase import create_client, Client
+from db import get_supabase
 from pydantic import BaseModel
 from typing import Optional, List, Literal
 import os
@@ -11,12 +11,6 @@ from datetime import datetime
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_SECRET_KEY")
-)
-
 
 class DocumentUploadRequest(BaseModel):
     encounter_id: str
@@ -68,7 +62,7 @@ async def upload_file_to_storage(
 
         # Verify encounter exists
         try:
-            encounter_check = supabase.table('encounters').select('id').eq(
+            encounter_check = get_supabase().table('encounters').select('id').eq(
                 'id', encounter_id
             ).maybe_single().execute()
 
@@ -93,14 +87,14 @@ async def upload_file_to_storage(
         bucket_name = "files"
 
         try:
-            storage_response = supabase.storage.from_(bucket_name).upload(
+            storage_response = get_supabase().storage.from_(bucket_name).upload(
                 path=unique_filename,
                 file=file_content,
                 file_options={"content-type": file.content_type}
             )
 
             # Get public URL
-            public_url = supabase.storage.from_(bucket_name).get_public_url(unique_filename)
+            public_url = get_supabase().storage.from_(bucket_name).get_public_url(unique_filename)
 
         except Exception as storage_error:
             print(f"Storage upload error: {storage_error}")
@@ -114,7 +108,7 @@ async def upload_file_to_storage(
             'extracted_text': extracted_text
         }
 
-        response = supabase.table('documents').insert(document_data).execute()
+        response = get_supabase().table('documents').insert(document_data).execute()
 
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to create document record")
@@ -166,7 +160,7 @@ async def upload_document(request: DocumentUploadRequest):
 
         # Verify encounter exists
         try:
-            encounter_check = supabase.table('encounters').select('id').eq(
+            encounter_check = get_supabase().table('encounters').select('id').eq(
                 'id', request.encounter_id
             ).maybe_single().execute()
 
@@ -184,7 +178,7 @@ async def upload_document(request: DocumentUploadRequest):
             'extracted_text': request.extracted_text
         }
 
-        response = supabase.table('documents').insert(document_data).execute()
+        response = get_supabase().table('documents').insert(document_data).execute()
 
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to create document record")
@@ -231,7 +225,7 @@ async def get_documents_for_encounter(encounter_id: str):
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid encounter ID format")
 
-        response = supabase.table('documents').select(
+        response = get_supabase().table('documents').select(
             'id, encounter_id, file_url, document_type, extracted_text, created_at'
         ).eq(
             'encounter_id', encounter_id
@@ -281,7 +275,7 @@ async def delete_document(document_id: str):
 
         # Check if document exists and get file_url
         try:
-            check_response = supabase.table('documents').select('id, file_url').eq(
+            check_response = get_supabase().table('documents').select('id, file_url').eq(
                 'id', document_id
             ).maybe_single().execute()
 
@@ -305,14 +299,14 @@ async def delete_document(document_id: str):
                     file_path = file_url.split(f'/object/public/{bucket_name}/')[1]
 
                     # Delete from storage
-                    supabase.storage.from_(bucket_name).remove([file_path])
+                    get_supabase().storage.from_(bucket_name).remove([file_path])
                     print(f"Deleted file from storage: {file_path}")
             except Exception as storage_error:
                 print(f"Warning: Could not delete file from storage: {storage_error}")
                 # Continue with database deletion even if storage deletion fails
 
         # Delete the document record
-        supabase.table('documents').delete().eq('id', document_id).execute()
+        get_supabase().table('documents').delete().eq('id', document_id).execute()
 
         return {"success": True, "message": "Document deleted successfully"}
 
@@ -349,7 +343,7 @@ async def get_signed_url(document_id: str):
             raise HTTPException(status_code=400, detail="Invalid document ID format")
 
         # Fetch the document record
-        response = supabase.table('documents').select('id, file_url').eq(
+        response = get_supabase().table('documents').select('id, file_url').eq(
             'id', document_id
         ).maybe_single().execute()
 
@@ -369,7 +363,7 @@ async def get_signed_url(document_id: str):
 
         # Generate signed URL (valid for 1 hour)
         bucket_name = "files"
-        signed = supabase.storage.from_(bucket_name).create_signed_url(
+        signed = get_supabase().storage.from_(bucket_name).create_signed_url(
             file_path, 3600  # 1 hour
         )
 
@@ -399,7 +393,7 @@ async def download_document(document_id: str):
             raise HTTPException(status_code=400, detail="Invalid document ID format")
 
         # Fetch the document record
-        response = supabase.table('documents').select('id, file_url, document_type').eq(
+        response = get_supabase().table('documents').select('id, file_url, document_type').eq(
             'id', document_id
         ).maybe_single().execute()
 
@@ -419,7 +413,7 @@ async def download_document(document_id: str):
 
             bucket_name = "files"
             try:
-                file_bytes = supabase.storage.from_(bucket_name).download(file_path)
+                file_bytes = get_supabase().storage.from_(bucket_name).download(file_path)
             except Exception as storage_error:
                 print(f"Storage download error: {storage_error}")
                 raise HTTPException(
@@ -0,0 +1,91 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from db import get_supabase
+from datamodel import (
+    EducationTemplate,
+    EducationTemplateListResponse,
+    ReviewEducationTemplateRequest,
+    EducationTemplateReport,
+)
+from education_templates import TEMPLATE_TABLE, review_template, build_report
+from typing import Optional
+import uuid
+
+router = APIRouter(prefix="/education-templates", tags=["Education Templates"])
+
+
+@router.get("/report", response_model=EducationTemplateReport)
+async def get_template_report(
+    since: Optional[str] = Query(None, description="ISO timestamp; only count generations after this"),
+):
+    """
+    Report template hit rate and tokens saved versus full generation.
+    """
+    try:
+        report = await run_in_threadpool(build_report, get_supabase(), since)
+        return EducationTemplateReport(**report)
+    except Exception as e:
+        print(f"Error building education template report: {e}")
+        raise HTTPException(status_code=500, detail=f"Error building template report: {str(e)}")
+
+
+@router.get("", response_model=EducationTemplateListResponse)
+async def list_templates(
+    status: Optional[str] = Query(None, description="Filter by status: draft, approved, rejected"),
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """
+    List education templates, e.g. drafts awaiting doctor review.
+    """
+    try:
+        query = get_supabase().table(TEMPLATE_TABLE).select('*', count='exact')
+        if status:
+            query = query.eq('status', status)
+        response = query.order(
+            'created_at', desc=True
+        ).range(
+            offset, offset + limit - 1
+        ).execute()
+
+        templates = [EducationTemplate(**row) for row in (response.data or [])]
+        total = response.count if response.count else len(templates)
+        return EducationTemplateListResponse(templates=templates, total=total)
+
+    except Exception as e:
+        print(f"Error fetching education templates: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching education templates: {str(e)}")
+
+
+@router.put("/{template_id}", response_model=EducationTemplate)
+async def review_education_template(template_id: str, request: ReviewEducationTemplateRequest):
+    """
+    Review a template: edit its content and/or approve or reject it.
+    Only approved templates are used for new encounters.
+    """
+    try:
+        uuid.UUID(template_id)
+        uuid.UUID(request.reviewer_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid template or reviewer ID format")
+
+    if request.status is None and request.content is None:
+        raise HTTPException(status_code=400, detail="No update data provided")
+
+    try:
+        updated = review_template(
+            get_supabase(),
+            template_id,
+            request.reviewer_id,
+            status=request.status,
+            content=request.content,
+        )
+        if not updated:
+            raise HTTPException(status_code=404, detail="Education template not found")
+        return EducationTemplate(**updated)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error reviewing education template: {e}")
+        raise HTTPException(status_code=500, detail=f"Error reviewing education template: {str(e)}")
@@ -1,16 +1,9 @@
 from fastapi import APIRouter, HTTPException, Query
-from supabase import create_client, Client
-import os
+from db import get_supabase
 import uuid
 
 router = APIRouter(prefix="/encounters", tags=["Encounters"])
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_SECRET_KEY")
-)
-
 ENCOUNTER_FIELDS = (
     'id, patient_id, doctor_id, case_id, visit_number, chief_complaint, '
     'history_of_illness, temperature, blood_pressure, heart_rate, '
@@ -26,7 +19,7 @@ def _fetch_patients_by_ids(patient_ids: list[str]) -> dict[str, dict]:
     if not unique_ids:
         return {}
 
-    response = supabase.table('patients').select(
+    response = get_supabase().table('patients').select(
         PATIENT_FIELDS
     ).in_(
         'id', unique_ids
@@ -73,7 +66,7 @@ async def get_all_encounters(
         List of all encounters with patient information
     """
     try:
-        response = supabase.table('encounters').select(
+        response = get_supabase().table('encounters').select(
             ENCOUNTER_FIELDS
         ).order(
             'created_at', desc=True
@@ -117,7 +110,7 @@ async def get_encounters_for_doctor(
             raise HTTPException(status_code=400, detail="Invalid doctor ID format")
 
         # Step 1: Get patient IDs linked to this doctor.
-        dp_response = supabase.table('doctor_patients').select(
+        dp_response = get_supabase().table('doctor_patients').select(
             'patient_id'
         ).eq('doctor_id', doctor_id).execute()
 
@@ -129,7 +122,7 @@ async def get_encounters_for_doctor(
 
         # Backfill support for older encounter data created before doctor_patients
         # links were enforced during encounter saves.
-        own_encounter_response = supabase.table('encounters').select(
+        own_encounter_response = get_supabase().table('encounters').select(
             'patient_id'
         ).eq(
             'doctor_id', doctor_id
@@ -147,7 +140,7 @@ async def get_encounters_for_doctor(
             return []
 
         # Step 2: Fetch encounters for all those patients (from ANY doctor)
-        response = supabase.table('encounters').select(
+        response = get_supabase().table('encounters').select(
             ENCOUNTER_FIELDS
         ).in_(
             'patient_id', patient_ids
@@ -189,7 +182,7 @@ async def get_encounters_by_case(case_id: str):
             raise HTTPException(status_code=400, detail="Invalid case ID format")
 
         # Fetch all encounters for this case
-        response = supabase.table('encounters').select(
+        response = get_supabase().table('encounters').select(
             ENCOUNTER_FIELDS
         ).eq(
             'case_id', case_id
@@ -202,7 +195,7 @@ async def get_encounters_by_case(case_id: str):
 
         # Fetch patient details
         patient_id = response.data[0]['patient_id']
-        patient_response = supabase.table('patients').select(
+        patient_response = get_supabase().table('patients').select(
             'id, name, age, gender, contact_info, allergies'
         ).eq('id', patient_id).maybe_single().execute()
 
@@ -246,7 +239,7 @@ async def get_encounter_details(encounter_id: str):
             raise HTTPException(status_code=400, detail="Invalid encounter ID format")
 
         # Fetch encounter
-        response = supabase.table('encounters').select(
+        response = get_supabase().table('encounters').select(
             ENCOUNTER_FIELDS
         ).eq('id', encounter_id).single().execute()
 
@@ -256,7 +249,7 @@ async def get_encounter_details(encounter_id: str):
         encounter = response.data
 
         # Fetch patient details
-        patient_response = supabase.table('patients').select(
+        patient_response = get_supabase().table('patients').select(
             'id, name, age, gender, contact_info, allergies'
         ).eq('id', encounter['patient_id']).maybe_single().execute()
 
@@ -0,0 +1,34 @@
+"""
+Health Endpoints
+================
+
+Probes for the load balancer / orchestrator, per worker process:
+
+  GET /health/live    – the process is up and serving (always 200)
+  GET /health/ready   – 200 once the local warmup tasks (vector service,
+                        PDF rendering) are done, 503 before; the body
+                        reports the warm state of every dependency,
+                        Supabase and the LLM included (see ``warmup.py``)
+"""
+
+import os
+
+from fastapi import APIRouter, Response
+
+from datamodel import LivenessResponse, ReadinessResponse
+import warmup
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live", response_model=LivenessResponse)
+async def live():
+    return LivenessResponse(status="ok", pid=os.getpid())
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def ready(response: Response):
+    status = warmup.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return ReadinessResponse(**status)
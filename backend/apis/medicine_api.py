@@ -1,10 +1,9 @@
 import os
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-from supabase import create_client, Client
+from db import get_supabase
 from datamodel import MedicinePDFResponse, GenerateMedicinePDFRequest
 from medicine_pdf_generator import generate_medicine_pdf_from_string
-from config import settings
 import uuid
 from datetime import datetime
 import base64
@@ -12,12 +11,6 @@ from io import BytesIO
 
 router = APIRouter(prefix="/medicines", tags=["Medicines"])
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    settings.SUPABASE_URL,
-    settings.SUPABASE_SECRET_KEY
-)
-
 
 @router.post("/generate-pdf", response_model=MedicinePDFResponse)
 async def generate_medicine_pdf_endpoint(request: GenerateMedicinePDFRequest):
@@ -40,7 +33,7 @@ async def generate_medicine_pdf_endpoint(request: GenerateMedicinePDFRequest):
     
     try:
         # Fetch encounter to get medications
-        encounter_response = supabase.table('encounters').select(
+        encounter_response = get_supabase().table('encounters').select(
             'id, medications, patient_id, doctor_id'
         ).eq('id', request.encounter_id).single().execute()
         
@@ -108,7 +101,7 @@ async def download_medicine_pdf(
     
     try:
         # Fetch encounter to get medications
-        encounter_response = supabase.table('encounters').select(
+        encounter_response = get_supabase().table('encounters').select(
             'id, medications'
         ).eq('id', encounter_id).single().execute()
         
@@ -182,7 +175,7 @@ async def send_medicine_pdf_email(
             raise HTTPException(status_code=400, detail="Invalid email address")
         
         # Fetch encounter
-        encounter_response = supabase.table('encounters').select(
+        encounter_response = get_supabase().table('encounters').select(
             'id, medications'
         ).eq('id', encounter_id).single().execute()
         
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query
-from supabase import create_client, Client
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from db import get_supabase
 from datamodel import (
     PatientEducation,
     PatientEducationListResponse,
@@ -8,8 +10,10 @@ from datamodel import (
     PatientSummary,
     PatientSummaryListResponse
 )
+import anyio
 import os
 import re
+import json
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -19,6 +23,8 @@ from typing import Optional
 from datetime import datetime
 import uuid
 from medicine_pdf_generator import generate_medicine_pdf_from_string
+from apis.save_encounter import build_education_prompt, EDUCATION_SYSTEM_PROMPT
+from llm_client import llm, LLMUnavailableError
 
 
 def markdown_to_html(text: str) -> str:
@@ -33,12 +39,6 @@ def markdown_to_html(text: str) -> str:
 
 router = APIRouter(prefix="/patient-education", tags=["Patient Education"])
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_SECRET_KEY")
-)
-
 
 @router.get("/doctor/{doctor_id}", response_model=PatientEducationListResponse)
 async def get_education_for_doctor(
@@ -67,7 +67,7 @@ async def get_education_for_doctor(
             raise HTTPException(status_code=400, detail="Invalid doctor ID format")
 
         # Build query
-        query = supabase.table('patient_education').select('*').eq('doctor_id', doctor_id)
+        query = get_supabase().table('patient_education').select('*').eq('doctor_id', doctor_id)
         
         if status:
             query = query.eq('status', status)
@@ -85,12 +85,12 @@ async def get_education_for_doctor(
         education_list = []
         for edu in response.data:
             # Get patient info
-            patient_response = supabase.table('patients').select(
+            patient_response = get_supabase().table('patients').select(
                 'name, age, gender'
             ).eq('id', edu['patient_id']).single().execute()
             
             # Get encounter info
-            encounter_response = supabase.table('encounters').select(
+            encounter_response = get_supabase().table('encounters').select(
                 'diagnosis, chief_complaint, visit_number'
             ).eq('id', edu['encounter_id']).single().execute()
             
@@ -105,6 +105,7 @@ async def get_education_for_doctor(
                 status=edu['status'],
                 sent_at=edu.get('sent_at'),
                 viewed_at=edu.get('viewed_at'),
+                generation_status=edu.get('generation_status'),
                 created_at=edu['created_at'],
                 patient_name=patient_response.data.get('name') if patient_response.data else None,
                 patient_age=patient_response.data.get('age') if patient_response.data else None,
@@ -116,7 +117,7 @@ async def get_education_for_doctor(
             education_list.append(education_item)
 
         # Get total count
-        count_query = supabase.table('patient_education').select('id', count='exact').eq('doctor_id', doctor_id)
+        count_query = get_supabase().table('patient_education').select('id', count='exact').eq('doctor_id', doctor_id)
         if status:
             count_query = count_query.eq('status', status)
         count_response = count_query.execute()
@@ -140,7 +141,7 @@ async def get_education_by_encounter(encounter_id: str):
         raise HTTPException(status_code=400, detail="Invalid encounter ID format")
 
     try:
-        response = supabase.table('patient_education').select('*').eq(
+        response = get_supabase().table('patient_education').select('*').eq(
             'encounter_id', encounter_id
         ).single().execute()
 
@@ -150,12 +151,12 @@ async def get_education_by_encounter(encounter_id: str):
         edu = response.data
         
         # Get patient info
-        patient_response = supabase.table('patients').select(
+        patient_response = get_supabase().table('patients').select(
             'name, age, gender'
         ).eq('id', edu['patient_id']).single().execute()
         
         # Get encounter info
-        encounter_response = supabase.table('encounters').select(
+        encounter_response = get_supabase().table('encounters').select(
             'diagnosis, chief_complaint, visit_number'
         ).eq('id', edu['encounter_id']).single().execute()
 
@@ -170,6 +171,7 @@ async def get_education_by_encounter(encounter_id: str):
             status=edu['status'],
             sent_at=edu.get('sent_at'),
             viewed_at=edu.get('viewed_at'),
+            generation_status=edu.get('generation_status'),
             created_at=edu['created_at'],
             patient_name=patient_response.data.get('name') if patient_response.data else None,
             patient_age=patient_response.data.get('age') if patient_response.data else None,
@@ -197,7 +199,7 @@ async def get_education_by_id(education_id: str):
         raise HTTPException(status_code=400, detail="Invalid education ID format")
 
     try:
-        response = supabase.table('patient_education').select('*').eq(
+        response = get_supabase().table('patient_education').select('*').eq(
             'id', education_id
         ).single().execute()
 
@@ -207,12 +209,12 @@ async def get_education_by_id(education_id: str):
         edu = response.data
         
         # Get patient info
-        patient_response = supabase.table('patients').select(
+        patient_response = get_supabase().table('patients').select(
             'name, age, gender'
         ).eq('id', edu['patient_id']).single().execute()
         
         # Get encounter info
-        encounter_response = supabase.table('encounters').select(
+        encounter_response = get_supabase().table('encounters').select(
             'diagnosis, chief_complaint, visit_number'
         ).eq('id', edu['encounter_id']).single().execute()
 
@@ -227,6 +229,7 @@ async def get_education_by_id(education_id: str):
             status=edu['status'],
             sent_at=edu.get('sent_at'),
             viewed_at=edu.get('viewed_at'),
+            generation_status=edu.get('generation_status'),
             created_at=edu['created_at'],
             patient_name=patient_response.data.get('name') if patient_response.data else None,
             patient_age=patient_response.data.get('age') if patient_response.data else None,
@@ -272,7 +275,7 @@ async def update_education(education_id: str, request: UpdateEducationRequest):
         if not update_data:
             raise HTTPException(status_code=400, detail="No update data provided")
 
-        response = supabase.table('patient_education').update(
+        response = get_supabase().table('patient_education').update(
             update_data
         ).eq('id', education_id).execute()
 
@@ -300,7 +303,7 @@ async def send_education(education_id: str):
 
     try:
         # Fetch the education record
-        edu_response = supabase.table('patient_education').select('*').eq(
+        edu_response = get_supabase().table('patient_education').select('*').eq(
             'id', education_id
         ).single().execute()
 
@@ -310,7 +313,7 @@ async def send_education(education_id: str):
         edu = edu_response.data
 
         # Fetch patient email from patients table
-        patient_response = supabase.table('patients').select(
+        patient_response = get_supabase().table('patients').select(
             'name, email'
         ).eq('id', edu['patient_id']).single().execute()
 
@@ -380,7 +383,7 @@ This email was sent via MediCoPilot. Please consult your doctor for any question
         msg.attach(body_part)
 
         # Attach medicine PDF when medications are available for the encounter
-        encounter_response = supabase.table('encounters').select(
+        encounter_response = get_supabase().table('encounters').select(
             'id, medications'
         ).eq('id', edu['encounter_id']).single().execute()
 
@@ -389,7 +392,7 @@ This email was sent via MediCoPilot. Please consult your doctor for any question
             if medications_str and medications_str.strip():
                 doctor_name = "Your Doctor"
                 try:
-                    doctor_response = supabase.table('doctors').select('name').eq(
+                    doctor_response = get_supabase().table('doctors').select('name').eq(
                         'id', edu['doctor_id']
                     ).single().execute()
                     if doctor_response.data and doctor_response.data.get('name'):
@@ -416,7 +419,7 @@ This email was sent via MediCoPilot. Please consult your doctor for any question
             server.sendmail(smtp_email, patient_email, msg.as_string())
 
         # Update status to 'sent' in database
-        supabase.table('patient_education').update({
+        get_supabase().table('patient_education').update({
             'status': 'sent',
             'sent_at': datetime.utcnow().isoformat()
         }).eq('id', education_id).execute()
@@ -438,6 +441,155 @@ This email was sent via MediCoPilot. Please consult your doctor for any question
         raise HTTPException(status_code=500, detail=f"Error sending patient education: {str(e)}")
 
 
+def _sse_event(event: str, payload: dict) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def _persist_streamed_education(encounter: dict, content: str, generation_status: str) -> Optional[str]:
+    """
+    Save streamed education content for an encounter.  Returns the
+    patient_education id.
+
+    A complete stream replaces the encounter's existing record.  A partial
+    one only replaces a record that is itself partial: an interrupted
+    regeneration never overwrites a complete document (which may already
+    have been sent to the patient); the old content is kept and the
+    partial text is dropped.
+    """
+    diagnosis = encounter.get('diagnosis')
+    existing = get_supabase().table('patient_education').select('id, generation_status').eq(
+        'encounter_id', encounter['id']
+    ).limit(1).execute()
+
+    if existing.data:
+        record = existing.data[0]
+        education_id = record['id']
+        if generation_status == 'partial' and record.get('generation_status') != 'partial':
+            print(f"Keeping complete patient education {education_id}; "
+                  f"interrupted regeneration for encounter {encounter['id']} not saved")
+            return education_id
+        get_supabase().table('patient_education').update({
+            'content': content,
+            'generation_status': generation_status,
+        }).eq('id', education_id).execute()
+        return education_id
+
+    result = get_supabase().table('patient_education').insert({
+        'encounter_id': encounter['id'],
+        'patient_id': encounter['patient_id'],
+        'doctor_id': encounter['doctor_id'],
+        'title': f"Understanding Your Diagnosis: {diagnosis[:50]}" if diagnosis else "Your Health Care Guide",
+        'description': f"Educational material about your recent visit for {encounter.get('chief_complaint') or 'your condition'}",
+        'content': content,
+        'status': 'pending',
+        'generation_status': generation_status,
+    }).execute()
+    return result.data[0]['id'] if result.data else None
+
+
+@router.post("/generate/{encounter_id}/stream")
+async def stream_education(encounter_id: str):
+    """
+    Generate patient education for an encounter and stream it as Server-Sent
+    Events while the model writes it.
+
+    Events:
+      token  – {"delta": "..."} for each generated text chunk
+      done   – {"education_id": "...", "generation_status": "complete"}
+      error  – {"detail": "..."} if generation fails part-way
+
+    The final content is saved to ``patient_education`` when the stream
+    completes.  If the stream is interrupted (client disconnects or the
+    model errors) whatever was generated so far is saved with
+    ``generation_status = 'partial'`` so it can be reviewed or regenerated,
+    unless the encounter already has a complete document, which is kept.
+    """
+    try:
+        uuid.UUID(encounter_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid encounter ID format")
+
+    if not llm.available:
+        raise HTTPException(status_code=503, detail="GROQ_API_KEY not configured. Cannot generate education.")
+
+    encounter_response = get_supabase().table('encounters').select(
+        'id, patient_id, doctor_id, chief_complaint, diagnosis, physical_exam'
+    ).eq('id', encounter_id).maybe_single().execute()
+
+    if not encounter_response or not encounter_response.data:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+
+    encounter = encounter_response.data
+
+    # Open the stream before responding so an open circuit breaker is a
+    # clean 503 rather than an error event inside a 200 response
+    try:
+        stream = await run_in_threadpool(
+            llm.create,
+            model="llama-3.3-70b-versatile",
+            messages=[
+                {"role": "system", "content": EDUCATION_SYSTEM_PROMPT},
+                {"role": "user", "content": build_education_prompt(encounter)}
+            ],
+            temperature=0.7,
+            max_tokens=2048,
+            stream=True
+        )
+    except LLMUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Education generation is temporarily unavailable: {e}",
+            headers={"Retry-After": str(int(e.retry_after_s) or 1)},
+        )
+    except Exception as e:
+        print(f"Error starting patient education stream: {e}")
+        raise HTTPException(status_code=502, detail=f"Error starting education generation: {str(e)}")
+
+    async def event_stream():
+        # An async generator: Starlette cancels it as soon as the client
+        # disconnects (a sync one is only closed whenever the GC gets to it,
+        # holding the LLM slot until then).  Chunks are pulled on a worker
+        # thread so the blocking stream never runs on the event loop
+        chunks = []
+        completed = False
+        education_id = None
+        try:
+            async for chunk in iterate_in_threadpool(stream):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    chunks.append(delta)
+                    yield _sse_event('token', {'delta': delta})
+            completed = True
+        except Exception as e:
+            print(f"Error streaming patient education: {e}")
+            yield _sse_event('error', {'detail': str(e)})
+        finally:
+            # Runs on completion, on model errors and when the client goes
+            # away mid-stream (cancellation), so partial work is never lost;
+            # shielded so the cancellation does not abort the save itself
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(stream.close)
+                content = ''.join(chunks)
+                if content:
+                    try:
+                        education_id = await run_in_threadpool(
+                            _persist_streamed_education,
+                            encounter, content, 'complete' if completed else 'partial',
+                        )
+                    except Exception as e:
+                        print(f"Error saving streamed patient education: {e}")
+
+        if completed:
+            yield _sse_event('done', {'education_id': education_id, 'generation_status': 'complete'})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # Patient Summary endpoints
 @router.get("/summary/doctor/{doctor_id}", response_model=PatientSummaryListResponse)
 async def get_summaries_for_doctor(
@@ -454,7 +606,7 @@ async def get_summaries_for_doctor(
         raise HTTPException(status_code=400, detail="Invalid doctor ID format")
 
     try:
-        response = supabase.table('patient_summary').select('*').eq(
+        response = get_supabase().table('patient_summary').select('*').eq(
             'doctor_id', doctor_id
         ).order(
             'created_at', desc=True
@@ -468,12 +620,12 @@ async def get_summaries_for_doctor(
         summaries = []
         for summary in response.data:
             # Get patient info
-            patient_response = supabase.table('patients').select(
+            patient_response = get_supabase().table('patients').select(
                 'name'
             ).eq('id', summary['patient_id']).single().execute()
             
             # Get encounter info
-            encounter_response = supabase.table('encounters').select(
+            encounter_response = get_supabase().table('encounters').select(
                 'diagnosis, visit_number'
             ).eq('id', summary['encounter_id']).single().execute()
 
@@ -495,7 +647,7 @@ async def get_summaries_for_doctor(
             summaries.append(summary_item)
 
         # Get total count
-        count_response = supabase.table('patient_summary').select('id', count='exact').eq(
+        count_response = get_supabase().table('patient_summary').select('id', count='exact').eq(
             'doctor_id', doctor_id
         ).execute()
         total = count_response.count if count_response.count else len(summaries)
@@ -518,7 +670,7 @@ async def get_summary_by_encounter(encounter_id: str):
         raise HTTPException(status_code=400, detail="Invalid encounter ID format")
 
     try:
-        response = supabase.table('patient_summary').select('*').eq(
+        response = get_supabase().table('patient_summary').select('*').eq(
             'encounter_id', encounter_id
         ).single().execute()
 
@@ -528,12 +680,12 @@ async def get_summary_by_encounter(encounter_id: str):
         summary = response.data
         
         # Get patient info
-        patient_response = supabase.table('patients').select(
+        patient_response = get_supabase().table('patients').select(
             'name'
         ).eq('id', summary['patient_id']).single().execute()
         
         # Get encounter info
-        encounter_response = supabase.table('encounters').select(
+        encounter_response = get_supabase().table('encounters').select(
             'diagnosis, visit_number'
         ).eq('id', summary['encounter_id']).single().execute()
 
@@ -574,7 +726,7 @@ async def get_summaries_for_patient(
         raise HTTPException(status_code=400, detail="Invalid patient ID format")
 
     try:
-        response = supabase.table('patient_summary').select('*').eq(
+        response = get_supabase().table('patient_summary').select('*').eq(
             'patient_id', patient_id
         ).order(
             'created_at', desc=True
@@ -584,7 +736,7 @@ async def get_summaries_for_patient(
             return PatientSummaryListResponse(summaries=[], total=0)
 
         # Get patient info once
-        patient_response = supabase.table('patients').select(
+        patient_response = get_supabase().table('patients').select(
             'name'
         ).eq('id', patient_id).single().execute()
         patient_name = patient_response.data.get('name') if patient_response.data else None
@@ -592,7 +744,7 @@ async def get_summaries_for_patient(
         summaries = []
         for summary in response.data:
             # Get encounter info
-            encounter_response = supabase.table('encounters').select(
+            encounter_response = get_supabase().table('encounters').select(
                 'diagnosis, visit_number'
             ).eq('id', summary['encounter_id']).single().execute()
 
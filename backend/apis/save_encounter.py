@@ -1,9 +1,27 @@
 from fastapi import APIRouter, HTTPException
-from supabase import create_client, Client
+from starlette.concurrency import run_in_threadpool
+from db import get_supabase
 from datamodel import SaveEncounterRequest, SaveEncounterResponse
-from openai import OpenAI
 from medicine_pdf_generator import parse_medications_string
+from llm_client import llm
 from vector_service import VectorService
+from case_text import case_document
+from education_templates import (
+    TEMPLATES_ENABLED,
+    normalise_diagnosis,
+    find_template,
+    store_draft_template,
+    personalise_template,
+    log_generation,
+)
+from patient_state import (
+    load_state,
+    update_state,
+    encounter_delta,
+    render_state,
+    render_delta,
+    merge_state,
+)
 import os
 from dotenv import load_dotenv
 import uuid
@@ -12,35 +30,17 @@ load_dotenv()
 
 router = APIRouter(prefix="/encounter", tags=["Encounter"])
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_SECRET_KEY")
-)
+# Summary mode: "delta" keeps a rolling per-patient state and only sends the
+# new encounter's changes to the LLM; "full" regenerates from the whole visit.
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "delta").lower()
 
-# Configure Groq API (OpenAI-compatible)
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-ai_client = None
-if GROQ_API_KEY:
-    ai_client = OpenAI(
-        api_key=GROQ_API_KEY,
-        base_url="https://api.groq.com/openai/v1",
-    )
 
+EDUCATION_SYSTEM_PROMPT = "You are a compassionate medical educator creating patient-friendly educational materials. Focus on condition management and lifestyle, medication details are provided separately."
 
-def generate_patient_education(encounter_data: dict, patient_data: dict) -> dict:
-    """
-    Generate patient education content using AI based on the encounter.
-    Separates general education from medicine information.
-    """
-    if not ai_client:
-        return None
-    
-    # Parse medications to extract structured medicine info
-    medications_str = encounter_data.get('medications', '')
-    medicines_list = parse_medications_string(medications_str) if medications_str else []
-    
-    prompt = f"""You are a medical educator. Create a patient education document based on this encounter:
+
+def build_education_prompt(encounter_data: dict) -> str:
+    """Build the full-generation patient education prompt for an encounter."""
+    return f"""You are a medical educator. Create a patient education document based on this encounter:
 
 Chief Complaint: {encounter_data.get('chief_complaint', 'N/A')}
 Diagnosis: {encounter_data.get('diagnosis', 'N/A')}
@@ -60,17 +60,80 @@ Write in a caring, reassuring tone that patients can easily understand.
 Do NOT include specific medication names or dosages in this content.
 """
 
+
+def generate_education_content(encounter_data: dict) -> str:
+    """
+    Produce the education body for an encounter.
+
+    Uses an approved diagnosis template plus a cheap personalisation pass
+    when one exists; otherwise generates the document in full and stores it
+    as a draft template for doctor review.
+    """
+    diagnosis_key = normalise_diagnosis(encounter_data.get('diagnosis')) if TEMPLATES_ENABLED else ""
+    template = None
+    if diagnosis_key:
+        try:
+            template = find_template(get_supabase(), diagnosis_key)
+        except Exception as e:
+            print(f"Could not look up education template: {e}")
+    
+    if template and template.get('status') == 'approved':
+        try:
+            content, prompt_tokens, completion_tokens = personalise_template(llm, template, encounter_data)
+        except Exception as e:
+            # The reviewed template is still correct without the opening
+            print(f"Error personalising education template: {e}")
+            content, prompt_tokens, completion_tokens = template['content'], 0, 0
+        try:
+            log_generation(get_supabase(), diagnosis_key, 'template', prompt_tokens, completion_tokens, template)
+        except Exception as e:
+            print(f"Could not log education generation: {e}")
+        return content
+    
+    response = llm.create(
+        model="llama-3.3-70b-versatile",
+        messages=[
+            {"role": "system", "content": EDUCATION_SYSTEM_PROMPT},
+            {"role": "user", "content": build_education_prompt(encounter_data)}
+        ],
+        temperature=0.7,
+        max_tokens=2048
+    )
+    content = response.choices[0].message.content
+    
+    if diagnosis_key:
+        usage = response.usage
+        prompt_tokens = usage.prompt_tokens if usage else 0
+        completion_tokens = usage.completion_tokens if usage else 0
+        try:
+            if template is None:
+                store_draft_template(
+                    get_supabase(),
+                    diagnosis_key,
+                    encounter_data.get('diagnosis', ''),
+                    content,
+                    prompt_tokens + completion_tokens,
+                )
+            log_generation(get_supabase(), diagnosis_key, 'full', prompt_tokens, completion_tokens)
+        except Exception as e:
+            print(f"Could not store education template: {e}")
+    return content
+
+
+def generate_patient_education(encounter_data: dict, patient_data: dict) -> dict:
+    """
+    Generate patient education content using AI based on the encounter.
+    Separates general education from medicine information.
+    """
+    if not llm.available:
+        return None
+    
+    # Parse medications to extract structured medicine info
+    medications_str = encounter_data.get('medications', '')
+    medicines_list = parse_medications_string(medications_str) if medications_str else []
+
     try:
-        response = ai_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a compassionate medical educator creating patient-friendly educational materials. Focus on condition management and lifestyle, medication details are provided separately."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2048
-        )
-        content = response.choices[0].message.content
+        content = generate_education_content(encounter_data)
         
         # Generate a title based on diagnosis
         diagnosis = encounter_data.get('diagnosis', 'Your Health')
@@ -106,11 +169,69 @@ Do NOT include specific medication names or dosages in this content.
         return None
 
 
+def parse_summary_sections(content: str) -> dict:
+    """
+    Parse a generated summary into its structured sections.
+
+    Recognises SUMMARY_TEXT, KEY_FINDINGS, IMPORTANT_CHANGES, FOLLOW_UP_NOTES
+    and (for delta summaries) ACTIVE_PROBLEMS headers.
+    """
+    summary_text = ""
+    key_findings = ""
+    important_changes = ""
+    follow_up_notes = ""
+    active_problems = ""
+    
+    current_section = None
+    lines = content.split('\n')
+    
+    for line in lines:
+        line_upper = line.upper().strip()
+        if 'ACTIVE_PROBLEMS' in line_upper or 'ACTIVE PROBLEMS' in line_upper:
+            current_section = 'problems'
+            continue
+        elif 'SUMMARY_TEXT' in line_upper or 'SUMMARY:' in line_upper or 'OVERALL SUMMARY' in line_upper:
+            current_section = 'summary'
+            continue
+        elif 'KEY_FINDINGS' in line_upper or 'KEY FINDINGS' in line_upper:
+            current_section = 'findings'
+            continue
+        elif 'IMPORTANT_CHANGES' in line_upper or 'IMPORTANT CHANGES' in line_upper:
+            current_section = 'changes'
+            continue
+        elif 'FOLLOW_UP' in line_upper or 'FOLLOW UP' in line_upper:
+            current_section = 'followup'
+            continue
+        
+        if current_section == 'summary':
+            summary_text += line + '\n'
+        elif current_section == 'findings':
+            key_findings += line + '\n'
+        elif current_section == 'changes':
+            important_changes += line + '\n'
+        elif current_section == 'followup':
+            follow_up_notes += line + '\n'
+        elif current_section == 'problems':
+            active_problems += line + '\n'
+    
+    # If parsing failed, use the whole content as summary
+    if not summary_text.strip():
+        summary_text = content[:500]
+    
+    return {
+        "summary_text": summary_text.strip(),
+        "key_findings": key_findings.strip() or None,
+        "important_changes": important_changes.strip() or None,
+        "follow_up_notes": follow_up_notes.strip() or None,
+        "active_problems": active_problems.strip() or None
+    }
+
+
 def generate_patient_summary(encounter_data: dict, patient_data: dict, previous_summary: str = None) -> dict:
     """
     Generate a summary of the encounter highlighting important details and changes.
     """
-    if not ai_client:
+    if not llm.available:
         return None
     
     previous_context = ""
@@ -151,7 +272,7 @@ Format each section with clear headers.
 """
 
     try:
-        response = ai_client.chat.completions.create(
+        response = llm.create(
             model="llama-3.3-70b-versatile",
             messages=[
                 {"role": "system", "content": "You are a medical documentation specialist creating concise clinical summaries."},
@@ -161,55 +282,60 @@ Format each section with clear headers.
             max_tokens=1500
         )
         content = response.choices[0].message.content
-        
-        # Parse the response into structured fields
-        summary_text = ""
-        key_findings = ""
-        important_changes = ""
-        follow_up_notes = ""
-        
-        current_section = None
-        lines = content.split('\n')
-        
-        for line in lines:
-            line_upper = line.upper().strip()
-            if 'SUMMARY_TEXT' in line_upper or 'SUMMARY:' in line_upper or 'OVERALL SUMMARY' in line_upper:
-                current_section = 'summary'
-                continue
-            elif 'KEY_FINDINGS' in line_upper or 'KEY FINDINGS' in line_upper:
-                current_section = 'findings'
-                continue
-            elif 'IMPORTANT_CHANGES' in line_upper or 'IMPORTANT CHANGES' in line_upper:
-                current_section = 'changes'
-                continue
-            elif 'FOLLOW_UP' in line_upper or 'FOLLOW UP' in line_upper:
-                current_section = 'followup'
-                continue
-            
-            if current_section == 'summary':
-                summary_text += line + '\n'
-            elif current_section == 'findings':
-                key_findings += line + '\n'
-            elif current_section == 'changes':
-                important_changes += line + '\n'
-            elif current_section == 'followup':
-                follow_up_notes += line + '\n'
-        
-        # If parsing failed, use the whole content as summary
-        if not summary_text.strip():
-            summary_text = content[:500]
-        
-        return {
-            "summary_text": summary_text.strip(),
-            "key_findings": key_findings.strip() or None,
-            "important_changes": important_changes.strip() or None,
-            "follow_up_notes": follow_up_notes.strip() or None
-        }
+        return parse_summary_sections(content)
     except Exception as e:
         print(f"Error generating patient summary: {e}")
         return None
 
 
+def generate_patient_summary_delta(encounter_data: dict, patient_data: dict, patient_state: dict) -> dict:
+    """
+    Generate a follow-up summary from the compact patient state plus only
+    what changed in this encounter.
+
+    The prompt size stays constant over long chronic-care cases because the
+    state is bounded (see ``patient_state``) and unchanged fields are omitted.
+    """
+    if not llm.available:
+        return None
+    
+    prompt = f"""You are a medical documentation specialist. Update the clinical summary for a follow-up visit.
+
+Patient: {patient_data.get('name', 'Patient')}, {patient_data.get('age', 'N/A')}, {patient_data.get('gender', 'N/A')}
+
+Current Patient State:
+{render_state(patient_state)}
+
+New in This Visit:
+{render_delta(encounter_delta(encounter_data, patient_state))}
+
+Generate a structured summary with:
+1. SUMMARY_TEXT: A brief 2-3 sentence overall summary of the patient after this visit
+2. KEY_FINDINGS: Important clinical findings from this visit (bullet points)
+3. IMPORTANT_CHANGES: Significant changes compared to the current patient state (bullet points)
+4. FOLLOW_UP_NOTES: Recommended follow-up actions and monitoring requirements
+5. ACTIVE_PROBLEMS: The updated list of active problems, one per bullet (drop resolved ones)
+
+Format each section with clear headers.
+"""
+
+    try:
+        response = llm.create(
+            model="llama-3.3-70b-versatile",
+            messages=[
+                {"role": "system", "content": "You are a medical documentation specialist creating concise clinical summaries."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.5,
+            max_tokens=1000
+        )
+        content = response.choices[0].message.content
+        return parse_summary_sections(content)
+    except Exception as e:
+        print(f"Error generating delta patient summary: {e}")
+        return None
+
+
 @router.post("/save", response_model=SaveEncounterResponse)
 async def save_encounter(request: SaveEncounterRequest) -> SaveEncounterResponse:
     """
@@ -229,7 +355,7 @@ async def save_encounter(request: SaveEncounterRequest) -> SaveEncounterResponse
     
     try:
         # Step 1: Fetch existing patient by patient_id
-        patient_result = supabase.table('patients').select('*').eq(
+        patient_result = get_supabase().table('patients').select('*').eq(
             'id', request.patient_id
         ).execute()
         
@@ -241,12 +367,12 @@ async def save_encounter(request: SaveEncounterRequest) -> SaveEncounterResponse
         
         # Ensure doctor-patient link exists in doctor_patients (many-to-many)
         try:
-            existing_link = supabase.table('doctor_patients').select('id').eq(
+            existing_link = get_supabase().table('doctor_patients').select('id').eq(
                 'doctor_id', request.doctor_id
             ).eq('patient_id', patient_id).maybe_single().execute()
             
             if not existing_link.data:
-                supabase.table('doctor_patients').insert({
+                get_supabase().table('doctor_patients').insert({
                     'doctor_id': request.doctor_id,
                     'patient_id': patient_id,
                 }).execute()
@@ -264,7 +390,7 @@ async def save_encounter(request: SaveEncounterRequest) -> SaveEncounterResponse
             case_id = request.case_id
             
             # Get the latest visit in this case
-            latest_visit = supabase.table('encounters').select(
+            latest_visit = get_supabase().table('encounters').select(
                 'visit_number, history_of_illness'
             ).eq('case_id', case_id).order(
                 'visit_number', desc=True
@@ -302,7 +428,7 @@ async def save_encounter(request: SaveEncounterRequest) -> SaveEncounterResponse
             'medications': request.medications,
         }
         
-        encounter_result = supabase.table('encounters').insert(
+        encounter_result = get_supabase().table('encounters').insert(
             encounter_data
         ).execute()
         
@@ -317,22 +443,37 @@ async def save_encounter(request: SaveEncounterRequest) -> SaveEncounterResponse
         
         patient_data = patient_result.data[0]
         
-        # Get previous summary for this patient if exists (for tracking changes)
+        # Rolling patient state for delta summarisation (None → first visit
+        # or a patient summarised before delta mode existed)
+        patient_state = None
+        state_version = None
+        state_loaded = False
+        if SUMMARY_MODE == "delta":
+            try:
+                patient_state, state_version = await run_in_threadpool(load_state, get_supabase(), patient_id)
+                state_loaded = True
+            except Exception as e:
+                print(f"Could not fetch patient state: {e}")
+        
+        # Get previous summary for this patient if exists (for tracking changes);
+        # not needed when the rolling state already carries the last summary
         previous_summary = None
-        try:
-            prev_summary_result = supabase.table('patient_summary').select(
-                'summary_text'
-            ).eq('patient_id', patient_id).order(
-                'created_at', desc=True
-            ).limit(1).execute()
-            
-            if prev_summary_result.data and len(prev_summary_result.data) > 0:
-                previous_summary = prev_summary_result.data[0].get('summary_text')
-        except Exception as e:
-            print(f"Could not fetch previous summary: {e}")
+        if patient_state is None:
+            try:
+                prev_summary_result = get_supabase().table('patient_summary').select(
+                    'summary_text'
+                ).eq('patient_id', patient_id).order(
+                    'created_at', desc=True
+                ).limit(1).execute()
+                
+                if prev_summary_result.data and len(prev_summary_result.data) > 0:
+                    previous_summary = prev_summary_result.data[0].get('summary_text')
+            except Exception as e:
+                print(f"Could not fetch previous summary: {e}")
         
         # Generate patient education
-        education_content = generate_patient_education(encounter_data, patient_data)
+        # LLM calls run in the threadpool so a slow Groq never blocks the event loop
+        education_content = await run_in_threadpool(generate_patient_education, encounter_data, patient_data)
         if education_content:
             try:
                 education_data = {
@@ -344,7 +485,7 @@ async def save_encounter(request: SaveEncounterRequest) -> SaveEncounterResponse
                     'content': education_content['content'],
                     'status': 'pending'
                 }
-                education_result = supabase.table('patient_education').insert(
+                education_result = get_supabase().table('patient_education').insert(
                     education_data
                 ).execute()
                 if education_result.data:
@@ -352,8 +493,16 @@ async def save_encounter(request: SaveEncounterRequest) -> SaveEncounterResponse
             except Exception as e:
                 print(f"Error saving patient education: {e}")
         
-        # Generate patient summary
-        summary_content = generate_patient_summary(encounter_data, patient_data, previous_summary)
+        # Generate patient summary (delta against the rolling state when we
+        # have one, otherwise a full summary that seeds the state)
+        if patient_state is not None:
+            summary_content = await run_in_threadpool(
+                generate_patient_summary_delta, encounter_data, patient_data, patient_state
+            )
+        else:
+            summary_content = await run_in_threadpool(
+                generate_patient_summary, encounter_data, patient_data, previous_summary
+            )
         if summary_content:
             try:
                 summary_data = {
@@ -365,37 +514,48 @@ async def save_encounter(request: SaveEncounterRequest) -> SaveEncounterResponse
                     'important_changes': summary_content['important_changes'],
                     'follow_up_notes': summary_content['follow_up_notes']
                 }
-                summary_result = supabase.table('patient_summary').insert(
+                summary_result = get_supabase().table('patient_summary').insert(
                     summary_data
                 ).execute()
                 if summary_result.data:
                     patient_summary_id = summary_result.data[0]['id']
             except Exception as e:
                 print(f"Error saving patient summary: {e}")
+            
+            # Only when the state was read: after a failed read, merging into
+            # None would overwrite the accumulated state with a first visit.
+            # The write is conditional on the version read; if another
+            # encounter for this patient saved meanwhile, this one is merged
+            # into that newer state instead of overwriting it.
+            if SUMMARY_MODE == "delta" and state_loaded:
+                try:
+                    saved = await run_in_threadpool(
+                        update_state,
+                        get_supabase(),
+                        patient_id,
+                        patient_state,
+                        state_version,
+                        lambda state: merge_state(state, encounter_data, patient_data, summary_content),
+                    )
+                    if not saved:
+                        print(f"Patient state for {patient_id} left unchanged (concurrent saves kept winning)")
+                except Exception as e:
+                    print(f"Error saving patient state: {e}")
+            elif SUMMARY_MODE == "delta":
+                print(f"Patient state for {patient_id} left unchanged (it could not be read)")
         
         # Auto-index into ChromaDB for case similarity search
         try:
-            vs = VectorService.get_instance()
-            fields = [
-                ("Chief Complaint", encounter_data.get("chief_complaint")),
-                ("Diagnosis",       encounter_data.get("diagnosis")),
-                ("History",         encounter_data.get("history_of_illness")),
-                ("Medications",     encounter_data.get("medications")),
-            ]
-            case_text = " | ".join(f"{k}: {v}" for k, v in fields if v)
-            if case_text:
-                vs.index_encounter(
-                    encounter_id=encounter_id,
-                    case_text=case_text,
-                    doctor_id=request.doctor_id or "",
-                    patient_id=patient_id or "",
-                    diagnosis=request.diagnosis or "",
-                    chief_complaint=request.chief_complaint or "",
-                    treatments=request.medications or "",
-                )
+            # Same builder as the case-similarity endpoints, from the stored row
+            document = case_document(encounter_result.data[0])
+            if document:
+                vs = await VectorService.aget_instance()
+                await vs.aindex_encounter(**document)
         except Exception as e:
-            # Never block the save if ChromaDB indexing fails
-            print(f"Warning: ChromaDB auto-index failed for {encounter_id}: {e}")
+            # Never block the save if ChromaDB indexing fails; the next
+            # POST /case-similarity/reconcile finds and indexes it
+            print(f"Warning: ChromaDB auto-index failed for {encounter_id} "
+                  f"(repaired by /case-similarity/reconcile): {e}")
 
         return SaveEncounterResponse(
             success=True,
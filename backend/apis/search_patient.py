@@ -1,20 +1,10 @@
 from fastapi import APIRouter, HTTPException
-from supabase import create_client
-import os
+from db import get_supabase
 from typing import List, Optional
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
-# Initialize Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SECRET_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("SUPABASE_URL or SUPABASE_SECRET_KEY not set")
-
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 
 class UpdateAllergiesRequest(BaseModel):
     allergies: Optional[str] = None
@@ -58,7 +48,7 @@ async def search_patients(query: str = "", limit: int = 10, doctor_id: str = Non
     linked_patient_ids = None
     if doctor_id and doctor_id.strip():
         try:
-            dp_response = supabase.table("doctor_patients").select(
+            dp_response = get_supabase().table("doctor_patients").select(
                 "patient_id"
             ).eq("doctor_id", doctor_id.strip()).execute()
             linked_patient_ids = [row["patient_id"] for row in (dp_response.data or [])]
@@ -71,7 +61,7 @@ async def search_patients(query: str = "", limit: int = 10, doctor_id: str = Non
     if not query or query.strip() == "":
         # Return recent patients (optionally scoped to doctor)
         try:
-            q = supabase.table("patients").select(
+            q = get_supabase().table("patients").select(
                 "id, name, age, gender, contact_info"
             )
             if linked_patient_ids is not None:
@@ -88,7 +78,7 @@ async def search_patients(query: str = "", limit: int = 10, doctor_id: str = Non
         query_lower = query.lower().strip()
         
         # Search for patients where name contains query (case-insensitive)
-        q = supabase.table("patients").select(
+        q = get_supabase().table("patients").select(
             "id, name, age, gender, contact_info"
         ).ilike("name", f"%{query_lower}%")
         if linked_patient_ids is not None:
@@ -100,7 +90,7 @@ async def search_patients(query: str = "", limit: int = 10, doctor_id: str = Non
         # If results are less than limit, also search by contact info
         if len(results) < limit:
             remaining = limit - len(results)
-            cq = supabase.table("patients").select(
+            cq = get_supabase().table("patients").select(
                 "id, name, age, gender, contact_info"
             ).ilike("contact_info", f"%{query_lower}%")
             if linked_patient_ids is not None:
@@ -133,7 +123,7 @@ async def get_patient_details(patient_id: str) -> dict:
     """
     
     try:
-        response = supabase.table("patients").select("*").eq("id", patient_id).single().execute()
+        response = get_supabase().table("patients").select("*").eq("id", patient_id).single().execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Patient not found")
@@ -159,7 +149,7 @@ async def update_patient_allergies(patient_id: str, request: UpdateAllergiesRequ
     try:
         update_data = {"allergies": request.allergies}
         
-        response = supabase.table("patients").update(
+        response = get_supabase().table("patients").update(
             update_data
         ).eq("id", patient_id).execute()
         
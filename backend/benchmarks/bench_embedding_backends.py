@@ -0,0 +1,85 @@
+"""
+Benchmark: embedding backends — cold start, RSS, latency and throughput.
+
+Each backend runs in a fresh subprocess so import cost and peak RSS are
+measured in isolation.  Reports
+
+  load s        import + model load
+  rss MB        peak resident set size after the run
+  single ms     p50 latency of one-text encodes
+  batch/s       texts per second encoding batches of --batch-size
+
+Usage (from backend/, after ``python embedding_backends.py build``):
+    python benchmarks/bench_embedding_backends.py [--model NAME] [--backends torch,onnx,onnx-int8]
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def measure(model: str, backend_name: str, singles: int, batches: int, batch_size: int) -> dict:
+    started = time.perf_counter()
+    from embedding_backends import load_backend
+    from bench_event_loop import synthetic_case
+
+    backend = load_backend(model, backend_name)
+    load_s = time.perf_counter() - started
+    backend.encode(["warm-up"])
+
+    latencies = []
+    for i in range(singles):
+        t0 = time.perf_counter()
+        backend.encode([synthetic_case(i)])
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    texts = [synthetic_case(10_000 + i) for i in range(batches * batch_size)]
+    t0 = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        backend.encode(texts[start:start + batch_size], batch_size=batch_size)
+    throughput = len(texts) / (time.perf_counter() - t0)
+
+    return {
+        "load_s": load_s,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "single_ms": statistics.median(latencies),
+        "batch_per_s": throughput,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.getenv("BERT_MODEL_NAME", "all-MiniLM-L6-v2"))
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--singles", type=int, default=200)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.model, args.child, args.singles, args.batches, args.batch_size)))
+        return
+
+    print(f"{'backend':<11}{'load s':>8}{'rss MB':>9}{'single ms':>11}{'batch/s':>10}")
+    for name in args.backends.split(","):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", name, "--model", args.model,
+             "--singles", str(args.singles), "--batches", str(args.batches),
+             "--batch-size", str(args.batch_size)],
+            capture_output=True, text=True, check=True, cwd=BACKEND_DIR,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{name:<11}{r['load_s']:>8.2f}{r['rss_mb']:>9.0f}{r['single_ms']:>11.2f}{r['batch_per_s']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
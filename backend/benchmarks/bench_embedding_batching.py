@@ -0,0 +1,78 @@
+"""
+Benchmark: single-text encode throughput with and without micro-batching.
+
+Keeps ``--concurrency`` ``VectorService.aencode`` calls in flight for
+``--seconds`` and reports encodes/s and p50/p99 latency for
+
+  per-request  – one forward pass per text on the executor (batching off)
+  batched      – the ``_EmbeddingBatcher`` (EMBED_BATCH_MAX_SIZE /
+                 EMBED_BATCH_MAX_WAIT_MS from the environment)
+
+Usage (from backend/):
+    python benchmarks/bench_embedding_batching.py --concurrency 32 --seconds 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench-chroma-"))
+
+from vector_service import VectorService  # noqa: E402
+from bench_event_loop import synthetic_case  # noqa: E402
+
+
+async def drive(vs: VectorService, concurrency: int, seconds: float):
+    latencies = []
+    stop_at = time.perf_counter() + seconds
+
+    async def worker(offset: int):
+        i = offset
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            await vs.aencode(synthetic_case(i))
+            latencies.append((time.perf_counter() - started) * 1000)
+            i += concurrency
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return (
+        len(latencies) / elapsed,
+        statistics.median(latencies),
+        latencies[int(len(latencies) * 0.99) - 1],
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    vs = await VectorService.aget_instance()
+    batcher = vs._batcher
+    if batcher is None:
+        sys.exit("Batching is disabled (EMBED_BATCH_MAX_SIZE <= 1)")
+    vs._cache = None   # measure the model, not the embedding cache
+    await vs.aencode("warm-up")
+
+    print(f"{'variant':<14}{'encodes/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+    vs._batcher = None
+    rate, p50, p99 = await drive(vs, args.concurrency, args.seconds)
+    print(f"{'per-request':<14}{rate:>12.1f}{p50:>10.1f}{p99:>10.1f}")
+
+    vs._batcher = batcher
+    rate, p50, p99 = await drive(vs, args.concurrency, args.seconds)
+    print(f"{'batched':<14}{rate:>12.1f}{p50:>10.1f}{p99:>10.1f}")
+    print(f"batcher: {batcher.stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
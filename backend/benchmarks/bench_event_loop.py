@@ -0,0 +1,133 @@
+"""
+Benchmark: latency of an unrelated endpoint under concurrent similarity load.
+
+Runs a small ASGI app in-process with
+
+  GET /ping           – trivial endpoint (stands in for /encounters/*)
+  GET /similar-sync   – ``VectorService.query_similar`` on the event loop
+  GET /similar-async  – ``VectorService.aquery_similar`` (dedicated executor)
+
+and, for each similarity variant, keeps ``--concurrency`` similarity requests
+in flight while probing ``/ping``.  Prints /ping p50/p99/max and similarity
+throughput.  Uses a throw-away ChromaDB directory seeded with synthetic cases.
+
+Usage (from backend/):
+    python benchmarks/bench_event_loop.py --concurrency 16 --seconds 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench-chroma-"))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from vector_service import VectorService  # noqa: E402
+
+COMPLAINTS = ["chest pain", "fever and cough", "headache", "abdominal pain", "back pain",
+              "shortness of breath", "rash", "dizziness", "joint swelling", "fatigue"]
+DIAGNOSES = ["pneumonia", "migraine", "gastritis", "lumbar strain", "asthma",
+             "cellulitis", "vertigo", "gout", "hypothyroidism", "angina"]
+
+
+def synthetic_case(i: int) -> str:
+    rnd = random.Random(i)
+    return (
+        f"Chief Complaint: {rnd.choice(COMPLAINTS)} for {rnd.randint(1, 14)} days | "
+        f"Diagnosis: {rnd.choice(DIAGNOSES)} | "
+        f"History: patient aged {rnd.randint(18, 90)} with {rnd.choice(DIAGNOSES)} history"
+    )
+
+
+def seed_index(vs: VectorService, n: int) -> None:
+    if vs.total_indexed >= n:
+        return
+    vs.index_encounters_batch([
+        {"encounter_id": f"bench-{i}", "case_text": synthetic_case(i), "doctor_id": f"doc-{i % 5}"}
+        for i in range(n)
+    ])
+
+
+def build_app(vs: VectorService) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/similar-sync")
+    async def similar_sync(q: int = 0):
+        return vs.query_similar(synthetic_case(10_000 + q), top_k=5)
+
+    @app.get("/similar-async")
+    async def similar_async(q: int = 0):
+        return await vs.aquery_similar(synthetic_case(10_000 + q), top_k=5)
+
+    return app
+
+
+async def run(app: FastAPI, path: str, concurrency: int, seconds: float):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop_at = time.perf_counter() + seconds
+        completed = 0
+
+        async def similarity_worker(worker: int):
+            nonlocal completed
+            q = worker * 100_000
+            while time.perf_counter() < stop_at:
+                await client.get(path, params={"q": q})
+                q += 1
+                completed += 1
+                # ASGITransport never yields on its own; a real socket would
+                await asyncio.sleep(0)
+
+        async def pinger():
+            # A ping is "sent" every 10 ms; its latency is measured from when
+            # it was due, so time spent waiting for a blocked loop counts
+            latencies = []
+            due = time.perf_counter()
+            while due < stop_at:
+                await asyncio.sleep(max(due - time.perf_counter(), 0))
+                await client.get("/ping")
+                latencies.append((time.perf_counter() - due) * 1000)
+                due = max(due + 0.01, time.perf_counter())
+            return latencies
+
+        workers = [asyncio.create_task(similarity_worker(w)) for w in range(concurrency)]
+        latencies = sorted(await pinger())
+        await asyncio.gather(*workers)
+
+    def pct(p):
+        return latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)]
+
+    return pct(50), pct(99), latencies[-1], completed / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--corpus", type=int, default=2000)
+    args = parser.parse_args()
+
+    vs = VectorService.get_instance()
+    seed_index(vs, args.corpus)
+    app = build_app(vs)
+
+    print(f"corpus={vs.total_indexed}  concurrency={args.concurrency}  seconds={args.seconds}")
+    print(f"{'variant':<15} {'ping p50 ms':>12} {'ping p99 ms':>12} {'ping max ms':>12} {'similar/s':>10}")
+    for name, path in (("on event loop", "/similar-sync"), ("executor", "/similar-async")):
+        p50, p99, worst, throughput = asyncio.run(run(app, path, args.concurrency, args.seconds))
+        print(f"{name:<15} {p50:12.1f} {p99:12.1f} {worst:12.1f} {throughput:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: dense-only vs hybrid (BM25 + dense, RRF) case retrieval.
+
+Seeds ``--corpus`` synthetic encounters.  Every ``--needle-every``-th one
+also names a rare drug that appears nowhere else ("needle" cases).  Each
+query asks for one needle's drug in a free-text sentence; a hit means the
+needle case is in the top ``--top-k``.  Reports hit rate and query latency
+for
+
+  dense   ``query_similar`` with the lexical index switched off
+  hybrid  ``query_similar`` with BM25 fused by reciprocal rank fusion
+
+Query vectors are encoded once up front, so latency is the retrieval and
+fusion path only.
+
+Usage (from backend/):
+    python benchmarks/bench_hybrid_search.py --corpus 20000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench-chroma-"))
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "0")
+
+from vector_service import VectorService  # noqa: E402
+from bench_event_loop import COMPLAINTS, synthetic_case  # noqa: E402
+
+SYLLABLES = ["ta", "cro", "li", "mus", "ve", "ne", "zo", "par", "xi", "ban", "rol", "dip", "tor", "fen"]
+
+
+def drug_name(i: int) -> str:
+    rnd = random.Random(f"drug-{i}")
+    return "".join(rnd.choice(SYLLABLES) for _ in range(4)) + "ine"
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def run(vs: VectorService, queries, top_k: int):
+    hits, latencies = 0, []
+    for text, embedding, needle in queries:
+        started = time.perf_counter()
+        results = vs.query_similar(text, top_k=top_k, embedding=embedding)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += any(r["encounter_id"] == needle for r in results)
+    return hits / len(queries), percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=20_000)
+    parser.add_argument("--needle-every", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    vs = VectorService.get_instance()
+    if not vs.hybrid:
+        sys.exit("run with HYBRID_SEARCH=1")
+
+    docs = []
+    for i in range(args.corpus):
+        text = synthetic_case(i)
+        if i % args.needle_every == 0:
+            text += f" | Medications: {drug_name(i)}"
+        docs.append({"encounter_id": f"bench-{i}", "case_text": text, "doctor_id": f"doc-{i % 5}"})
+    print(f"seeding {args.corpus} encounters …")
+    for start in range(0, len(docs), 500):
+        vs.index_encounters_batch(docs[start:start + 500])
+
+    needles = list(range(0, args.corpus, args.needle_every))
+    rnd = random.Random(0)
+    picked = [rnd.choice(needles) for _ in range(args.queries)]
+    texts = [f"{rnd.choice(COMPLAINTS)} in a patient taking {drug_name(i)}" for i in picked]
+    embeddings = vs.encode_batch(texts)
+    queries = [(t, e, f"bench-{i}") for t, e, i in zip(texts, embeddings, picked)]
+
+    lexical = vs._lexical
+    vs._lexical = None
+    dense = run(vs, queries, args.top_k)
+    vs._lexical = lexical
+    hybrid = run(vs, queries, args.top_k)
+
+    print(f"\n{args.queries} queries, top-{args.top_k}, {len(needles)} needle cases")
+    print(f"{'mode':<8}{'hit rate':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for name, (rate, p50, p99) in (("dense", dense), ("hybrid", hybrid)):
+        print(f"{name:<8}{rate:>10.3f}{p50:>9.2f}{p99:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
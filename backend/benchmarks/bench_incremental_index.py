@@ -0,0 +1,70 @@
+"""
+Benchmark: full re-embed vs fingerprint-aware incremental reindex.
+
+Seeds ``--corpus`` synthetic encounters, changes ``--changed-pct`` of them,
+then times one pass over the whole corpus (in ``--page-size`` pages, as
+the backfill does) with
+
+  full         ``index_encounters_batch``   – re-embeds every encounter
+  incremental  ``index_encounters_changed`` – re-embeds only changed ones
+
+Usage (from backend/):
+    python benchmarks/bench_incremental_index.py --corpus 20000 --changed-pct 1
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench-chroma-"))
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "0")   # measure the model, not the cache
+
+from vector_service import VectorService  # noqa: E402
+from bench_event_loop import synthetic_case  # noqa: E402
+
+
+def corpus(n: int, changed_every: int = 0):
+    return [
+        {
+            "encounter_id": f"bench-{i}",
+            "case_text": synthetic_case(i) + (" | revised" if changed_every and i % changed_every == 0 else ""),
+            "text_version": 1,
+        }
+        for i in range(n)
+    ]
+
+
+def timed_pass(fn, docs, page_size: int) -> float:
+    started = time.perf_counter()
+    for start in range(0, len(docs), page_size):
+        fn(docs[start:start + page_size])
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=20_000)
+    parser.add_argument("--changed-pct", type=float, default=1.0)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+
+    vs = VectorService.get_instance()
+    base = corpus(args.corpus)
+    print(f"seeding {args.corpus} encounters …")
+    timed_pass(vs.index_encounters_batch, base, args.page_size)
+
+    changed_every = max(int(100 / args.changed_pct), 1) if args.changed_pct else 0
+    incremental_docs = corpus(args.corpus, changed_every)
+    incremental_s = timed_pass(vs.index_encounters_changed, incremental_docs, args.page_size)
+    full_s = timed_pass(vs.index_encounters_batch, base, args.page_size)
+
+    print(f"{'variant':<13}{'seconds':>9}{'docs/s':>11}")
+    print(f"{'full':<13}{full_s:>9.2f}{args.corpus / full_s:>11.0f}")
+    print(f"{'incremental':<13}{incremental_s:>9.2f}{args.corpus / incremental_s:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
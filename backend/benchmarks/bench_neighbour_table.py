@@ -0,0 +1,98 @@
+"""
+Benchmark: precomputed neighbour lists vs live similar-case search.
+
+Indexes ``--corpus`` encounters in backfill-sized pages with the neighbour
+table off and on (index cost of maintaining it), then reports
+
+  lookup p50/p99   ``precomputed_similar`` vs ``query_similar`` (stored vector)
+  recall@K         incremental lists vs exact top-K over the final corpus
+
+Vectors are synthetic clustered embeddings (``bench_vector_stores``) fed
+in place of the encoder, so index time measures the store and table work
+and recall is measured on a realistic neighbour structure.
+
+Usage (from backend/):
+    python benchmarks/bench_neighbour_table.py --corpus 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench-chroma-"))
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "0")
+
+import numpy as np  # noqa: E402
+
+from vector_service import VectorService  # noqa: E402
+from neighbour_table import NEIGHBOUR_K  # noqa: E402
+from bench_vector_stores import corpus_chunk  # noqa: E402
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=20_000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    vs = VectorService.get_instance()
+    vectors = corpus_chunk(0, args.corpus)[:, :vs._embedding_dim]
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    texts = [f"synthetic case {i}" for i in range(args.corpus)]
+    by_text = dict(zip(texts, vectors.tolist()))
+    vs.encode_batch = lambda batch: [by_text[t] for t in batch]
+
+    def index_all() -> float:
+        started = time.perf_counter()
+        for start in range(0, args.corpus, args.page_size):
+            vs.index_encounters_batch([
+                {"encounter_id": f"bench-{i}", "case_text": texts[i]}
+                for i in range(start, min(start + args.page_size, args.corpus))
+            ])
+        return time.perf_counter() - started
+
+    table = vs._neighbours
+    vs._neighbours = None
+    plain = index_all()
+    vs.reset_collection()
+    vs._neighbours = table
+    maintained = index_all()
+    print(f"index {args.corpus}: {plain:.1f} s without table, {maintained:.1f} s with table")
+
+    picks = np.random.default_rng(0).integers(0, args.corpus, args.lookups)
+    timings = {"precomputed": [], "live": []}
+    for i in picks:
+        eid, text = f"bench-{i}", texts[i]
+        started = time.perf_counter()
+        vs.precomputed_similar(eid, text, top_k=args.top_k)
+        timings["precomputed"].append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        vs.query_similar(text, top_k=args.top_k, exclude_id=eid, source_id=eid, hybrid=False)
+        timings["live"].append((time.perf_counter() - started) * 1000)
+    for name, values in timings.items():
+        print(f"{name:<12} p50 {percentile(values, 0.5):6.2f} ms   p99 {percentile(values, 0.99):6.2f} ms")
+
+    recalls = []
+    for i in picks[:200]:
+        scores = vectors @ vectors[i]
+        scores[i] = -np.inf
+        truth = {f"bench-{j}" for j in np.argsort(-scores)[:NEIGHBOUR_K]}
+        listed = [r["encounter_id"] for r in vs.precomputed_similar(f"bench-{i}", texts[i], top_k=NEIGHBOUR_K)]
+        recalls.append(len(truth & set(listed)) / NEIGHBOUR_K)
+    print(f"recall@{NEIGHBOUR_K} of incremental lists vs exact: {np.mean(recalls):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: doctor-filtered similarity queries, global filtered index vs
+per-doctor partitions (``VECTOR_PARTITIONS=doctor``).
+
+Builds a ``--corpus`` store of synthetic clustered vectors (see
+``bench_vector_stores.py``) in which a handful of doctors own
+``--doctor-sizes`` cases each and a bulk doctor owns the rest, then builds
+the partitions from it.  For every sized doctor, ``--queries`` filtered
+top-10 queries are run against
+
+  global       one index + ``doctor_id`` filter
+  partitioned  the doctor's own partition
+
+and reported as p50 / p99 latency, recall@10 against an exact search over
+that doctor's vectors, and the mean number of results returned (a filtered
+HNSW search can come back short).
+
+Usage (from backend/):
+    python benchmarks/bench_partitioned_filter.py --corpus 50000 --store chroma
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from vector_stores import open_store  # noqa: E402
+from bench_vector_stores import DIM, corpus_chunk  # noqa: E402
+
+TOP_K = 10
+
+
+def assign_doctors(corpus: int, sizes):
+    """Row → doctor id: one doctor per size (random rows), the rest to 'bulk'."""
+    doctors = np.array(["bulk"] * corpus, dtype=object)
+    rows = np.random.default_rng(1).permutation(corpus)
+    start = 0
+    for size in sizes:
+        doctors[rows[start:start + size]] = f"doctor-{size}"
+        start += size
+    return doctors
+
+
+def measure(store, queries, doctor, truth):
+    latencies, recalls, returned = [], [], []
+    for q, want in zip(queries, truth):
+        started = time.perf_counter()
+        got = store.query(q, TOP_K, doctor_id=doctor)["ids"]
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(set(got) & want) / len(want))
+        returned.append(len(got))
+    latencies.sort()
+    return (
+        latencies[len(latencies) // 2],
+        latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)],
+        float(np.mean(recalls)),
+        float(np.mean(returned)),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=50_000)
+    parser.add_argument("--doctor-sizes", default="5,20,100,500,2000,8000")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--store", default="chroma", choices=["chroma", "numpy"])
+    parser.add_argument("--chunk", type=int, default=5000)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.doctor_sizes.split(",")]
+    doctors = assign_doctors(args.corpus, sizes)
+    directory = tempfile.mkdtemp(prefix="bench-partitions-")
+
+    flat = open_store(directory, "bench_cases", DIM, kind=args.store, partitions="none")
+    vectors = np.empty((args.corpus, DIM), dtype=np.float32)
+    started = time.perf_counter()
+    for start in range(0, args.corpus, args.chunk):
+        stop = min(start + args.chunk, args.corpus)
+        vectors[start:stop] = corpus_chunk(start, stop)
+        flat.upsert(
+            [f"e{i}" for i in range(start, stop)],
+            vectors[start:stop],
+            [""] * (stop - start),
+            [{"doctor_id": doctors[i]} for i in range(start, stop)],
+        )
+    print(f"global build      {time.perf_counter() - started:7.1f} s  ({args.corpus} vectors)")
+
+    started = time.perf_counter()
+    partitioned = open_store(directory, "bench_cases", DIM, kind=args.store, partitions="doctor")
+    print(f"partition build   {time.perf_counter() - started:7.1f} s  ({len(sizes) + 1} partitions)\n")
+
+    print(f"{'doctor size':>11}  {'mode':<12}{'p50 ms':>8}{'p99 ms':>8}{'recall':>8}{'returned':>10}")
+    rng = np.random.default_rng(2)
+    for size in sizes:
+        doctor = f"doctor-{size}"
+        rows = np.flatnonzero(doctors == doctor)
+        # Queries near this doctor's own cases, as for a similar-case lookup
+        queries = vectors[rng.choice(rows, args.queries)] + 0.3 * rng.standard_normal(
+            (args.queries, DIM)
+        ).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        scores = queries @ vectors[rows].T
+        truth = [
+            {f"e{rows[j]}" for j in np.argsort(-s)[:min(TOP_K, rows.size)]} for s in scores
+        ]
+        for mode, store in (("global", flat), ("partitioned", partitioned)):
+            p50, p99, recall, returned = measure(store, queries, doctor, truth)
+            print(f"{size:>11}  {mode:<12}{p50:>8.2f}{p99:>8.2f}{recall:>8.3f}{returned:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
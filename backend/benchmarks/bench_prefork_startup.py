@@ -0,0 +1,132 @@
+"""
+Benchmark: startup time and memory of the pre-fork server (``serve.py``).
+
+With one worker the worker owns the vector store and loads the model
+(``local``).  More workers need one owner of the store, so those runs
+start ``vector_sidecar.py`` first and set ``VECTOR_SERVICE=sidecar``; the
+sidecar, which holds the model, is counted in the total.  The workers
+share the app imported by the parent.
+
+For every ``--workers`` count, starts ``serve.py`` on a fresh
+index, waits for its "workers ready" log line, then sends ``--requests``
+free-text searches and measures again, to show how much of the sharing
+survives traffic (copy-on-write pages dirtied by refcounts, allocations).
+Reports
+
+  ready s        launch → every worker serving (from serve.py's log;
+                 sidecar start-up included)
+  worker PSS     mean proportional set size per worker, at ready / after load
+  total PSS      parent + workers (+ sidecar), at ready / after load
+
+Usage (from backend/):
+    python benchmarks/bench_prefork_startup.py --workers 1,2,4
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_vector_sidecar import descendants, free_port, pss_mb, wait_for  # noqa: E402
+
+READY = re.compile(r"(\d+) workers ready ([\d.]+) s after launch")
+
+
+def total_pss(parent: int, sidecar: int = 0):
+    workers = [pss_mb(pid) for pid in descendants(parent)]
+    extra = pss_mb(sidecar) if sidecar else 0.0
+    return sum(workers) / max(len(workers), 1), sum(workers) + pss_mb(parent) + extra
+
+
+async def searches(port: int, n: int, concurrency: int) -> None:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120) as http:
+        queue = list(range(n))
+
+        async def client():
+            while queue:
+                i = queue.pop()
+                r = await http.post("/case-similarity/search", json={"query": f"chest pain case {i}", "top_k": 5})
+                r.raise_for_status()
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+
+def run(workers: int, mode: str, args):
+    port = free_port()
+    log = tempfile.NamedTemporaryFile("w+", prefix="bench-prefork-", suffix=".log")
+    cmd = [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port)]
+    env = {**os.environ, "CHROMA_PERSIST_DIR": tempfile.mkdtemp(prefix="bench-prefork-")}
+    sidecar = None
+    if mode == "sidecar":
+        env["VECTOR_SERVICE"] = "sidecar"
+        env["VECTOR_SIDECAR_ADDRESS"] = os.path.join(env["CHROMA_PERSIST_DIR"], "sidecar.sock")
+        started = time.monotonic()
+        sidecar = subprocess.Popen(
+            [sys.executable, "vector_sidecar.py"], cwd=BACKEND_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+        def sidecar_up():
+            with socket.socket(socket.AF_UNIX) as s:
+                return s.connect_ex(env["VECTOR_SIDECAR_ADDRESS"]) == 0
+
+        wait_for(sidecar_up, 300, "the sidecar")
+        sidecar_s = time.monotonic() - started
+    server = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        ready = {}
+
+        def is_ready():
+            if server.poll() is not None:
+                raise SystemExit(f"serve.py exited ({server.returncode}), see {log.name}")
+            log.seek(0)
+            match = READY.search(log.read())
+            if match:
+                ready["s"] = float(match.group(2))
+            return bool(match)
+
+        wait_for(is_ready, 600, "serve.py")
+        time.sleep(1.0)
+        at_ready = total_pss(server.pid, sidecar.pid if sidecar else 0)
+        asyncio.run(searches(port, args.requests, args.concurrency))
+        after_load = total_pss(server.pid, sidecar.pid if sidecar else 0)
+        return ready["s"] + (sidecar_s if sidecar else 0.0), at_ready, after_load
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+        if sidecar is not None:
+            sidecar.send_signal(signal.SIGTERM)
+            sidecar.wait(timeout=60)
+        log.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'workers':>8}{'ready s':>9}{'worker PSS MB':>20}{'total PSS MB':>20}")
+    print(f"{'':<27}{'ready / after load':>20}{'ready / after load':>20}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        mode = "local" if workers == 1 else "sidecar"
+        ready_s, (w0, t0), (w1, t1) = run(workers, mode, args)
+        print(f"{mode:<10}{workers:>8}{ready_s:>9.1f}{w0:>11.0f} / {w1:<6.0f}{t0:>12.0f} / {t1:<6.0f}")
+
+
+if __name__ == "__main__":
+    main()
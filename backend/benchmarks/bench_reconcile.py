@@ -0,0 +1,135 @@
+"""
+Benchmark: bucketed reconciliation (``reconciler.py``) vs a full reindex
+pass, for an index that has drifted from the encounters table.
+
+Seeds ``--corpus`` synthetic encounters into a fresh index and an
+in-memory stand-in for the ``encounters`` table, then introduces
+``--drift`` of each kind of drift:
+
+  missing   rows whose auto-index failed (removed from the index)
+  stale     rows edited after they were indexed
+  orphaned  index documents whose rows were deleted
+
+and times, on identical copies of that state,
+
+  reindex    the ``index-all`` pass: every page through
+             ``index_encounters_changed`` (fingerprint lookups for every
+             row; orphans are not found)
+  reconcile  ``reconcile()``: bucket digests, then a diff and repair of the
+             mismatched buckets only
+
+A dry run first reports how many buckets and encounters had to be diffed.
+
+Usage (from backend/):
+    python benchmarks/bench_reconcile.py --corpus 20000 --drift 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench-chroma-"))
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "0")   # measure the model, not the cache
+
+from case_text import case_document  # noqa: E402
+from reconciler import RECONCILE_BUCKETS, reconcile  # noqa: E402
+from vector_service import VectorService  # noqa: E402
+from bench_event_loop import synthetic_case  # noqa: E402
+
+
+def row(i: int, suffix: str = "") -> dict:
+    return {
+        "id": f"enc-{i:08d}",
+        "doctor_id": f"doc-{i % 20}",
+        "patient_id": f"pat-{i}",
+        "chief_complaint": synthetic_case(i) + suffix,
+        "diagnosis": f"diagnosis {i % 97}",
+    }
+
+
+class Table:
+    """The encounters table, with keyset paging and by-id reads like ``apis/case_similarity``."""
+
+    def __init__(self, rows):
+        self.rows = {r["id"]: r for r in rows}
+        self.reads = 0
+
+    def fetch_page(self, after_id, page_size):
+        ids = sorted(eid for eid in self.rows if after_id is None or eid > after_id)[:page_size]
+        self.reads += len(ids)
+        return [self.rows[eid] for eid in ids]
+
+    def fetch_rows(self, ids):
+        self.reads += len(ids)
+        return [self.rows[eid] for eid in ids if eid in self.rows]
+
+
+def drifted_state(vs, args):
+    """Reset the index to the drifted state; returns the table."""
+    vs.reset_collection()
+    rows = [row(i) for i in range(args.corpus)]
+    docs = [case_document(r) for r in rows]
+    for start in range(0, len(docs), args.page_size):
+        vs.index_encounters_batch(docs[start:start + args.page_size])
+
+    step = max(args.corpus // (3 * args.drift), 1)
+    picks = list(range(0, args.corpus, step))[:3 * args.drift]
+    missing, stale, orphaned = picks[0::3], picks[1::3], picks[2::3]
+    vs.delete_encounters([rows[i]["id"] for i in missing])
+    for i in stale:
+        rows[i] = row(i, " | revised")
+    deleted = {rows[i]["id"] for i in orphaned}
+    return Table(r for r in rows if r["id"] not in deleted)
+
+
+def full_pass(vs, table, page_size):
+    after = None
+    indexed = 0
+    while True:
+        page = table.fetch_page(after, page_size)
+        if not page:
+            return indexed
+        page_indexed, _ = vs.index_encounters_changed([case_document(r) for r in page])
+        indexed += page_indexed
+        after = page[-1]["id"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=20_000)
+    parser.add_argument("--drift", type=int, default=10, help="encounters of each drift kind")
+    parser.add_argument("--buckets", type=int, default=RECONCILE_BUCKETS)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+
+    vs = VectorService.get_instance()
+    print(f"seeding {args.corpus} encounters, {args.drift} missing / stale / orphaned …")
+
+    table = drifted_state(vs, args)
+    report = reconcile(vs, table.fetch_page, table.fetch_rows, args.buckets, args.page_size, dry_run=True)
+    print(f"dry run: {report['mismatched_buckets']}/{report['buckets']} buckets differ, "
+          f"{report['diffed']} of {report['table_rows']} encounters diffed; "
+          f"missing {report['missing']}, stale {report['stale']}, orphaned {report['orphaned']}")
+
+    started = time.perf_counter()
+    reindexed = full_pass(vs, table, args.page_size)
+    reindex_s = time.perf_counter() - started
+    reindex_left = vs.total_indexed - len(table.rows)
+
+    table = drifted_state(vs, args)
+    result = reconcile(vs, table.fetch_page, table.fetch_rows, args.buckets, args.page_size)
+    reconcile_left = vs.total_indexed - len(table.rows)
+    check = reconcile(vs, table.fetch_page, table.fetch_rows, args.buckets, args.page_size, dry_run=True)
+
+    print(f"{'variant':<11}{'seconds':>9}{'embedded':>10}{'deleted':>9}{'orphans left':>14}")
+    print(f"{'reindex':<11}{reindex_s:>9.2f}{reindexed:>10}{0:>9}{reindex_left:>14}")
+    print(f"{'reconcile':<11}{result['elapsed_s']:>9.2f}{result['reindexed']:>10}"
+          f"{result['deleted']:>9}{reconcile_left:>14}")
+    print(f"after reconcile: {check['mismatched_buckets']} buckets differ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: N × ``query_similar`` vs one ``query_similar_batch``.
+
+Seeds ``--corpus`` synthetic encounters and looks up the similar cases of
+``--batch`` of them, first one call per encounter (what case review did
+through ``/similar/{id}``), then in one batched call.  Both reuse the
+stored vectors, so the difference is the vector-store round trips.  The
+Supabase round trips the batch endpoint also saves are not included.
+
+Usage (from backend/):
+    python benchmarks/bench_similar_batch.py --corpus 20000 --batch 10,50,100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench-chroma-"))
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "0")
+
+from vector_service import VectorService  # noqa: E402
+from bench_event_loop import synthetic_case  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=20_000)
+    parser.add_argument("--batch", default="10,50,100")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--same-doctor", action="store_true")
+    args = parser.parse_args()
+
+    vs = VectorService.get_instance()
+    print(f"seeding {args.corpus} encounters …")
+    for start in range(0, args.corpus, 500):
+        vs.index_encounters_batch([
+            {"encounter_id": f"bench-{i}", "case_text": synthetic_case(i), "doctor_id": f"doc-{i % 5}"}
+            for i in range(start, min(start + 500, args.corpus))
+        ])
+
+    print(f"\n{'batch':>6}{'single s':>10}{'batched s':>11}{'speed-up':>10}")
+    for size in (int(b) for b in args.batch.split(",")):
+        encounters = [
+            {"encounter_id": f"bench-{i}", "case_text": synthetic_case(i), "doctor_id": f"doc-{i % 5}"}
+            for i in range(0, size * 97, 97)
+        ]
+        started = time.perf_counter()
+        for e in encounters:
+            vs.query_similar(
+                e["case_text"],
+                top_k=args.top_k,
+                exclude_id=e["encounter_id"],
+                doctor_id=e["doctor_id"] if args.same_doctor else None,
+                source_id=e["encounter_id"],
+            )
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        vs.query_similar_batch(encounters, top_k=args.top_k, same_doctor_only=args.same_doctor)
+        batched = time.perf_counter() - started
+        print(f"{size:>6}{single:>10.3f}{batched:>11.3f}{single / batched:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
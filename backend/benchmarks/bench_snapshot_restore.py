@@ -0,0 +1,79 @@
+"""
+Benchmark: bringing up a node by re-indexing vs importing a snapshot.
+
+Seeds ``--corpus`` synthetic encounters into a fresh index with
+``index_encounters_batch`` (BERT encoding + upserts — the work ``index-all``
+does per page, minus the Supabase reads), exports a snapshot, then imports
+it into another fresh index in a child process (a new node).  Reports
+
+  reindex s     encode + upsert of the whole corpus
+  export s      snapshot write, and its size
+  import s      snapshot bulk upsert on the new node
+
+Usage (from backend/):
+    python benchmarks/bench_snapshot_restore.py --corpus 20000
+    VECTOR_STORE=numpy python benchmarks/bench_snapshot_restore.py --corpus 20000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault("CHROMA_PERSIST_DIR", tempfile.mkdtemp(prefix="bench-snapshot-"))
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "0")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=20_000)
+    parser.add_argument("--page", type=int, default=500)
+    parser.add_argument("--import-from", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    from vector_service import VectorService
+
+    vs = VectorService.get_instance()
+    if args.import_from:
+        print(json.dumps(vs.import_snapshot(args.import_from, replace=True)))
+        return
+
+    from bench_event_loop import synthetic_case
+
+    docs = [
+        {"encounter_id": f"bench-{i}", "case_text": synthetic_case(i), "doctor_id": f"doc-{i % 20}"}
+        for i in range(args.corpus)
+    ]
+    started = time.perf_counter()
+    for start in range(0, len(docs), args.page):
+        vs.index_encounters_batch(docs[start:start + args.page])
+    reindex_s = time.perf_counter() - started
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-snapshot-file-"), "vectors.zip")
+    started = time.perf_counter()
+    vs.export_snapshot(path)
+    export_s = time.perf_counter() - started
+
+    child = subprocess.run(
+        [sys.executable, __file__, "--import-from", path],
+        capture_output=True, text=True, check=True, cwd=BACKEND_DIR,
+        env={**os.environ, "CHROMA_PERSIST_DIR": tempfile.mkdtemp(prefix="bench-snapshot-node-")},
+    )
+    imported = json.loads(child.stdout.strip().splitlines()[-1])
+
+    print(f"{args.corpus} encounters, store {vs.stats['vector_store']['store']}")
+    print(f"reindex   {reindex_s:8.1f} s  ({args.corpus / reindex_s:,.0f}/s)")
+    print(f"export    {export_s:8.1f} s  ({os.path.getsize(path) / 1e6:.1f} MB)")
+    print(f"import    {imported['elapsed_s']:8.1f} s  ({imported['imported']} vectors, "
+          f"{reindex_s / max(imported['elapsed_s'], 1e-9):.1f}× faster than reindex)")
+
+
+if __name__ == "__main__":
+    main()
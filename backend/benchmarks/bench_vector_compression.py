@@ -0,0 +1,171 @@
+"""
+Benchmark: recall@10 vs memory for the NumPy store's compression modes
+(``VECTOR_COMPRESSION``).
+
+Uses the synthetic corpus and query set of ``bench_vector_stores.py``;
+``--query-noise`` pushes the queries further from the stored vectors, which
+is where PQ loses recall first.  Each ``--configs`` entry is built once in a
+child process and then served from a fresh one per re-rank depth, so RSS
+reflects a serving worker.  Entries:
+
+  float32 | float16          exact scan of the matrix
+  pq:<subvectors>            PQ codes, re-ranked from the float16 matrix at
+                             every ``--rerank`` depth
+
+Reports bytes scanned per vector, the in-memory size of what every query
+scans (matrix or codes), serving RSS split into anonymous memory and
+file-backed pages (the memory-mapped matrix; shared between workers and
+reclaimable), p50 / p99 latency and recall@10 against exact float32 search.
+
+Usage (from backend/):
+    python benchmarks/bench_vector_compression.py --corpus 100000 \\
+        --configs float32,float16,pq:48,pq:96 --rerank 200,1000,3000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_vector_stores import DIM, TOP_K, corpus_chunk, query_set  # noqa: E402
+
+
+def queries_with_noise(n: int, noise: float) -> np.ndarray:
+    q = query_set(n)
+    q += noise * np.random.default_rng(11).standard_normal(q.shape).astype(np.float32)
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def ground_truth(corpus: int, qs: np.ndarray, chunk: int) -> np.ndarray:
+    scores_parts, ids_parts = [], []
+    for start in range(0, corpus, chunk):
+        stop = min(start + chunk, corpus)
+        scores = qs @ corpus_chunk(start, stop).T
+        top = np.argsort(-scores, axis=1)[:, :TOP_K]
+        scores_parts.append(np.take_along_axis(scores, top, axis=1))
+        ids_parts.append(top + start)
+    scores = np.concatenate(scores_parts, axis=1)
+    order = np.argsort(-scores, axis=1)[:, :TOP_K]
+    return np.take_along_axis(np.concatenate(ids_parts, axis=1), order, axis=1)
+
+
+def rss_mb() -> dict:
+    """Current anonymous / file-backed resident memory (Linux), else peak RSS."""
+    try:
+        with open("/proc/self/status") as fh:
+            fields = dict(line.split(":", 1) for line in fh)
+        return {key: int(fields[f"Rss{key.title()}"].split()[0]) / 1024 for key in ("anon", "file")}
+    except (OSError, KeyError):
+        return {"anon": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "file": 0.0}
+
+
+def open_store(directory: str):
+    from vector_stores import NumpyStore
+
+    return NumpyStore(directory, DIM)
+
+
+def build(directory: str, corpus: int, chunk: int) -> dict:
+    store = open_store(directory)
+    started = time.perf_counter()
+    for start in range(0, corpus, chunk):
+        stop = min(start + chunk, corpus)
+        store.upsert(
+            [f"e{i}" for i in range(start, stop)],
+            corpus_chunk(start, stop),
+            [""] * (stop - start),
+            [{"doctor_id": ""}] * (stop - start),
+        )
+    return {"build_s": time.perf_counter() - started, "stats": store.stats}
+
+
+def serve(directory: str, queries: int, noise: float) -> dict:
+    store = open_store(directory)
+    latencies, results = [], []
+    for q in queries_with_noise(queries, noise):
+        t0 = time.perf_counter()
+        r = store.query(q, TOP_K)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results.append([int(e[1:]) for e in r["ids"]])
+    latencies.sort()
+    return {
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)],
+        "results": results,
+        "rss_mb": rss_mb(),
+    }
+
+
+def run_child(phase: str, directory: str, env: dict, args) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--phase", phase, "--dir", directory,
+         "--corpus", str(args.corpus), "--queries", str(args.queries), "--chunk", str(args.chunk),
+         "--query-noise", str(args.query_noise)],
+        capture_output=True, text=True, check=True, cwd=BACKEND_DIR, env={**os.environ, **env},
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--query-noise", type=float, default=0.0)
+    parser.add_argument("--configs", default="float32,float16,pq:48,pq:96")
+    parser.add_argument("--rerank", default="200,1000,3000", help="PQ re-rank depths to serve with")
+    parser.add_argument("--phase", help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase == "build":
+        print(json.dumps(build(args.dir, args.corpus, args.chunk)))
+        return
+    if args.phase == "serve":
+        print(json.dumps(serve(args.dir, args.queries, args.query_noise)))
+        return
+
+    truth = ground_truth(args.corpus, queries_with_noise(args.queries, args.query_noise), args.chunk)
+    print(f"{args.corpus} vectors × {DIM}, {args.queries} queries (noise {args.query_noise}), top-{TOP_K}")
+    print(f"{'config':<16}{'B/vec':>7}{'scan MB':>9}{'build s':>9}{'anon MB':>9}{'file MB':>9}"
+          f"{'p50 ms':>8}{'p99 ms':>8}{'recall':>8}")
+    for config in args.configs.split(","):
+        compression, _, subvectors = config.partition(":")
+        env = {"VECTOR_COMPRESSION": compression, "PQ_TRAIN_ROWS": str(min(10_000, args.corpus))}
+        if subvectors:
+            env["PQ_SUBVECTORS"] = subvectors
+        directory = tempfile.mkdtemp(prefix=f"bench-compression-{compression}-")
+        built = run_child("build", directory, env, args)
+        stats = built["stats"]
+        if compression == "pq":
+            per_vector, scanned = int(subvectors or 96), stats["codes_mb"]
+            depths = [int(d) for d in args.rerank.split(",")]
+        else:
+            per_vector, scanned = DIM * (4 if compression == "float32" else 2), stats["matrix_mb"]
+            depths = [None]
+        for depth in depths:
+            served = run_child("serve", directory, {**env, "PQ_RERANK": str(depth or 0)}, args)
+            recall = np.mean([
+                len(set(got) & set(want.tolist())) / TOP_K
+                for got, want in zip(served["results"], truth)
+            ])
+            label = f"{config} r{depth}" if depth else config
+            rss = served["rss_mb"]
+            print(f"{label:<16}{per_vector:>7}{scanned:>9.1f}{built['build_s']:>9.1f}"
+                  f"{rss['anon']:>9.0f}{rss['file']:>9.0f}"
+                  f"{served['p50']:>8.2f}{served['p99']:>8.2f}{recall:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
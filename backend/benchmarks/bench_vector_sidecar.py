@@ -0,0 +1,208 @@
+"""
+Benchmark: per-worker memory and throughput of similar-case search with an
+in-process ``VectorService`` per uvicorn worker vs one shared sidecar
+(``VECTOR_SERVICE=sidecar``, see ``vector_sidecar.py``).
+
+Seeds ``--corpus`` synthetic encounters once, then for every mode and
+``--workers`` count starts ``uvicorn --workers N`` on a minimal app whose
+single endpoint calls ``VectorService.aget_instance().aquery_similar`` —
+the path ``/case-similarity/search`` takes.  After a warm-up that loads the
+service in every worker, ``--concurrency`` clients send free-text searches
+for ``--duration`` seconds.  Reports
+
+  worker PSS    mean proportional set size of one worker (shared pages split)
+  total PSS     all workers + the sidecar
+  req/s, p50    throughput and median latency
+
+Usage (from backend/):
+    python benchmarks/bench_vector_sidecar.py --workers 1,4,8 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fastapi import FastAPI  # noqa: E402
+
+from bench_event_loop import COMPLAINTS, synthetic_case  # noqa: E402
+
+app = FastAPI()
+
+
+@app.post("/search")
+async def search(body: dict):
+    from vector_service import VectorService
+
+    vs = await VectorService.aget_instance()
+    return await vs.aquery_similar(body["query"], top_k=5)
+
+
+# ---------------------------------------------------------------------------
+# Process helpers
+# ---------------------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def descendants(pid: int):
+    out = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as fh:
+            for child in fh.read().split():
+                out.append(int(child))
+                out.extend(descendants(int(child)))
+    return out
+
+
+def pss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/smaps_rollup") as fh:
+        for line in fh:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def worker_pids(master: int):
+    # uvicorn's workers are the children running the app; skip helpers
+    # (e.g. multiprocessing's resource tracker).  With --workers 1 the
+    # master serves the app itself.
+    pids = []
+    for pid in descendants(master):
+        with open(f"/proc/{pid}/cmdline", "rb") as fh:
+            if b"resource_tracker" not in fh.read():
+                pids.append(pid)
+    return pids or [master]
+
+
+def wait_for(check, timeout: float, what: str) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return
+        time.sleep(0.5)
+    raise SystemExit(f"timed out waiting for {what}")
+
+
+# ---------------------------------------------------------------------------
+# Load
+# ---------------------------------------------------------------------------
+
+async def load(port: int, concurrency: int, duration: float):
+    import httpx
+
+    latencies = []
+    deadline = time.monotonic() + duration
+    rnd = random.Random(0)
+
+    async def client(http):
+        while time.monotonic() < deadline:
+            query = f"{rnd.choice(COMPLAINTS)} case {rnd.randrange(10**6)}"
+            started = time.perf_counter()
+            r = await http.post("/search", json={"query": query})
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120) as http:
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+    latencies.sort()
+    return len(latencies) / duration, latencies[len(latencies) // 2] if latencies else 0.0
+
+
+def run(mode: str, workers: int, args, env: dict):
+    env = {**env, "VECTOR_SERVICE": mode}
+    sidecar = None
+    if mode == "sidecar":
+        sidecar = subprocess.Popen(
+            [sys.executable, "vector_sidecar.py"], cwd=BACKEND_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        def sidecar_up():
+            with socket.socket(socket.AF_UNIX) as s:
+                return s.connect_ex(env["VECTOR_SIDECAR_ADDRESS"]) == 0
+
+        wait_for(sidecar_up, 120, "the sidecar")
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "bench_vector_sidecar:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BENCH_DIR, env={**env, "PYTHONPATH": BACKEND_DIR},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        def listening():
+            with socket.socket() as s:
+                return s.connect_ex(("127.0.0.1", port)) == 0
+
+        wait_for(listening, 120, "uvicorn")
+        # Warm-up: enough concurrent requests that every worker loads its service
+        asyncio.run(load(port, workers * 4, args.warmup))
+        throughput, p50 = asyncio.run(load(port, args.concurrency, args.duration))
+        workers_pss = [pss_mb(pid) for pid in worker_pids(server.pid)]
+        total = sum(workers_pss) + (pss_mb(sidecar.pid) if sidecar else 0.0)
+        return sum(workers_pss) / max(len(workers_pss), 1), total, throughput, p50
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.wait(timeout=60)
+        if sidecar:
+            sidecar.terminate()
+            sidecar.wait(timeout=60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=5000)
+    parser.add_argument("--workers", default="1,4,8")
+    parser.add_argument("--modes", default="local,sidecar")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=10.0)
+    parser.add_argument("--seed-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed_only:
+        from vector_service import VectorService
+
+        vs = VectorService.get_local_instance()
+        docs = [{"encounter_id": f"bench-{i}", "case_text": synthetic_case(i)} for i in range(args.corpus)]
+        for start in range(0, len(docs), 500):
+            vs.index_encounters_batch(docs[start:start + 500])
+        return
+
+    persist = tempfile.mkdtemp(prefix="bench-sidecar-")
+    env = {
+        **os.environ,
+        "CHROMA_PERSIST_DIR": persist,
+        "VECTOR_SIDECAR_ADDRESS": os.path.join(persist, "sidecar.sock"),
+        "EMBEDDING_CACHE_ENABLED": "0",   # every search encodes
+    }
+    subprocess.run(
+        [sys.executable, __file__, "--seed-only", "--corpus", str(args.corpus)],
+        env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    print(f"{args.corpus} cases, {args.concurrency} concurrent clients, {args.duration:.0f} s per run")
+    print(f"{'mode':<9}{'workers':>8}{'worker PSS MB':>15}{'total PSS MB':>14}{'req/s':>8}{'p50 ms':>9}")
+    for mode in args.modes.split(","):
+        for workers in (int(w) for w in args.workers.split(",")):
+            worker_pss, total, throughput, p50 = run(mode, workers, args, env)
+            print(f"{mode:<9}{workers:>8}{worker_pss:>15.0f}{total:>14.0f}{throughput:>8.1f}{p50:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark: NumPy exact (mmap float16) store vs ChromaDB (HNSW).
+
+Synthetic clustered, L2-normalised vectors (default 100k × 384) are loaded
+into each store.  A fresh process then opens the store and runs the query
+set, so RSS reflects a serving worker rather than the build.  Reports
+
+  build s       time to upsert the corpus (chunks of --chunk)
+  rss MB        RSS of the serving process after the queries
+  p50/p99 ms    query latency, top-10, unfiltered and doctor-filtered
+  recall@10     overlap with exact float32 ground truth
+
+Usage (from backend/):
+    python benchmarks/bench_vector_stores.py --corpus 100000 --queries 200
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DIM = 384
+DOCTORS = 50
+TOP_K = 10
+
+
+def corpus_chunk(start: int, stop: int, clusters: int = 2000) -> np.ndarray:
+    """Deterministic clustered vectors for rows [start, stop) (seeded per chunk)."""
+    centers = np.random.default_rng(0).standard_normal((clusters, DIM)).astype(np.float32)
+    rng = np.random.default_rng(start + 1)
+    rows = centers[rng.integers(0, clusters, stop - start)] + 0.6 * rng.standard_normal((stop - start, DIM)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def query_set(n: int) -> np.ndarray:
+    q = corpus_chunk(10_000_000, 10_000_000 + n)
+    q += 0.1 * np.random.default_rng(7).standard_normal(q.shape).astype(np.float32)
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def doctor_of(i: int) -> str:
+    return f"doc-{i % DOCTORS}"
+
+
+def open_store(kind: str, directory: str):
+    from vector_stores import ChromaStore, NumpyStore
+
+    if kind == "numpy":
+        return NumpyStore(os.path.join(directory, "numpy"), DIM)
+    return ChromaStore(os.path.join(directory, "chroma"), "bench_vectors")
+
+
+def build(kind: str, directory: str, corpus: int, chunk: int) -> dict:
+    store = open_store(kind, directory)
+    started = time.perf_counter()
+    for start in range(0, corpus, chunk):
+        stop = min(start + chunk, corpus)
+        store.upsert(
+            [f"e{i}" for i in range(start, stop)],
+            corpus_chunk(start, stop),
+            [""] * (stop - start),
+            [{"doctor_id": doctor_of(i)} for i in range(start, stop)],
+        )
+    return {"build_s": time.perf_counter() - started}
+
+
+def serve(kind: str, directory: str, queries: int) -> dict:
+    store = open_store(kind, directory)
+    qs = query_set(queries)
+    out = {}
+    for label, doctor in (("all", None), ("doctor", "doc-3")):
+        latencies, results = [], []
+        for q in qs:
+            t0 = time.perf_counter()
+            r = store.query(q, TOP_K, doctor_id=doctor)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            results.append([int(e[1:]) for e in r["ids"]])
+        latencies.sort()
+        out[label] = {
+            "p50": latencies[len(latencies) // 2],
+            "p99": latencies[int(len(latencies) * 0.99) - 1],
+            "results": results,
+        }
+    out["rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return out
+
+
+def ground_truth(corpus: int, queries: int, chunk: int):
+    qs = query_set(queries)
+    best = {"all": None, "doctor": None}
+    for label in best:
+        scores_parts, ids_parts = [], []
+        for start in range(0, corpus, chunk):
+            stop = min(start + chunk, corpus)
+            ids = np.arange(start, stop)
+            block = corpus_chunk(start, stop)
+            if label == "doctor":
+                keep = ids % DOCTORS == 3
+                ids, block = ids[keep], block[keep]
+            scores = qs @ block.T
+            top = np.argsort(-scores, axis=1)[:, :TOP_K]
+            scores_parts.append(np.take_along_axis(scores, top, axis=1))
+            ids_parts.append(ids[top])
+        scores = np.concatenate(scores_parts, axis=1)
+        ids = np.concatenate(ids_parts, axis=1)
+        order = np.argsort(-scores, axis=1)[:, :TOP_K]
+        best[label] = np.take_along_axis(ids, order, axis=1)
+    return best
+
+
+def child(args) -> None:
+    if args.phase == "build":
+        result = build(args.child, args.dir, args.corpus, args.chunk)
+    else:
+        result = serve(args.child, args.dir, args.queries)
+    print(json.dumps(result))
+
+
+def run_child(kind: str, phase: str, directory: str, args) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", kind, "--phase", phase, "--dir", directory,
+         "--corpus", str(args.corpus), "--queries", str(args.queries), "--chunk", str(args.chunk)],
+        capture_output=True, text=True, check=True, cwd=BACKEND_DIR,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--stores", default="numpy,chroma")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--phase", help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    truth = ground_truth(args.corpus, args.queries, args.chunk)
+    print(f"{args.corpus} vectors × {DIM}, {args.queries} queries, top-{TOP_K}")
+    print(f"{'store':<8}{'build s':>9}{'rss MB':>8}{'p50 ms':>8}{'p99 ms':>8}{'recall':>8}"
+          f"{'doc p50':>9}{'doc p99':>9}{'doc rec':>9}")
+    for kind in args.stores.split(","):
+        directory = tempfile.mkdtemp(prefix=f"bench-{kind}-")
+        built = run_child(kind, "build", directory, args)
+        served = run_child(kind, "serve", directory, args)
+        recall = {
+            label: np.mean([
+                len(set(got) & set(want.tolist())) / TOP_K
+                for got, want in zip(served[label]["results"], truth[label])
+            ])
+            for label in ("all", "doctor")
+        }
+        print(f"{kind:<8}{built['build_s']:>9.1f}{served['rss_mb']:>8.0f}"
+              f"{served['all']['p50']:>8.2f}{served['all']['p99']:>8.2f}{recall['all']:>8.3f}"
+              f"{served['doctor']['p50']:>9.2f}{served['doctor']['p99']:>9.2f}{recall['doctor']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
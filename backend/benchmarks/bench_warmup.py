@@ -0,0 +1,84 @@
+"""
+Benchmark: latency of the first similar-case search after startup, with
+and without the startup warmup (``warmup.py``).
+
+Starts ``uvicorn main:app`` on a fresh index for each mode, polls
+``/health/ready`` until it answers 200 (the load balancer's view), then
+times the first and second ``POST /case-similarity/search``.  Without
+warmup (``WARMUP_TASKS=`` empty) the worker reports ready at once and the
+first search loads the model and opens the store.  Reports
+
+  ready s       process start → /health/ready 200
+  first ms      first search after ready
+  second ms     the next one (steady state)
+
+Supabase / Groq keys are left unset, so those warmup tasks are skipped.
+
+Usage (from backend/):
+    python benchmarks/bench_warmup.py
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_vector_sidecar import free_port, wait_for  # noqa: E402
+
+
+def run(warm: bool, runs: int):
+    import httpx
+
+    port = free_port()
+    env = {
+        k: v for k, v in os.environ.items()
+        if k not in ("SUPABASE_URL", "SUPABASE_SECRET_KEY", "SUPABASE_PUBLISHABLE_KEY", "GROQ_API_KEY")
+    }
+    env["CHROMA_PERSIST_DIR"] = tempfile.mkdtemp(prefix="bench-warmup-")
+    if not warm:
+        env["WARMUP_TASKS"] = ""
+    started = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=300) as http:
+            def ready():
+                try:
+                    return http.get("/health/ready").status_code == 200
+                except httpx.TransportError:
+                    return False
+
+            wait_for(ready, 600, "readiness")
+            ready_s = time.monotonic() - started
+            latencies = []
+            for i in range(runs):
+                t0 = time.perf_counter()
+                http.post("/case-similarity/search", json={"query": f"chest pain {i}", "top_k": 5}).raise_for_status()
+                latencies.append((time.perf_counter() - t0) * 1000)
+        return ready_s, latencies
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=2, help="searches timed after ready")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'ready s':>9}{'first ms':>10}{'second ms':>11}")
+    for warm in (False, True):
+        ready_s, latencies = run(warm, max(args.runs, 2))
+        print(f"{'warmup' if warm else 'cold':<10}{ready_s:>9.1f}{latencies[0]:>10.0f}{latencies[1]:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
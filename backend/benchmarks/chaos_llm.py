@@ -0,0 +1,146 @@
+"""
+Chaos test: tail latency of LLM calls while the provider browns out.
+
+Starts ``fake_llm_server`` in-process, browned out so that a share of
+requests hang (``--slow-rate``/``--slow-s``) or fail (``--error-rate``),
+then fires the same concurrent load through
+
+  * ``unguarded`` — a bare OpenAI client (the old per-module setup),
+  * ``breaker``   — ``llm_client.LLMClient`` (timeout + bulkhead + breaker), and
+  * ``hedged``    — ``LLMClient.create_hedged``: a request that has not
+                    answered after ``--hedge-after-s`` is also sent to a
+                    second model, and the first answer wins,
+
+and prints latency percentiles for each.  With the breaker the worst case is
+bounded by the timeout / fast-fail path instead of by the provider; hedging
+also cuts the tail below the timeout, since the fake server slows requests
+down independently of each other.  Each guarded scenario has its own client
+and breaker.
+
+Usage (from backend/):
+    python benchmarks/chaos_llm.py --requests 200 --concurrency 32
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI  # noqa: E402
+from llm_client import LLMClient, CircuitBreaker, LLMUnavailableError  # noqa: E402
+
+
+def start_fake_server(slow_rate: float, slow_s: float, error_rate: float, port: int = 8098):
+    """Run ``fake_llm_server`` in-process, browned out as requested."""
+    import uvicorn
+    import fake_llm_server
+
+    fake_llm_server.configure(
+        latency="fixed:50",
+        tokens_per_s=0,
+        slow_rate=slow_rate,
+        slow_latency=f"fixed:{slow_s * 1000:.0f}",
+        error_rate=error_rate,
+        error_status="500",
+    )
+    server = uvicorn.Server(uvicorn.Config(
+        fake_llm_server.app, host="127.0.0.1", port=port, log_level="warning"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}/v1"
+
+
+def run_load(call, n_requests: int, concurrency: int):
+    latencies, outcomes = [], {"ok": 0, "error": 0, "fast_fail": 0}
+    lock = threading.Lock()
+
+    def one(_):
+        started = time.perf_counter()
+        try:
+            call()
+            outcome = "ok"
+        except LLMUnavailableError:
+            outcome = "fast_fail"
+        except Exception:
+            outcome = "error"
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            outcomes[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n_requests)))
+    return sorted(latencies), outcomes
+
+
+def percentile(sorted_values, pct):
+    idx = min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)
+    return sorted_values[idx]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--slow-rate", type=float, default=0.6)
+    parser.add_argument("--slow-s", type=float, default=6.0)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--timeout-s", type=float, default=2.0)
+    parser.add_argument("--hedge-after-s", type=float, default=0.3)
+    parser.add_argument("--base-url", default=None, help="use an already running fake LLM server")
+    args = parser.parse_args()
+
+    base_url = args.base_url
+    if not base_url:
+        _, base_url = start_fake_server(args.slow_rate, args.slow_s, args.error_rate)
+    request = {
+        "model": "openai/gpt-oss-20b",
+        "messages": [{"role": "user", "content": "chaos"}],
+        "max_tokens": 16,
+    }
+
+    raw = OpenAI(api_key="chaos", base_url=base_url, max_retries=0)
+
+    def guarded_client():
+        return LLMClient(
+            api_key="chaos",
+            base_url=base_url,
+            timeout_s=args.timeout_s,
+            max_retries=0,
+            max_concurrency=8,
+            queue_timeout_s=0.5,
+            breaker=CircuitBreaker(window=20, min_calls=5, failure_rate=0.5,
+                                   slow_call_s=args.timeout_s / 2, slow_rate=0.5, cooldown_s=2.0),
+        )
+
+    guarded = guarded_client()
+    hedging = guarded_client()
+
+    scenarios = [
+        ("unguarded", lambda: raw.chat.completions.create(**request)),
+        ("breaker", lambda: guarded.create(**request)),
+        ("hedged", lambda: hedging.create_hedged(
+            hedge_model="llama-3.1-8b-instant", hedge_after_s=args.hedge_after_s, **request
+        )),
+    ]
+
+    print(f"{'scenario':<10} {'p50':>7} {'p90':>7} {'p95':>7} {'p99':>7} {'max':>7}   outcomes")
+    for name, call in scenarios:
+        latencies, outcomes = run_load(call, args.requests, args.concurrency)
+        print(
+            f"{name:<10} "
+            f"{percentile(latencies, 50):7.2f} {percentile(latencies, 90):7.2f} {percentile(latencies, 95):7.2f} "
+            f"{percentile(latencies, 99):7.2f} {latencies[-1]:7.2f}   {outcomes}"
+        )
+    print(f"\nbreaker: {guarded.breaker.snapshot()}")
+    print(f"hedged:  {hedging.breaker.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
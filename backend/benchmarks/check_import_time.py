@@ -0,0 +1,109 @@
+"""
+Startup guard: how long ``import main`` takes and what it pulls in.
+
+Imports the app ``--runs`` times, each in a fresh interpreter with
+``-X importtime`` and no Supabase / Groq keys set (importing must neither
+need them nor create clients).  Prints the median wall time and the
+slowest top-level imports of the last run.  Exits non-zero when
+
+  - importing fails (e.g. because a key is missing),
+  - the median exceeds ``--budget`` seconds, or
+  - a heavy dependency is imported by ``import main``; these must load
+    lazily, on first use or in the app's lifespan:
+    torch, sentence_transformers, chromadb, onnxruntime, reportlab,
+    openai, supabase
+
+Usage (from backend/):
+    python benchmarks/check_import_time.py [--runs 5] [--budget 2.0]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = (
+    "torch",
+    "sentence_transformers",
+    "chromadb",
+    "onnxruntime",
+    "reportlab",
+    "openai",
+    "supabase",
+)
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({"s": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+# Keys whose presence must not matter at import time
+_SECRETS = ("SUPABASE_URL", "SUPABASE_SECRET_KEY", "SUPABASE_PUBLISHABLE_KEY", "GROQ_API_KEY")
+
+
+def import_once():
+    env = {k: v for k, v in os.environ.items() if k not in _SECRETS}
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        error = [line for line in out.stderr.splitlines() if not line.startswith("import time:")]
+        print("FAIL: import main raised without Supabase / Groq keys:")
+        print("\n".join(error[-5:]))
+        sys.exit(1)
+    return json.loads(out.stdout.strip().splitlines()[-1]), out.stderr
+
+
+def top_level(importtime: str, count: int):
+    """(cumulative µs, module) of the slowest imports made directly by ``main``."""
+    rows = []
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Direct imports of main are indented by exactly three spaces
+        if name.startswith("   ") and not name.startswith("    ") and cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.0, help="max median seconds for `import main`")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    timings, loaded, importtime = [], set(), ""
+    for _ in range(args.runs):
+        result, importtime = import_once()
+        timings.append(result["s"])
+        loaded.update(result["loaded"])
+
+    median = statistics.median(timings)
+    print(f"import main: median {median:.2f} s over {args.runs} runs "
+          f"(min {min(timings):.2f}, max {max(timings):.2f}; budget {args.budget:.2f} s)")
+    print("slowest imports made by main (cumulative):")
+    for micros, name in top_level(importtime, args.top):
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if median > args.budget:
+        print(f"FAIL: import main takes {median:.2f} s, over the {args.budget:.2f} s budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: import main loads {', '.join(sorted(loaded))} (must be imported lazily)")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
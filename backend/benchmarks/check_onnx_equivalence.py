@@ -0,0 +1,68 @@
+"""
+Equivalence check: ONNX Runtime backends vs the PyTorch SentenceTransformer.
+
+Encodes a set of clinical case texts (short, long, truncated, unicode) with
+each backend and compares them to torch by per-text cosine similarity, and
+by how far query→corpus similarity scores (what ranking is built on) move.
+Exits non-zero if a backend falls outside its threshold.
+
+  onnx       min cosine >= 0.9999,  max score delta <= 0.001
+  onnx-int8  min cosine >= 0.98,    max score delta <= 0.05
+
+Usage (from backend/, after ``python embedding_backends.py build``):
+    python benchmarks/check_onnx_equivalence.py [--model NAME]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_backends import load_backend  # noqa: E402
+from bench_event_loop import synthetic_case  # noqa: E402
+
+THRESHOLDS = {"onnx": (0.9999, 0.001), "onnx-int8": (0.98, 0.05)}
+
+EDGE_CASES = [
+    "",
+    "fever",
+    "Chief Complaint: chest pain radiating to left arm | Diagnosis: NSTEMI",
+    "Allergies: penicillin (rash), sulfa — anaphylaxis; naïve to β-blockers",
+    " | ".join(f"History: episode {i} of recurrent abdominal pain with vomiting" for i in range(60)),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.getenv("BERT_MODEL_NAME", "all-MiniLM-L6-v2"))
+    parser.add_argument("--corpus", type=int, default=500)
+    args = parser.parse_args()
+
+    texts = EDGE_CASES + [synthetic_case(i) for i in range(args.corpus)]
+    queries = [synthetic_case(100_000 + i) for i in range(50)]
+
+    reference = load_backend(args.model, "torch")
+    ref_vectors = reference.encode(texts)
+    ref_scores = reference.encode(queries) @ ref_vectors.T
+
+    failed = False
+    for name, (min_cosine, max_delta) in THRESHOLDS.items():
+        backend = load_backend(args.model, name)
+        vectors = backend.encode(texts)
+        cosine = np.sum(vectors * ref_vectors, axis=1)
+        delta = np.abs(backend.encode(queries) @ vectors.T - ref_scores).max()
+        ok = cosine.min() >= min_cosine and delta <= max_delta
+        failed |= not ok
+        print(
+            f"{name:<10} cosine min {cosine.min():.6f}  mean {cosine.mean():.6f}  "
+            f"max score delta {delta:.6f}  {'OK' if ok else 'FAIL'}"
+        )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
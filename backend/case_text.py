@@ -0,0 +1,59 @@
+"""
+Case Text Builder
+=================
+
+The single, versioned definition of the text that represents an encounter
+in the case-similarity index.  Every indexing path (single index, backfill
+jobs, incremental sync, auto-index on save) and every encounter-based query
+builds its text here, so one encounter always maps to one vector.
+
+``CASE_TEXT_VERSION`` is stored in each ChromaDB document's metadata (and
+folded into its fingerprint).  Bump it whenever ``build_case_text`` changes
+its output: documents built with an older version stop matching and the
+next reindex re-embeds exactly those.
+"""
+
+from typing import Any, Dict, Optional
+
+CASE_TEXT_VERSION = 1
+
+# (encounter column, label) in the order they appear in the text
+CASE_TEXT_FIELDS = [
+    ("chief_complaint", "Chief Complaint"),
+    ("diagnosis", "Diagnosis"),
+    ("history_of_illness", "History"),
+    ("physical_exam", "Physical Exam"),
+    ("medications", "Medications"),
+    ("allergies", "Allergies"),
+]
+
+# Encounter columns needed to build the text and the index metadata
+CASE_TEXT_COLUMNS = ", ".join(
+    ["id", "doctor_id", "patient_id"] + [field for field, _ in CASE_TEXT_FIELDS]
+)
+
+
+def build_case_text(encounter: dict) -> str:
+    """Build a single text string from encounter fields."""
+    parts = [f"{label}: {encounter[field]}" for field, label in CASE_TEXT_FIELDS if encounter.get(field)]
+    return " | ".join(parts) if parts else ""
+
+
+def case_document(encounter: dict) -> Optional[Dict[str, Any]]:
+    """
+    ``VectorService.index_encounters_batch`` input for an encounter row,
+    or ``None`` when the encounter has no text to index.
+    """
+    text = build_case_text(encounter)
+    if not text:
+        return None
+    return {
+        "encounter_id": encounter["id"],
+        "case_text": text,
+        "doctor_id": encounter.get("doctor_id") or "",
+        "patient_id": encounter.get("patient_id") or "",
+        "diagnosis": encounter.get("diagnosis") or "",
+        "chief_complaint": encounter.get("chief_complaint") or "",
+        "treatments": encounter.get("medications") or "",
+        "text_version": CASE_TEXT_VERSION,
+    }
@@ -29,6 +29,31 @@ CREATE TABLE public.documents (
   CONSTRAINT documents_pkey PRIMARY KEY (id),
   CONSTRAINT documents_encounter_id_fkey FOREIGN KEY (encounter_id) REFERENCES public.encounters(id)
 );
+CREATE TABLE public.education_generation_log (
+  id uuid NOT NULL DEFAULT gen_random_uuid(),
+  diagnosis_key text,
+  template_id uuid,
+  mode text NOT NULL CHECK (mode = ANY (ARRAY['template'::text, 'full'::text])),
+  prompt_tokens integer DEFAULT 0,
+  completion_tokens integer DEFAULT 0,
+  baseline_tokens integer DEFAULT 0,
+  created_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT education_generation_log_pkey PRIMARY KEY (id),
+  CONSTRAINT education_generation_log_template_id_fkey FOREIGN KEY (template_id) REFERENCES public.education_templates(id)
+);
+CREATE TABLE public.education_templates (
+  id uuid NOT NULL DEFAULT gen_random_uuid(),
+  diagnosis_key text NOT NULL UNIQUE,
+  diagnosis text,
+  content text NOT NULL,
+  status text DEFAULT 'draft'::text CHECK (status = ANY (ARRAY['draft'::text, 'approved'::text, 'rejected'::text])),
+  generation_tokens integer DEFAULT 0,
+  reviewed_by uuid,
+  reviewed_at timestamp with time zone,
+  created_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT education_templates_pkey PRIMARY KEY (id),
+  CONSTRAINT education_templates_reviewed_by_fkey FOREIGN KEY (reviewed_by) REFERENCES public.doctors(id)
+);
 CREATE TABLE public.encounters (
   id uuid NOT NULL DEFAULT gen_random_uuid(),
   patient_id uuid,
@@ -74,6 +99,7 @@ CREATE TABLE public.patient_education (
   description text,
   content text NOT NULL,
   status text DEFAULT 'pending'::text CHECK (status = ANY (ARRAY['pending'::text, 'sent'::text, 'viewed'::text])),
+  generation_status text DEFAULT 'complete'::text CHECK (generation_status = ANY (ARRAY['complete'::text, 'partial'::text])),
   sent_at timestamp with time zone,
   viewed_at timestamp with time zone,
   created_at timestamp with time zone DEFAULT now(),
@@ -98,6 +124,14 @@ CREATE TABLE public.patient_summary (
   CONSTRAINT patient_summary_patient_id_fkey FOREIGN KEY (patient_id) REFERENCES public.patients(id),
   CONSTRAINT patient_summary_doctor_id_fkey FOREIGN KEY (doctor_id) REFERENCES public.doctors(id)
 );
+CREATE TABLE public.patient_state (
+  patient_id uuid NOT NULL,
+  state jsonb NOT NULL DEFAULT '{}'::jsonb,
+  updated_at timestamp with time zone DEFAULT now(),
+  version integer NOT NULL DEFAULT 0,
+  CONSTRAINT patient_state_pkey PRIMARY KEY (patient_id),
+  CONSTRAINT patient_state_patient_id_fkey FOREIGN KEY (patient_id) REFERENCES public.patients(id)
+);
 CREATE TABLE public.patients (
   id uuid NOT NULL DEFAULT gen_random_uuid(),
   name text NOT NULL,
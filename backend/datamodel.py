@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List, Literal
+from typing import Dict, Optional, List, Literal
 from uuid import UUID
 
 
@@ -94,6 +94,7 @@ class PatientEducation(BaseModel):
     medicines: Optional[List[MedicineDetail]] = None  # Separated medicine information
     medicines_pdf_id: Optional[str] = None  # ID reference to separate medicine PDF
     status: str = "pending"
+    generation_status: Optional[str] = None  # "complete" or "partial" (interrupted stream)
     sent_at: Optional[str] = None
     viewed_at: Optional[str] = None
     created_at: str
@@ -138,6 +139,42 @@ class GenerateMedicinePDFRequest(BaseModel):
     doctor_name: str = "Your Doctor"
 
 
+# Education Template Models
+class EducationTemplate(BaseModel):
+    id: str
+    diagnosis_key: str
+    diagnosis: Optional[str] = None
+    content: str
+    status: Literal["draft", "approved", "rejected"] = "draft"
+    generation_tokens: int = 0
+    reviewed_by: Optional[str] = None
+    reviewed_at: Optional[str] = None
+    created_at: str
+
+
+class EducationTemplateListResponse(BaseModel):
+    templates: List[EducationTemplate]
+    total: int
+
+
+class ReviewEducationTemplateRequest(BaseModel):
+    reviewer_id: str  # UUID of the reviewing doctor
+    status: Optional[Literal["draft", "approved", "rejected"]] = None
+    content: Optional[str] = None
+
+
+class EducationTemplateReport(BaseModel):
+    total_generations: int
+    template_hits: int
+    full_generations: int
+    hit_rate: float
+    tokens_used: int
+    tokens_saved: int
+    templates_approved: int
+    templates_pending_review: int
+    top_missed_diagnoses: List[dict]
+
+
 # Patient Summary Models
 class PatientSummary(BaseModel):
     id: str
@@ -223,3 +260,108 @@ class EmbedEncounterResponse(BaseModel):
 class FreeTextSearchRequest(BaseModel):
     query: str
     top_k: int = 5
+
+
+class SimilarCasesBatchRequest(BaseModel):
+    encounter_ids: List[str]
+    top_k: int = 5
+    same_doctor_only: bool = False
+
+
+class SimilarCasesBatchResponse(BaseModel):
+    results: Dict[str, SimilarCasesResponse]
+    not_found: List[str] = []   # unknown ids and encounters with no text fields
+    total_cases_searched: int
+    similarity_method: str = "BERT + ChromaDB"
+
+
+class ReindexJob(BaseModel):
+    id: str
+    doctor_id: Optional[str] = None
+    status: Literal["pending", "running", "cancelling", "cancelled", "completed", "failed", "interrupted"]
+    cursor: Optional[str] = None
+    scanned: int = 0
+    indexed: int = 0
+    pages: int = 0
+    page_size: int
+    rate_limit: float
+    force: bool = False
+    elapsed_s: float = 0.0
+    throughput_per_s: float = 0.0
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+    finished_at: Optional[str] = None
+
+
+class ReindexJobListResponse(BaseModel):
+    jobs: List[ReindexJob]
+    total: int
+
+
+class IndexSyncResponse(BaseModel):
+    success: bool
+    scanned: int
+    indexed: int
+    skipped: int
+    watermark: Optional[dict] = None
+    elapsed_s: float
+
+
+class IndexReconcileResponse(BaseModel):
+    success: bool
+    dry_run: bool
+    buckets: int
+    mismatched_buckets: int
+    table_rows: int
+    diffed: int
+    missing: int
+    stale: int
+    orphaned: int
+    reindexed: int
+    deleted: int
+    missing_ids: List[str] = []
+    stale_ids: List[str] = []
+    orphaned_ids: List[str] = []
+    elapsed_s: float
+
+
+class VectorSnapshot(BaseModel):
+    name: str
+    size_bytes: int
+    count: int
+    model: str
+    backend: str
+    dim: int
+    case_text_version: int
+    created_at: str
+    watermark: Optional[dict] = None
+
+
+class VectorSnapshotImportResponse(BaseModel):
+    success: bool
+    snapshot: VectorSnapshot
+    imported: int
+    elapsed_s: float
+    text_version_matches: bool
+
+
+class DependencyWarmState(BaseModel):
+    state: Literal["pending", "warming", "ready", "skipped", "failed"]
+    gates_readiness: bool
+    attempts: int
+    elapsed_ms: Optional[float] = None
+    error: Optional[str] = None
+    detail: Optional[dict] = None
+
+
+class LivenessResponse(BaseModel):
+    status: str
+    pid: int
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    uptime_s: float
+    ready_after_s: Optional[float] = None
+    dependencies: Dict[str, DependencyWarmState]
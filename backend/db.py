@@ -0,0 +1,73 @@
+"""
+Supabase Clients
+================
+
+Shared Supabase clients for the API modules, created on first use.
+
+Every router used to build its own client at import time: eight
+``create_client`` calls, each with its own HTTP session, before the app
+could serve, and importing a router failed outright when a key was
+missing.  Routers now call the getters below.  The app's lifespan
+(``main.py``) creates the clients at startup, so the first request does
+not pay for it; a client that cannot be created there is only logged, and
+the endpoints that need it fail with the underlying error.
+
+  get_supabase()          service-role client (SUPABASE_SECRET_KEY): tables, storage
+  get_supabase_public()   publishable-key client, for the sign-up / sign-in flows
+
+Configuration (env, read by ``config.py``):
+  SUPABASE_URL
+  SUPABASE_SECRET_KEY
+  SUPABASE_PUBLISHABLE_KEY
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict
+
+from config import settings
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+_clients: Dict[str, "Client"] = {}
+_lock = threading.Lock()
+
+
+def _client(name: str, key: str) -> "Client":
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                from supabase import create_client
+
+                client = _clients[name] = create_client(settings.SUPABASE_URL, key)
+    return client
+
+
+def get_supabase() -> "Client":
+    """Service-role client (bypasses row-level security; server side only)."""
+    return _client("secret", settings.SUPABASE_SECRET_KEY)
+
+
+def get_supabase_public() -> "Client":
+    """Publishable-key client used for Supabase Auth on behalf of users."""
+    return _client("publishable", settings.SUPABASE_PUBLISHABLE_KEY)
+
+
+def init_clients() -> Dict[str, bool]:
+    """Create both clients now; returns which ones could be created."""
+    created = {}
+    for name, getter in (("secret", get_supabase), ("publishable", get_supabase_public)):
+        try:
+            getter()
+            created[name] = True
+        except Exception as e:   # missing / invalid URL or key
+            logger.warning("Supabase %s client not available: %s", name, e)
+            created[name] = False
+    return created
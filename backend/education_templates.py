@@ -0,0 +1,218 @@
+"""
+Patient Education Template Library
+==================================
+
+Diagnosis-keyed store of doctor-reviewed education documents.
+
+``generate_patient_education`` only looks at the chief complaint, diagnosis
+and physical exam, so the same common diagnoses were being regenerated from
+scratch (a full 2,048-token ``llama-3.3-70b-versatile`` completion) on every
+save.  With the template library:
+
+  1. The diagnosis is normalised into a ``diagnosis_key``.  Unconfirmed
+     diagnoses ("r/o", "suspected", "?") get none: they are generated in
+     full and no template is used or stored for them.
+  2. If an **approved** template exists for that key, the encounter gets a
+     short personalised opening from a small, fast model and the reviewed
+     template body is reused verbatim.
+  3. Otherwise the document is generated in full as before, and the result
+     is stored as a ``draft`` template for a doctor to review (lazy fill).
+
+Every generation is logged to ``education_generation_log`` so the hit rate
+and tokens saved can be reported (``GET /education-templates/report``).
+
+Supabase tables (see migrations/004_add_education_templates.sql):
+  - education_templates       (diagnosis_key UNIQUE, content, status, ...)
+  - education_generation_log  (diagnosis_key, template_id, mode, tokens, ...)
+and the report function ``education_template_report``
+(migrations/006_add_education_template_report.sql).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+TEMPLATE_TABLE = "education_templates"
+GENERATION_LOG_TABLE = "education_generation_log"
+
+# Set to "0" to always generate education documents in full
+TEMPLATES_ENABLED = os.getenv("EDUCATION_TEMPLATES_ENABLED", "1") != "0"
+
+# Small model used for the personalisation pass over an approved template
+PERSONALISE_MODEL = os.getenv("EDUCATION_PERSONALISE_MODEL", "llama-3.1-8b-instant")
+PERSONALISE_MAX_TOKENS = 200
+
+# Markers of an unconfirmed diagnosis ("r/o MI", "suspected appendicitis",
+# "?fracture"): such encounters never use a template, since the leaflet for
+# the confirmed condition would be wrong for them
+_UNCERTAIN = re.compile(
+    r"\?|\br/o\b|\brul(?:e|ed)\s+out\b|\b(?:likely|probable|possible|suspected|presumed|query)\b"
+)
+
+
+def normalise_diagnosis(diagnosis: Optional[str]) -> str:
+    """
+    Normalise a free-text diagnosis into a template key, or ``""`` (no
+    template: generate in full) for an unconfirmed diagnosis.
+
+    Only case and punctuation are dropped: "Viral Pharyngitis." and "viral
+    pharyngitis" share a key, while acuity, chronicity, severity and
+    staging are part of it ("acute kidney injury" and "chronic kidney
+    disease" get different documents).
+    """
+    text = (diagnosis or "").lower()
+    if _UNCERTAIN.search(text):
+        return ""
+    text = re.sub(r"[^a-z0-9/\s-]", " ", text)
+    return " ".join(text.split())[:120]
+
+
+def _usage_tokens(response) -> Tuple[int, int]:
+    usage = getattr(response, "usage", None)
+    if not usage:
+        return 0, 0
+    return (usage.prompt_tokens or 0), (usage.completion_tokens or 0)
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+def find_template(supabase, diagnosis_key: str) -> Optional[Dict[str, Any]]:
+    """Return the template row for *diagnosis_key* (any status), if any."""
+    result = supabase.table(TEMPLATE_TABLE).select('*').eq(
+        'diagnosis_key', diagnosis_key
+    ).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+def store_draft_template(
+    supabase,
+    diagnosis_key: str,
+    diagnosis: str,
+    content: str,
+    generation_tokens: int,
+) -> Optional[str]:
+    """
+    Store a freshly generated document as a ``draft`` template awaiting
+    doctor review.  Existing templates for the key are left untouched.
+    """
+    result = supabase.table(TEMPLATE_TABLE).upsert({
+        'diagnosis_key': diagnosis_key,
+        'diagnosis': diagnosis,
+        'content': content,
+        'status': 'draft',
+        'generation_tokens': generation_tokens,
+    }, on_conflict='diagnosis_key', ignore_duplicates=True).execute()
+    return result.data[0]['id'] if result.data else None
+
+
+def review_template(
+    supabase,
+    template_id: str,
+    reviewer_id: str,
+    status: Optional[str] = None,
+    content: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    update_data: Dict[str, Any] = {
+        'reviewed_by': reviewer_id,
+        'reviewed_at': datetime.utcnow().isoformat(),
+    }
+    if status is not None:
+        update_data['status'] = status
+    if content is not None:
+        update_data['content'] = content
+    result = supabase.table(TEMPLATE_TABLE).update(update_data).eq('id', template_id).execute()
+    return result.data[0] if result.data else None
+
+
+def log_generation(
+    supabase,
+    diagnosis_key: str,
+    mode: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    template: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Record one education generation.  For template hits ``baseline_tokens``
+    is what the full generation of that template cost, so
+    ``baseline_tokens - (prompt_tokens + completion_tokens)`` is the saving.
+    """
+    supabase.table(GENERATION_LOG_TABLE).insert({
+        'diagnosis_key': diagnosis_key,
+        'template_id': template['id'] if template else None,
+        'mode': mode,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'baseline_tokens': (template or {}).get('generation_tokens') or 0,
+    }).execute()
+
+
+# ---------------------------------------------------------------------------
+# Personalisation
+# ---------------------------------------------------------------------------
+
+def personalise_template(
+    llm,
+    template: Dict[str, Any],
+    encounter_data: dict,
+) -> Tuple[str, int, int]:
+    """
+    Prefix the reviewed template body with a short opening tailored to this
+    encounter.  Only the opening is generated, so the pass costs a couple of
+    hundred tokens on a small model instead of a full document on the 70B.
+
+    Returns ``(content, prompt_tokens, completion_tokens)``.
+    """
+    prompt = f"""Write a warm 2-3 sentence opening paragraph for a patient education handout.
+
+Chief Complaint: {encounter_data.get('chief_complaint', 'N/A')}
+Diagnosis: {encounter_data.get('diagnosis', 'N/A')}
+Physical Exam Findings: {encounter_data.get('physical_exam', 'N/A')}
+
+Briefly acknowledge why they visited and what was found, in plain language.
+Do NOT include medication names, dosages, or any heading. Output only the paragraph."""
+
+    response = llm.create(
+        model=PERSONALISE_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a compassionate medical educator writing for patients."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.5,
+        max_tokens=PERSONALISE_MAX_TOKENS
+    )
+    opening = (response.choices[0].message.content or "").strip()
+    prompt_tokens, completion_tokens = _usage_tokens(response)
+
+    content = f"{opening}\n\n{template['content']}" if opening else template['content']
+    return content, prompt_tokens, completion_tokens
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+REPORT_FUNCTION = "education_template_report"
+
+
+def build_report(supabase, since: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Hit-rate / tokens-saved figures for the generation log.
+
+    The counting happens in the database (``education_template_report``,
+    migrations/006_add_education_template_report.sql): one round trip that
+    returns a single JSON object, instead of paging the whole log here.
+    """
+    report = supabase.rpc(REPORT_FUNCTION, {"since": since}).execute().data
+    total = report["total_generations"]
+    hits = report["template_hits"]
+    return {
+        **report,
+        "full_generations": total - hits,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+    }
@@ -0,0 +1,308 @@
+"""
+Embedding Backends
+==================
+
+Pluggable sentence-embedding backends for ``VectorService``.
+
+The PyTorch ``SentenceTransformer`` is the biggest contributor to per-worker
+RSS and cold-start time on our CPU-only nodes (importing torch alone costs
+several hundred MB).  The ONNX Runtime backends run the same transformer
+graph with only ``onnxruntime`` + ``tokenizers`` loaded.
+
+Backends (``EMBEDDING_BACKEND``):
+  torch      SentenceTransformer (default)
+  onnx       ONNX Runtime, fp32 graph          — same vectors as torch
+  onnx-int8  ONNX Runtime, int8 dynamic quantisation of the fp32 graph
+
+Every backend exposes the same two members:
+  - ``dimension``                    embedding size
+  - ``encode(texts, batch_size)``    L2-normalised ``float32`` array (n, dim)
+
+ONNX files live under ``<ONNX_MODEL_DIR>/<model>/``: ``model.onnx``
+(exported from the PyTorch weights) and ``model_int8.onnx`` (quantised from
+it).  The tokenizer and config are read from the model itself; Hub models
+are downloaded to the Hugging Face cache, which is never written to (its
+snapshots are shared, and may be read-only).  Both files are built once with
+
+    python embedding_backends.py build [--model NAME]
+
+which needs ``torch`` and ``onnx``; serving needs the packages in
+``requirements-onnx.txt`` (``onnxruntime``, ``tokenizers``,
+``huggingface_hub``).
+
+Configuration (env):
+  EMBEDDING_BACKEND       torch | onnx | onnx-int8          (default torch)
+  ONNX_MODEL_DIR          built ONNX files                  (default backend/.onnx)
+  ONNX_INTRA_OP_THREADS   ONNX Runtime threads per session  (default 0 = auto)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR",
+    os.path.join(os.path.dirname(__file__), ".onnx"),
+)
+
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32, copy=False)
+
+
+def resolve_model_dir(model_name: str) -> str:
+    """Local directory for *model_name* (a path, or a Hub ID from the HF cache)."""
+    if os.path.isdir(model_name):
+        return model_name
+    from huggingface_hub import snapshot_download
+
+    return snapshot_download(_repo_id(model_name))
+
+
+def _repo_id(model_name: str) -> str:
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def onnx_dir(model_name: str) -> str:
+    """Directory of *model_name*'s ONNX files under ``ONNX_MODEL_DIR``."""
+    if os.path.isdir(model_name):
+        # Local model: its name plus a hash of the path, so two checkouts never share files
+        path = os.path.abspath(model_name)
+        name = f"{os.path.basename(path)}-{hashlib.sha1(path.encode()).hexdigest()[:8]}"
+    else:
+        name = _repo_id(model_name).replace("/", "--")
+    return os.path.join(ONNX_MODEL_DIR, name)
+
+
+# ---------------------------------------------------------------------------
+# PyTorch
+# ---------------------------------------------------------------------------
+
+class TorchBackend:
+    """The original ``SentenceTransformer`` path."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dimension = self._model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        return self._model.encode(
+            list(texts),
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        ).astype(np.float32, copy=False)
+
+
+# ---------------------------------------------------------------------------
+# ONNX Runtime
+# ---------------------------------------------------------------------------
+
+class OnnxBackend:
+    """
+    Transformer graph on ONNX Runtime + the model's pooling, re-implemented
+    in NumPy (mean or CLS pooling, then L2 normalisation).
+    """
+
+    def __init__(self, model_name: str, quantized: bool = False) -> None:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.name = "onnx-int8" if quantized else "onnx"
+        model_dir = resolve_model_dir(model_name)
+        onnx_path = os.path.join(onnx_dir(model_name), ONNX_INT8_FILE if quantized else ONNX_FP32_FILE)
+        if not os.path.exists(onnx_path):
+            raise RuntimeError(
+                f"{onnx_path} not found — run `python embedding_backends.py build "
+                f"--model {model_name}` once to export it"
+            )
+
+        config = self._read_json(model_dir, "config.json")
+        self._max_length = self._max_seq_length(model_dir, config)
+        self._pooling = self._pooling_mode(model_dir)
+        self.dimension = int(config["hidden_size"])
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=self._max_length)
+        self._tokenizer.enable_padding(pad_id=config.get("pad_token_id") or 0)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(
+            onnx_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        logger.info("ONNX backend ready  (%s, pooling=%s)", onnx_path, self._pooling)
+
+    # ---- config -----------------------------------------------------------
+
+    @staticmethod
+    def _read_json(model_dir: str, *parts: str) -> Dict[str, Any]:
+        path = os.path.join(model_dir, *parts)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as fh:
+            return json.load(fh)
+
+    def _max_seq_length(self, model_dir: str, config: Dict[str, Any]) -> int:
+        st_config = self._read_json(model_dir, "sentence_bert_config.json")
+        if st_config.get("max_seq_length"):
+            return int(st_config["max_seq_length"])
+        tok_config = self._read_json(model_dir, "tokenizer_config.json")
+        limits = [
+            tok_config.get("model_max_length"),
+            config.get("max_position_embeddings"),
+            512,
+        ]
+        return int(min(v for v in limits if isinstance(v, int) and v > 0))
+
+    def _pooling_mode(self, model_dir: str) -> str:
+        pooling = self._read_json(model_dir, "1_Pooling", "config.json")
+        mode = pooling.get("pooling_mode")   # sentence-transformers >= 5 layout
+        if mode:
+            return mode
+        return "cls" if pooling.get("pooling_mode_cls_token") else "mean"
+
+    # ---- inference --------------------------------------------------------
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self._session.run(None, feeds)[0]
+        if self._pooling == "cls":
+            pooled = token_embeddings[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return _normalise(pooled)
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        # Sort by length so each batch pads to a similar size
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            out[idx] = self._forward([texts[i] for i in idx])
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Factory / build
+# ---------------------------------------------------------------------------
+
+def load_backend(model_name: str, backend: Optional[str] = None):
+    """Instantiate the embedding backend named by *backend* / ``EMBEDDING_BACKEND``."""
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    if backend == "torch":
+        return TorchBackend(model_name)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxBackend(model_name, quantized=backend == "onnx-int8")
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}' (expected one of {BACKENDS})")
+
+
+def build_onnx(model_name: str, quantize: bool = True) -> str:
+    """
+    Export ``model.onnx`` from the PyTorch weights and (optionally) an int8
+    dynamically-quantised ``model_int8.onnx`` next to it, in
+    :func:`onnx_dir`.
+
+    Returns that directory.
+    """
+    import torch
+    from transformers import AutoModel
+
+    model_dir = resolve_model_dir(model_name)
+    out_dir = onnx_dir(model_name)
+    fp32_path = os.path.join(out_dir, ONNX_FP32_FILE)
+    os.makedirs(out_dir, exist_ok=True)
+
+    if not os.path.exists(fp32_path):
+        model = AutoModel.from_pretrained(model_dir).eval()
+
+        class _Graph(torch.nn.Module):
+            def __init__(self, inner):
+                super().__init__()
+                self.inner = inner
+
+            def forward(self, input_ids, attention_mask, token_type_ids):
+                return self.inner(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    token_type_ids=token_type_ids,
+                ).last_hidden_state
+
+        names = ["input_ids", "attention_mask", "token_type_ids"]
+        dummy = (
+            torch.ones((1, 8), dtype=torch.long),
+            torch.ones((1, 8), dtype=torch.long),
+            torch.zeros((1, 8), dtype=torch.long),
+        )
+        dynamic = {name: {0: "batch", 1: "sequence"} for name in names + ["last_hidden_state"]}
+        with torch.no_grad():
+            torch.onnx.export(
+                _Graph(model),
+                dummy,
+                fp32_path,
+                input_names=names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic,
+                opset_version=17,
+                dynamo=False,
+            )
+        logger.info("Exported %s", fp32_path)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.join(out_dir, ONNX_INT8_FILE)
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        logger.info("Quantised %s", int8_path)
+
+    return out_dir
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build ONNX files for the embedding model")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--model", default=os.getenv("BERT_MODEL_NAME", "all-MiniLM-L6-v2"))
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+    print(build_onnx(args.model, quantize=not args.no_quantize))
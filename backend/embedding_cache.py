@@ -0,0 +1,260 @@
+"""
+Embedding Cache
+===============
+
+Persistent cache of sentence embeddings keyed on ``(model name, sha256(text))``.
+
+The same case text is embedded over and over: re-indexing unchanged
+encounters, repeated similarity look-ups for the same encounter, the
+auto-index on save followed by a manual re-index.  ``VectorService`` checks
+this cache before running the model.
+
+Two tiers:
+  - an in-memory LRU of the most recently used vectors, and
+  - a local SQLite file holding up to ``EMBEDDING_CACHE_MAX_ROWS`` vectors
+    (all models together) as float16 blobs (384-dim → 768 bytes per
+    entry).  Every row carries a ``last_used`` tick, set when it is written
+    and bumped when a lookup is served from disk; past the cap the rows
+    used least recently are deleted.  The row count is kept as a running
+    total, counted once when the file is opened.
+
+Vectors are L2-normalised before they are stored, so the float16 rounding
+changes cosine scores by well under 1e-3.
+
+Configuration (env):
+  EMBEDDING_CACHE_ENABLED   "0" disables the cache           (default 1)
+  EMBEDDING_CACHE_PATH      SQLite file   (default backend/.embedding_cache.sqlite3)
+  EMBEDDING_CACHE_SIZE      in-memory LRU entries             (default 4096)
+  EMBEDDING_CACHE_MAX_ROWS  rows kept in the SQLite file      (default 500000,
+                            ~400 MB at 384 dims; 0 = unbounded)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "1") != "0"
+
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), ".embedding_cache.sqlite3"),
+)
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "500000"))
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+def text_key(text: str) -> bytes:
+    """sha256 digest of *text* (the per-model cache key)."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Two-tier (LRU + SQLite float16) embedding cache for one model."""
+
+    def __init__(
+        self,
+        model_name: str,
+        path: str = EMBEDDING_CACHE_PATH,
+        capacity: int = EMBEDDING_CACHE_SIZE,
+        max_rows: int = EMBEDDING_CACHE_MAX_ROWS,
+    ) -> None:
+        self.model_name = model_name
+        self.path = path
+        self.capacity = max(capacity, 0)
+        self.max_rows = max(max_rows, 0)
+
+        # The LRU and the SQLite connection have separate locks, so an
+        # in-memory lookup never waits behind a disk read or a commit
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evicted = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model     TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                dim       INTEGER NOT NULL,
+                vector    BLOB NOT NULL,
+                last_used INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(embeddings)")]
+        if "last_used" not in columns:
+            # Files from before the cap: existing rows count as oldest
+            self._db.execute("ALTER TABLE embeddings ADD COLUMN last_used INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._db.commit()
+        # Guarded by _db_lock: the running row count and the last tick handed out
+        self._stored = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._tick = self._db.execute("SELECT COALESCE(MAX(last_used), 0) FROM embeddings").fetchone()[0]
+
+    # ---- in-memory tier -----------------------------------------------------
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        if not self.capacity:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    # ---- lookups ------------------------------------------------------------
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.get_many([text])[0]
+
+    def get_memory(self, text: str) -> Optional[np.ndarray]:
+        """In-memory tier only: no disk I/O, safe to call on the event loop."""
+        key = text_key(text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is None:
+                return None
+            self._memory.move_to_end(key)
+            self._memory_hits += 1
+        return vector.astype(np.float32)
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached float32 vectors for *texts* (``None`` where there is no entry)."""
+        keys = [text_key(t) for t in texts]
+        found: Dict[bytes, np.ndarray] = {}
+
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self._memory_hits += len(found)
+
+        missing = list({k for k in keys if k not in found})
+        disk: Dict[bytes, np.ndarray] = {}
+        with self._db_lock:
+            for start in range(0, len(missing), _LOOKUP_CHUNK):
+                chunk = missing[start:start + _LOOKUP_CHUNK]
+                rows = self._db.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [self.model_name, *chunk],
+                ).fetchall()
+                for key, blob in rows:
+                    disk[key] = np.frombuffer(blob, dtype=np.float16)
+            if disk:
+                self._touch(list(disk))
+                self._db.commit()
+        found.update(disk)
+
+        out: List[Optional[np.ndarray]] = []
+        for key in keys:
+            vector = found.get(key)
+            out.append(vector.astype(np.float32) if vector is not None else None)
+        with self._lock:
+            for key, vector in disk.items():
+                self._remember(key, vector)
+            self._disk_hits += len(disk)
+            self._misses += sum(1 for v in out if v is None)
+        return out
+
+    # ---- disk bookkeeping (callers hold _db_lock) ---------------------------
+
+    def _touch(self, keys: List[bytes]) -> None:
+        """Mark *keys* as just used."""
+        self._tick += 1
+        self._db.executemany(
+            "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+            [(self._tick, self.model_name, key) for key in keys],
+        )
+
+    def _evict(self) -> None:
+        """Delete the least recently used rows beyond ``max_rows``."""
+        excess = self._stored - self.max_rows
+        if not self.max_rows or excess <= 0:
+            return
+        deleted = self._db.execute(
+            "DELETE FROM embeddings WHERE (model, text_hash) IN ("
+            " SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        ).rowcount
+        self._stored -= deleted
+        self._evicted += deleted
+
+    # ---- writes -------------------------------------------------------------
+
+    def put(self, text: str, vector: Sequence[float]) -> None:
+        self.put_many([text], [vector])
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        if not texts:
+            return
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = text_key(text)
+                half = np.asarray(vector, dtype=np.float16)
+                self._remember(key, half)
+                rows.append((self.model_name, key, half.shape[0], half.tobytes()))
+        with self._db_lock:
+            self._tick += 1
+            # A text's vector never changes for a model: existing rows only get a new tick
+            inserted = self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, dim, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(*row, self._tick) for row in rows],
+            ).rowcount
+            self._stored += inserted
+            if inserted < len(rows):
+                self._touch([row[1] for row in rows])
+            self._evict()
+            self._db.commit()
+
+    # ---- stats --------------------------------------------------------------
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._db_lock:
+            stored = self._stored
+            evicted = self._evicted
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            hits = self._memory_hits + self._disk_hits
+            return {
+                "path": self.path,
+                "memory_entries": len(self._memory),
+                "memory_capacity": self.capacity,
+                "stored_entries": stored,   # all models in the file
+                "stored_capacity": self.max_rows or None,
+                "evicted": evicted,
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,352 @@
+"""
+Fake OpenAI-Compatible LLM Server
+=================================
+
+Local stand-in for the Groq chat-completions API, for load tests, latency
+benchmarks and CI without spending real quota.  Point the backend at it with
+
+    LLM_BASE_URL=http://127.0.0.1:8089/v1  GROQ_API_KEY=fake  python main.py
+
+and start it with
+
+    python fake_llm_server.py --port 8089 --latency lognormal:400,0.6 --tokens-per-s 250
+
+Endpoints:
+  POST /v1/chat/completions   – text and vision messages, ``stream`` supported
+  GET  /v1/models             – lists the models the backend uses
+  GET  /_fake/stats           – request / error counters
+  POST /_fake/config          – change behaviour at runtime (JSON, same keys
+                                as the env vars below, lower-case, no prefix)
+
+Canned responses are chosen from the prompt so they parse with the real
+backend parsers:
+  - "MISSED DIAGNOSES" prompts      → ``parse_model_output`` text format
+  - "EXACT JSON FORMAT" / images    → ``parse_specialist_response`` JSON
+  - "ACTIVE_PROBLEMS" / "SUMMARY_TEXT" → ``parse_summary_sections`` headers
+  - education prompts               → markdown education document
+
+Configuration (env, or the matching CLI flags):
+  FAKE_LLM_LATENCY        time to first token: ``fixed:MS``, ``uniform:LO,HI``,
+                          ``lognormal:MEDIAN_MS,SIGMA`` or ``exp:MEAN_MS``
+                          (default ``lognormal:300,0.5``)
+  FAKE_LLM_TOKENS_PER_S   generation speed after the first token (default 300)
+  FAKE_LLM_SLOW_RATE      share of requests using FAKE_LLM_SLOW_LATENCY (default 0)
+  FAKE_LLM_SLOW_LATENCY   latency spec for slow requests (default ``fixed:10000``)
+  FAKE_LLM_ERROR_RATE     share of requests that fail (default 0)
+  FAKE_LLM_ERROR_STATUS   status codes to fail with, comma-separated (default 500,503,429)
+  FAKE_LLM_SEED           RNG seed for reproducible runs
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+config: Dict[str, Any] = {
+    "latency": os.getenv("FAKE_LLM_LATENCY", "lognormal:300,0.5"),
+    "tokens_per_s": float(os.getenv("FAKE_LLM_TOKENS_PER_S", "300")),
+    "slow_rate": float(os.getenv("FAKE_LLM_SLOW_RATE", "0")),
+    "slow_latency": os.getenv("FAKE_LLM_SLOW_LATENCY", "fixed:10000"),
+    "error_rate": float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+    "error_status": os.getenv("FAKE_LLM_ERROR_STATUS", "500,503,429"),
+}
+
+_rng = random.Random(os.getenv("FAKE_LLM_SEED"))
+
+stats: Dict[str, int] = {"requests": 0, "streamed": 0, "errors": 0, "slow": 0, "vision": 0}
+
+MODELS = [
+    "openai/gpt-oss-20b",
+    "llama-3.3-70b-versatile",
+    "llama-3.1-8b-instant",
+    "meta-llama/llama-4-scout-17b-16e-instruct",
+]
+
+
+def configure(**overrides: Any) -> None:
+    """Update the server behaviour (used by /_fake/config and in-process tests)."""
+    for key, value in overrides.items():
+        if key == "seed":
+            _rng.seed(value)
+        elif key in config:
+            config[key] = type(config[key])(value)
+
+
+def sample_latency_s(spec: str) -> float:
+    """Draw one latency (seconds) from a spec like ``lognormal:300,0.5``."""
+    kind, _, params = spec.partition(":")
+    args = [float(p) for p in params.split(",") if p]
+    if kind == "fixed":
+        ms = args[0]
+    elif kind == "uniform":
+        ms = _rng.uniform(args[0], args[1])
+    elif kind == "lognormal":
+        ms = _rng.lognormvariate(0.0, args[1]) * args[0]
+    elif kind == "exp":
+        ms = _rng.expovariate(1.0 / args[0])
+    else:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    return max(ms, 0.0) / 1000.0
+
+
+# ---------------------------------------------------------------------------
+# Canned outputs
+# ---------------------------------------------------------------------------
+
+ENCOUNTER_ANALYSIS = """MISSED DIAGNOSES:
+- Community-acquired pneumonia: Fever with productive cough and focal crackles warrants exclusion | Confidence: Medium
+- Pulmonary embolism: Tachycardia with pleuritic pain should be considered | Confidence: Low
+
+POTENTIAL ISSUES:
+- Dehydration: Reduced oral intake with fever | Severity: Medium
+- Drug interaction: Review current medications for QT prolongation | Severity: Low
+
+RECOMMENDED TESTS:
+- Chest X-ray: Evaluate for consolidation or effusion | Priority: High
+- Complete blood count: Assess for leukocytosis | Priority: Medium
+- D-dimer: Screen for thromboembolism if clinical suspicion persists | Priority: Low
+"""
+
+SPECIALIST_FINDINGS = {
+    "has_findings": True,
+    "findings": [
+        {
+            "title": "Mild cardiomegaly",
+            "description": "Cardiothoracic ratio slightly above 0.5 on this projection.",
+            "severity": "Medium",
+            "is_red_flag": False,
+        }
+    ],
+    "overlooked_warnings": ["Subtle vascular congestion in the upper lobes"],
+    "recommended_actions": ["Echocardiogram", "Compare with prior imaging"],
+}
+
+SPECIALIST_NO_FINDINGS = {
+    "has_findings": False,
+    "findings": [],
+    "overlooked_warnings": [],
+    "recommended_actions": [],
+}
+
+SUMMARY = """SUMMARY_TEXT:
+Patient seen for follow-up; symptoms are improving on the current plan and vital signs are stable.
+
+KEY_FINDINGS:
+- Afebrile, vitals within normal limits
+- Improving symptoms since last visit
+
+IMPORTANT_CHANGES:
+- No significant change in condition
+
+FOLLOW_UP_NOTES:
+- Review in two weeks or sooner if symptoms worsen
+"""
+
+ACTIVE_PROBLEMS = """
+ACTIVE_PROBLEMS:
+- Type 2 diabetes mellitus
+- Essential hypertension
+"""
+
+EDUCATION = """## Understanding Your Condition
+Your symptoms are caused by a common condition that usually improves with rest and simple care at home.
+
+## Caring for Yourself
+- Rest and drink plenty of fluids
+- Eat light, balanced meals
+- Avoid smoking and alcohol while you recover
+
+## Warning Signs
+- Difficulty breathing or chest pain
+- A fever that lasts more than three days
+- Confusion or severe drowsiness
+
+## Recovery and Follow-Up
+Most people feel better within one to two weeks. Keep your follow-up appointment so we can check your progress.
+
+## When to Contact Your Doctor
+Call us if your symptoms get worse or do not improve as expected.
+"""
+
+OPENING = "Thank you for coming in today. We talked about what has been bothering you, and this guide explains what we found and how to look after yourself."
+
+
+def _message_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if p.get("type") == "text")
+    return "\n".join(parts)
+
+
+def _has_image(messages: List[Dict[str, Any]]) -> bool:
+    return any(
+        isinstance(m.get("content"), list)
+        and any(p.get("type") == "image_url" for p in m["content"])
+        for m in messages
+    )
+
+
+def canned_response(messages: List[Dict[str, Any]]) -> str:
+    text = _message_text(messages)
+    if "MISSED DIAGNOSES" in text:
+        return ENCOUNTER_ANALYSIS
+    if "EXACT JSON FORMAT" in text or _has_image(messages):
+        # Orthopedist/Cardiologist report findings, Neurologist does not
+        findings = not re.search(r"Neurologist", text)
+        return json.dumps(SPECIALIST_FINDINGS if findings else SPECIALIST_NO_FINDINGS, indent=2)
+    if "ACTIVE_PROBLEMS" in text:
+        return SUMMARY + ACTIVE_PROBLEMS
+    if "SUMMARY_TEXT" in text:
+        return SUMMARY
+    if "opening paragraph" in text:
+        return OPENING
+    if "education" in text.lower():
+        return EDUCATION
+    return "OK"
+
+
+def _approx_tokens(text: str) -> int:
+    return max(int(len(text.split()) * 1.3), 1)
+
+
+def _chunks(text: str) -> List[str]:
+    """Split text into token-ish pieces, keeping whitespace."""
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+# ---------------------------------------------------------------------------
+# App
+# ---------------------------------------------------------------------------
+
+app = FastAPI(title="Fake LLM Server", description="OpenAI-compatible stand-in for benchmarks and CI")
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": m, "object": "model", "owned_by": "fake"} for m in MODELS]}
+
+
+@app.get("/_fake/stats")
+async def get_stats():
+    return {"config": config, "stats": stats}
+
+
+@app.post("/_fake/config")
+async def set_config(request: Request):
+    configure(**(await request.json()))
+    return {"config": config}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", MODELS[0])
+    stats["requests"] += 1
+    if _has_image(messages):
+        stats["vision"] += 1
+
+    if _rng.random() < config["error_rate"]:
+        stats["errors"] += 1
+        await asyncio.sleep(sample_latency_s(config["latency"]) / 4)
+        status = int(_rng.choice(str(config["error_status"]).split(",")))
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": f"Injected failure ({status})", "type": "fake_error"}},
+        )
+
+    if _rng.random() < config["slow_rate"]:
+        stats["slow"] += 1
+        first_token_s = sample_latency_s(config["slow_latency"])
+    else:
+        first_token_s = sample_latency_s(config["latency"])
+
+    content = canned_response(messages)
+    max_tokens = body.get("max_tokens")
+    pieces = _chunks(content)
+    if max_tokens:
+        pieces = pieces[: max(int(max_tokens), 1)]
+        content = "".join(pieces)
+    prompt_tokens = _approx_tokens(_message_text(messages))
+    completion_tokens = len(pieces)
+    per_token_s = 1.0 / config["tokens_per_s"] if config["tokens_per_s"] > 0 else 0.0
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+    if body.get("stream"):
+        stats["streamed"] += 1
+
+        async def event_stream():
+            await asyncio.sleep(first_token_s)
+            base = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model}
+            yield "data: " + json.dumps({**base, "choices": [
+                {"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}
+            ]}) + "\n\n"
+            for piece in pieces:
+                yield "data: " + json.dumps({**base, "choices": [
+                    {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+                ]}) + "\n\n"
+                if per_token_s:
+                    await asyncio.sleep(per_token_s)
+            yield "data: " + json.dumps({**base, "choices": [
+                {"index": 0, "delta": {}, "finish_reason": "stop"}
+            ], "usage": usage}) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    await asyncio.sleep(first_token_s + per_token_s * completion_tokens)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": usage,
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("FAKE_LLM_PORT", "8089")))
+    parser.add_argument("--latency", default=None)
+    parser.add_argument("--tokens-per-s", type=float, default=None)
+    parser.add_argument("--slow-rate", type=float, default=None)
+    parser.add_argument("--slow-latency", default=None)
+    parser.add_argument("--error-rate", type=float, default=None)
+    parser.add_argument("--error-status", default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    configure(**{k: v for k, v in vars(args).items() if v is not None and k not in ("host", "port")})
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,175 @@
+"""
+Lexical Index
+=============
+
+BM25 keyword index over the same case texts as the vector store, used by
+``VectorService`` for hybrid (lexical + dense) retrieval.
+
+MiniLM embeddings blur exact tokens: a query for "tacrolimus" or
+"pheochromocytoma" ranks cases that *sound* similar above the one case
+that actually names the drug or diagnosis.  BM25 is exact on those terms,
+so the two rankings are fused with reciprocal rank fusion in
+``VectorService.query_similar``.
+
+Backed by a SQLite FTS5 table (case and diacritics folded, no stemming —
+the point is exact terms) in one file next to the vector store:
+
+  docs         rowid → encounter_id, doctor_id   (stable FTS rowids, doctor filter)
+  cases        FTS5(body)                         (rowid = docs.rowid)
+  cases_vocab  fts5vocab: term → document frequency
+
+Query terms found in more than ``LEXICAL_MAX_DF`` of the documents are
+dropped before matching.  Their IDF is close to zero, so they barely move
+BM25, but OR-ing them in makes FTS5 score a large share of the corpus
+("pain", "patient" …).  A query with only common terms returns nothing
+and retrieval falls back to the dense ranking alone.
+
+Configuration (env):
+  LEXICAL_INDEX_PATH   SQLite file  (default <CHROMA_PERSIST_DIR>/lexical.sqlite3)
+  LEXICAL_MAX_DF       max document fraction of a query term  (default 0.05)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "")
+
+LEXICAL_MAX_DF = float(os.getenv("LEXICAL_MAX_DF", "0.05"))
+
+# Below this many matching documents a term is always kept (small corpora)
+_MIN_DF_CUTOFF = 100
+
+# Distinct query terms sent to FTS5; long case texts (similar-case lookups)
+# keep their first terms, which cover the chief complaint and diagnosis
+MAX_QUERY_TERMS = 64
+
+# SQLite limits the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def query_terms(text: str) -> List[str]:
+    """Distinct lower-cased terms of *text*, in order, at most ``MAX_QUERY_TERMS``."""
+    terms: List[str] = []
+    for token in _TOKEN.findall(text.lower()):
+        if token not in terms:
+            terms.append(token)
+            if len(terms) >= MAX_QUERY_TERMS:
+                break
+    return terms
+
+
+class LexicalIndex:
+    """SQLite FTS5 BM25 index keyed by encounter id."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " rowid INTEGER PRIMARY KEY,"
+            " encounter_id TEXT NOT NULL UNIQUE,"
+            " doctor_id TEXT NOT NULL DEFAULT '')"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS docs_doctor ON docs (doctor_id)")
+        self._db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS cases USING fts5("
+            " body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS cases_vocab USING fts5vocab(cases, row)")
+        self._db.commit()
+        logger.info("Lexical index ready  (%s, %d documents)", path, self.count())
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def upsert(self, ids: Sequence[str], doctor_ids: Sequence[str], texts: Sequence[str]) -> None:
+        with self._lock, self._db:
+            for eid, doctor_id, text in zip(ids, doctor_ids, texts):
+                self._db.execute(
+                    "INSERT INTO docs (encounter_id, doctor_id) VALUES (?, ?)"
+                    " ON CONFLICT (encounter_id) DO UPDATE SET doctor_id = excluded.doctor_id",
+                    (eid, doctor_id or ""),
+                )
+                rowid = self._db.execute(
+                    "SELECT rowid FROM docs WHERE encounter_id = ?", (eid,)
+                ).fetchone()[0]
+                self._db.execute("DELETE FROM cases WHERE rowid = ?", (rowid,))
+                self._db.execute("INSERT INTO cases (rowid, body) VALUES (?, ?)", (rowid, text))
+
+    def delete(self, ids: Sequence[str]) -> None:
+        ids = list(ids)
+        with self._lock, self._db:
+            for start in range(0, len(ids), _SQL_CHUNK):
+                chunk = ids[start:start + _SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                self._db.execute(
+                    f"DELETE FROM cases WHERE rowid IN"
+                    f" (SELECT rowid FROM docs WHERE encounter_id IN ({marks}))",
+                    chunk,
+                )
+                self._db.execute(f"DELETE FROM docs WHERE encounter_id IN ({marks})", chunk)
+
+    def reset(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM cases")
+            self._db.execute("DELETE FROM docs")
+
+    def search(
+        self, text: str, limit: int, doctor_id: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Best-first ``(encounter_id, bm25)`` matches for *text*.
+
+        FTS5's ``bm25()`` is lower-is-better; it is negated here so larger
+        scores are better, like cosine similarity.
+        """
+        terms = query_terms(text)
+        if not terms:
+            return []
+        with self._lock:
+            total = self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            marks = ",".join("?" * len(terms))
+            frequency = dict(self._db.execute(
+                f"SELECT term, doc FROM cases_vocab WHERE term IN ({marks})", terms
+            ))
+        cutoff = max(total * LEXICAL_MAX_DF, _MIN_DF_CUTOFF)
+        terms = [t for t in terms if 0 < frequency.get(t, 0) <= cutoff]
+        if not terms:
+            return []
+        expression = " OR ".join(f'"{t}"' for t in terms)
+        sql = (
+            "SELECT docs.encounter_id, -bm25(cases) AS score"
+            " FROM cases JOIN docs ON docs.rowid = cases.rowid"
+            " WHERE cases MATCH ?"
+        )
+        params: List[Any] = [expression]
+        if doctor_id:
+            sql += " AND docs.doctor_id = ?"
+            params.append(doctor_id)
+        sql += " ORDER BY bm25(cases) LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [(eid, float(score)) for eid, score in self._db.execute(sql, params)]
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "documents": self.count()}
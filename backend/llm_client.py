@@ -0,0 +1,413 @@
+"""
+Resilient LLM Client
+====================
+
+One shared OpenAI-compatible client for the Groq dependency, used by every
+AI endpoint instead of a bare ``OpenAI(...)`` per module.
+
+When Groq slows down, un-guarded calls pile up until every worker thread is
+stuck waiting on it.  This wrapper bounds that damage:
+
+  * **Timeouts** — every request has a hard client-side timeout.
+  * **Bulkhead** — at most ``LLM_MAX_CONCURRENCY`` calls are in flight;
+    callers that cannot get a slot quickly fail fast instead of queueing.
+    A streamed call holds its slot until the stream is read or closed.
+  * **Circuit breaker** — trips *open* when, over a sliding window of recent
+    calls, the failure rate or the slow-call rate crosses a threshold.
+    While open, calls fail immediately with :class:`LLMUnavailableError`.
+    After a cool-down one probe call is let through (*half-open*); success
+    closes the breaker, failure re-opens it.
+  * **Hedged requests** — :meth:`LLMClient.create_hedged` sends a second
+    request to a secondary model if the primary has not answered within
+    ``hedge_after_s`` and returns whichever finishes first.
+
+Configuration (env):
+  LLM_BASE_URL              OpenAI-compatible endpoint (default: Groq)
+  LLM_TIMEOUT_S             per-request timeout            (default 30)
+  LLM_MAX_RETRIES           client retries                 (default 1)
+  LLM_MAX_CONCURRENCY       in-flight call limit           (default 8)
+  LLM_QUEUE_TIMEOUT_S       wait for a free slot           (default 2)
+  LLM_BREAKER_WINDOW        calls in the sliding window    (default 20)
+  LLM_BREAKER_MIN_CALLS     calls before the breaker can trip (default 5)
+  LLM_BREAKER_FAILURE_RATE  failure ratio that trips it    (default 0.5)
+  LLM_BREAKER_SLOW_CALL_S   latency counted as "slow"      (default 15)
+  LLM_BREAKER_SLOW_RATE     slow-call ratio that trips it  (default 0.5)
+  LLM_BREAKER_COOLDOWN_S    open → half-open delay         (default 30)
+  LLM_HEDGE_MODEL           secondary model for hedging    (default: off)
+  LLM_HEDGE_AFTER_S         hedge delay                    (default 3)
+"""
+
+from __future__ import annotations
+
+import os
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, Any, Deque, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", GROQ_BASE_URL)
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "2"))
+
+BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_CALL_S = float(os.getenv("LLM_BREAKER_SLOW_CALL_S", "15"))
+BREAKER_SLOW_RATE = float(os.getenv("LLM_BREAKER_SLOW_RATE", "0.5"))
+BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL", "")
+LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "3"))
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the LLM is not configured, the breaker is open, or it is saturated."""
+
+    def __init__(self, message: str, retry_after_s: float = 0.0) -> None:
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------------
+
+class CircuitBreaker:
+    """Sliding-window breaker tripping on failure rate or slow-call rate."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        slow_call_s: float = BREAKER_SLOW_CALL_S,
+        slow_rate: float = BREAKER_SLOW_RATE,
+        cooldown_s: float = BREAKER_COOLDOWN_S,
+    ) -> None:
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_s = slow_call_s
+        self.slow_rate = slow_rate
+        self.cooldown_s = cooldown_s
+
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=window)  # (failed, slow)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._trips = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_s:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(self.cooldown_s - (time.monotonic() - self._opened_at), 0.0)
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True   # exactly one probe
+                return True
+            self._rejected += 1
+            return False
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot that was never used."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record(self, failed: bool, latency_s: float) -> None:
+        slow = latency_s >= self.slow_call_s
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if failed or slow:
+                    self._trip()
+                else:
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                self._probe_in_flight = False
+                return
+            if self._state == self.OPEN:
+                return   # stragglers that started before the breaker tripped
+
+            self._calls.append((failed, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            n = len(self._calls)
+            failures = sum(1 for f, _ in self._calls if f)
+            slows = sum(1 for _, s in self._calls if s)
+            if failures / n >= self.failure_rate or slows / n >= self.slow_rate:
+                self._trip()
+
+    def _trip(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self._trips += 1
+        logger.warning("LLM circuit breaker OPEN (cool-down %.0fs)", self.cooldown_s)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            n = len(self._calls)
+            return {
+                "state": state,
+                "window_calls": n,
+                "window_failure_rate": round(sum(1 for f, _ in self._calls if f) / n, 3) if n else 0.0,
+                "window_slow_rate": round(sum(1 for _, s in self._calls if s) / n, 3) if n else 0.0,
+                "trips": self._trips,
+                "rejected": self._rejected,
+            }
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class LLMClient:
+    """Breaker + bulkhead + timeout wrapper over an OpenAI-compatible client."""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str = LLM_BASE_URL,
+        timeout_s: float = LLM_TIMEOUT_S,
+        max_retries: int = LLM_MAX_RETRIES,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        queue_timeout_s: float = LLM_QUEUE_TIMEOUT_S,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.base_url = base_url
+        self._api_key = api_key or None
+        self._timeout_s = timeout_s
+        self._max_retries = max_retries
+        # Built on first use / by open(): importing openai takes about a second
+        self._client: Optional["OpenAI"] = None
+        self._client_lock = threading.Lock()
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._queue_timeout_s = queue_timeout_s
+        # Hedged requests run their legs here so the caller can return early
+        self._hedge_pool = ThreadPoolExecutor(
+            max_workers=max_concurrency * 2, thread_name_prefix="llm-hedge"
+        )
+
+    @classmethod
+    def from_env(cls) -> "LLMClient":
+        return cls(api_key=os.getenv("GROQ_API_KEY"))
+
+    @property
+    def available(self) -> bool:
+        return self._api_key is not None
+
+    def open(self) -> Optional["OpenAI"]:
+        """The underlying OpenAI client, created on first call (None without a key)."""
+        if self._client is None and self._api_key is not None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+
+                    self._client = OpenAI(
+                        api_key=self._api_key,
+                        base_url=self.base_url,
+                        timeout=self._timeout_s,
+                        max_retries=self._max_retries,
+                    )
+        return self._client
+
+    def warm_up(self) -> None:
+        """
+        Open a pooled connection to the endpoint (DNS, TLS) without spending
+        a completion: lists the models.  Not recorded by the breaker.
+        """
+        client = self.open()
+        if client is None:
+            raise LLMUnavailableError("GROQ_API_KEY not configured")
+        client.models.list()
+
+    # ---- calls ------------------------------------------------------------
+
+    def create(self, **kwargs) -> Any:
+        """
+        ``chat.completions.create`` guarded by the breaker and the bulkhead.
+
+        With ``stream=True`` the response is a :class:`_GuardedStream`: it
+        keeps the bulkhead slot until the stream is exhausted, fails or is
+        closed, and the call is recorded then (see there).
+        """
+        client = self.open()
+        if client is None:
+            raise LLMUnavailableError("GROQ_API_KEY not configured")
+        if not self.breaker.allow_request():
+            retry_after = self.breaker.retry_after()
+            raise LLMUnavailableError(
+                f"LLM temporarily unavailable (circuit open, retry in {retry_after:.0f}s)",
+                retry_after_s=retry_after,
+            )
+        if not self._slots.acquire(timeout=self._queue_timeout_s):
+            # Saturated: do not count against the breaker, just shed load
+            self.breaker.release_probe()
+            raise LLMUnavailableError("LLM busy (too many concurrent requests)", retry_after_s=1.0)
+
+        started = time.monotonic()
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except Exception:
+            self._slots.release()
+            self.breaker.record(failed=True, latency_s=time.monotonic() - started)
+            raise
+        if kwargs.get("stream"):
+            return _GuardedStream(response, self, started)   # owns the slot now
+        self._slots.release()
+        self.breaker.record(failed=False, latency_s=time.monotonic() - started)
+        return response
+
+    def create_hedged(
+        self,
+        hedge_model: Optional[str] = None,
+        hedge_after_s: float = LLM_HEDGE_AFTER_S,
+        **kwargs,
+    ) -> Any:
+        """
+        Send the request; if it has not completed after *hedge_after_s*,
+        send the same request to *hedge_model* and return the first
+        successful response.  Without a hedge model this is :meth:`create`.
+        """
+        hedge_model = hedge_model if hedge_model is not None else LLM_HEDGE_MODEL
+        if not hedge_model or hedge_model == kwargs.get("model"):
+            return self.create(**kwargs)
+
+        primary = self._hedge_pool.submit(self.create, **kwargs)
+        done, _ = wait([primary], timeout=hedge_after_s)
+        if done and primary.exception() is None:
+            return primary.result()
+
+        legs = [primary]
+        if self.breaker.state == CircuitBreaker.CLOSED:
+            legs.append(self._hedge_pool.submit(self.create, **{**kwargs, "model": hedge_model}))
+
+        error: Optional[BaseException] = None
+        pending = set(legs)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error  # every leg failed
+
+    # ---- status -----------------------------------------------------------
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "configured": self.available,
+            "base_url": self.base_url,
+            "hedge_model": LLM_HEDGE_MODEL or None,
+            "breaker": self.breaker.snapshot(),
+        }
+
+
+class _GuardedStream:
+    """
+    A streamed completion that holds its bulkhead slot while it is read.
+
+    The outcome is recorded once, when the stream ends: a failure if reading
+    it raised, otherwise a success whose latency is the time to the first
+    chunk (a long answer is not a slow provider).  A stream the caller closes
+    early (the client went away) is not recorded; a half-open probe slot is
+    given back instead.
+    """
+
+    def __init__(self, stream: Any, client: LLMClient, started: float) -> None:
+        self._stream = stream
+        self._client = client
+        self._started = started
+        self._first_chunk_s: Optional[float] = None
+        self._finished = False
+        self._closed = False
+        # close() may come from another thread than the one reading chunks
+        self._finish_lock = threading.Lock()
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                if self._first_chunk_s is None:
+                    self._first_chunk_s = time.monotonic() - self._started
+                yield chunk
+        except Exception:
+            # Reading fails too when close() shuts the stream underneath it
+            self._finish(failed=None if self._closed else True)
+            raise
+        self._finish(failed=False)
+
+    def _finish(self, failed: Optional[bool]) -> None:
+        """Record the outcome (``None``: abandoned, not recorded) and free the slot."""
+        with self._finish_lock:
+            if self._finished:
+                return
+            self._finished = True
+        breaker = self._client.breaker
+        if failed is None:
+            breaker.release_probe()
+        else:
+            elapsed_s = time.monotonic() - self._started
+            latency_s = elapsed_s if failed or self._first_chunk_s is None else self._first_chunk_s
+            breaker.record(failed=failed, latency_s=latency_s)
+        self._client._slots.release()
+
+    def close(self) -> None:
+        self._closed = True
+        try:
+            self._stream.close()
+        finally:
+            self._finish(failed=None)
+
+    def __enter__(self) -> "_GuardedStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        # Never leak a slot, even if the caller neither read nor closed it
+        if not self._finished:
+            self._finish(failed=None)
+
+
+# Shared instance used by all API modules
+llm = LLMClient.from_env()
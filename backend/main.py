@@ -1,5 +1,13 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from db import init_clients
+from llm_client import llm
+import warmup
+from apis.health import router as health_router
 from apis.auth import router as auth_router
 from apis.analyze_encounter import router as analysis_router
 from apis.analyze_xray import router as xray_analysis_router
@@ -7,14 +15,34 @@ from apis.save_encounter import router as save_encounter_router
 from apis.search_patient import router as search_router
 from apis.encounters import router as encounters_router
 from apis.patient_education import router as patient_education_router
+from apis.education_templates import router as education_templates_router
 from apis.documents import router as documents_router
 from apis.medicine_api import router as medicine_router
 from apis.case_similarity import router as case_similarity_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created here, not at import: importing the app stays cheap
+    # (heavy SDKs load on first use) and a missing key does not break startup
+    await run_in_threadpool(init_clients)
+    if llm.available:
+        await run_in_threadpool(llm.open)
+        print("Groq API configured successfully!")
+    else:
+        print("WARNING: GROQ_API_KEY not set. Encounter and X-ray analysis will not work.")
+    # Warm dependencies in the background: /health/live answers meanwhile,
+    # /health/ready once it is done
+    warming = asyncio.create_task(warmup.run())
+    yield
+    warming.cancel()
+
+
 app = FastAPI(
     title="MediCoPilot API",
     description="Medical diagnosis analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -27,6 +55,7 @@ app.add_middleware(
 )
 
 # Include routers
+app.include_router(health_router)
 app.include_router(auth_router)
 app.include_router(analysis_router)
 app.include_router(xray_analysis_router)
@@ -34,6 +63,7 @@ app.include_router(save_encounter_router)
 app.include_router(search_router)
 app.include_router(encounters_router)
 app.include_router(patient_education_router)
+app.include_router(education_templates_router)
 app.include_router(documents_router)
 app.include_router(medicine_router)
 app.include_router(case_similarity_router)
@@ -46,11 +76,14 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
             "authentication": "/auth/*",
             "analysis": "/analysis/encounter",
             "xray_analysis": "/analysis/xray",
             "save_encounter": "/encounter/save",
-            "patient_education": "/patient-education/*"
+            "patient_education": "/patient-education/*",
+            "education_templates": "/education-templates/*"
         }
     }
 
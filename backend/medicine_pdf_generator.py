@@ -4,11 +4,6 @@ Generates patient-friendly PDF documents with medicine information only.
 These PDFs can be shared without revealing patient conditions or diagnosis.
 """
 
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
 from io import BytesIO
 from datetime import datetime
 from typing import List, Dict, Optional
@@ -110,6 +105,13 @@ def generate_medicine_pdf(medicines: List[MedicineInfo], patient_name: str = "Pa
     Generate a PDF with medicine information only.
     Returns the PDF as bytes.
     """
+    # reportlab is only needed here; keep it out of app startup
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib import colors
+
     # Create BytesIO buffer
     pdf_buffer = BytesIO()
     
@@ -0,0 +1,16 @@
+-- Migration 003: Add rolling patient state for delta summarisation
+-- save_encounter keeps one compact, structured state document per patient
+-- (active problems, current medications, vitals trend, last summary) and
+-- sends only the new encounter's changes to the LLM on follow-up visits.
+-- Run this in the Supabase SQL editor.
+
+CREATE TABLE IF NOT EXISTS public.patient_state (
+  patient_id uuid NOT NULL,
+  state jsonb NOT NULL DEFAULT '{}'::jsonb,
+  updated_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT patient_state_pkey PRIMARY KEY (patient_id),
+  CONSTRAINT patient_state_patient_id_fkey FOREIGN KEY (patient_id) REFERENCES public.patients(id)
+);
+
+COMMENT ON TABLE public.patient_state IS 'Bounded rolling patient state used by delta summarisation (see backend/patient_state.py)';
+COMMENT ON COLUMN public.patient_state.state IS 'JSON object {active_problems, medications, allergies, vitals_trend, last_summary, last_history_hash, visits}';
@@ -0,0 +1,39 @@
+-- Migration 004: Diagnosis-keyed patient education templates
+-- Education documents for common diagnoses are generated once, reviewed by
+-- a doctor, and then reused with a short personalisation pass instead of a
+-- full LLM generation on every encounter save.
+-- Run this in the Supabase SQL editor.
+
+CREATE TABLE IF NOT EXISTS public.education_templates (
+  id uuid NOT NULL DEFAULT gen_random_uuid(),
+  diagnosis_key text NOT NULL UNIQUE,
+  diagnosis text,
+  content text NOT NULL,
+  status text DEFAULT 'draft'::text CHECK (status = ANY (ARRAY['draft'::text, 'approved'::text, 'rejected'::text])),
+  generation_tokens integer DEFAULT 0,
+  reviewed_by uuid,
+  reviewed_at timestamp with time zone,
+  created_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT education_templates_pkey PRIMARY KEY (id),
+  CONSTRAINT education_templates_reviewed_by_fkey FOREIGN KEY (reviewed_by) REFERENCES public.doctors(id)
+);
+
+-- One row per education generation, for hit-rate / tokens-saved reporting
+CREATE TABLE IF NOT EXISTS public.education_generation_log (
+  id uuid NOT NULL DEFAULT gen_random_uuid(),
+  diagnosis_key text,
+  template_id uuid,
+  mode text NOT NULL CHECK (mode = ANY (ARRAY['template'::text, 'full'::text])),
+  prompt_tokens integer DEFAULT 0,
+  completion_tokens integer DEFAULT 0,
+  baseline_tokens integer DEFAULT 0,
+  created_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT education_generation_log_pkey PRIMARY KEY (id),
+  CONSTRAINT education_generation_log_template_id_fkey FOREIGN KEY (template_id) REFERENCES public.education_templates(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_education_templates_status ON public.education_templates(status);
+CREATE INDEX IF NOT EXISTS idx_education_generation_log_created ON public.education_generation_log(created_at);
+
+COMMENT ON COLUMN public.education_templates.diagnosis_key IS 'Normalised diagnosis (see backend/education_templates.py normalise_diagnosis)';
+COMMENT ON COLUMN public.education_generation_log.baseline_tokens IS 'Tokens the full generation of the template cost; saving = baseline - (prompt + completion)';
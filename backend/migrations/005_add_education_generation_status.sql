@@ -0,0 +1,11 @@
+-- Migration 005: Track streamed patient education generation status
+-- POST /patient-education/generate/{encounter_id}/stream saves the content
+-- when the stream completes, and saves whatever was generated so far if the
+-- stream is interrupted.  generation_status tells the two apart.
+-- Run this in the Supabase SQL editor.
+
+ALTER TABLE public.patient_education
+ADD COLUMN IF NOT EXISTS generation_status text DEFAULT 'complete'::text
+  CHECK (generation_status = ANY (ARRAY['complete'::text, 'partial'::text]));
+
+COMMENT ON COLUMN public.patient_education.generation_status IS 'complete, or partial when a streamed generation was interrupted';
@@ -0,0 +1,47 @@
+-- Migration 006: Aggregate the education template report in SQL
+-- GET /education-templates/report used to page every row of
+-- education_generation_log into the API process and count there.  This
+-- function does the counting in the database and returns one JSON object,
+-- so the report costs a single round trip however large the log grows.
+-- Run this in the Supabase SQL editor.
+
+CREATE OR REPLACE FUNCTION public.education_template_report(since timestamp with time zone DEFAULT NULL)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+  WITH log AS (
+    SELECT coalesce(diagnosis_key, '') AS diagnosis_key,
+           mode = 'template' AS hit,
+           coalesce(prompt_tokens, 0) + coalesce(completion_tokens, 0) AS used,
+           coalesce(baseline_tokens, 0) AS baseline
+    FROM public.education_generation_log
+    WHERE since IS NULL OR created_at >= since
+  ),
+  missed AS (
+    SELECT diagnosis_key,
+           count(*) FILTER (WHERE hit) AS hits,
+           count(*) FILTER (WHERE NOT hit) AS misses
+    FROM log
+    GROUP BY diagnosis_key
+    HAVING count(*) FILTER (WHERE NOT hit) > 0
+    ORDER BY misses DESC
+    LIMIT 10
+  )
+  SELECT jsonb_build_object(
+    'total_generations', (SELECT count(*) FROM log),
+    'template_hits', (SELECT count(*) FROM log WHERE hit),
+    'tokens_used', (SELECT coalesce(sum(used), 0) FROM log),
+    'tokens_saved', (SELECT coalesce(sum(greatest(baseline - used, 0)), 0) FROM log WHERE hit),
+    'templates_approved', (SELECT count(*) FROM public.education_templates WHERE status = 'approved'),
+    'templates_pending_review', (SELECT count(*) FROM public.education_templates WHERE status = 'draft'),
+    'top_missed_diagnoses', coalesce(
+      (SELECT jsonb_agg(jsonb_build_object('diagnosis_key', diagnosis_key, 'hits', hits, 'misses', misses)
+                        ORDER BY misses DESC)
+       FROM missed),
+      '[]'::jsonb
+    )
+  );
+$$;
+
+COMMENT ON FUNCTION public.education_template_report(timestamp with time zone) IS 'Template hit rate and tokens saved (see backend/education_templates.py build_report)';
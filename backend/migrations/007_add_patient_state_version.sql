@@ -0,0 +1,13 @@
+-- Migration 007: Optimistic concurrency for the rolling patient state
+-- save_encounter reads the state, merges the new encounter into it and
+-- writes it back.  Two encounters saved at the same time for one patient
+-- would both read the same state, and the second write dropped the first
+-- visit.  Writes are now conditional on the version that was read
+-- (UPDATE ... WHERE version = <read>) and bump it; a writer that loses the
+-- race reloads and merges again.
+-- Run this in the Supabase SQL editor.
+
+ALTER TABLE public.patient_state
+ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN public.patient_state.version IS 'Incremented on every write; writes are conditional on the version read (see backend/patient_state.py save_state)';
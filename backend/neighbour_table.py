@@ -0,0 +1,238 @@
+"""
+Neighbour Table
+===============
+
+Precomputed similar-case lists: the top ``NEIGHBOUR_K`` nearest neighbours
+(cosine, excluding itself) of every indexed encounter, stored in one SQLite
+file next to the vector store.  The similar-cases panel on the encounter
+page is opened far more often than encounters are saved, so reading a list
+replaces a vector search.
+
+Maintenance is incremental (see ``VectorService``):
+
+  - indexing an encounter computes its own list with one vector query
+    (one batched query per page when backfilling)
+  - the new encounter is inserted into the lists of those neighbours whose
+    K-th score it beats.  Neighbours are taken from the new encounter's
+    own candidates, so this is the symmetric approximation of a reverse
+    k-NN update
+  - lists are keyed to the fingerprint of the text they were computed
+    from, and record the fingerprint of every neighbour as well.  A
+    missing or stale list, one holding a neighbour that has since been
+    re-indexed with other text (its old score no longer holds), or one
+    that deletions have left short, is recomputed from the stored vector
+    on lookup.  Encounters that are not indexed with the current text fall
+    back to live search
+
+Lists are dense (cosine) rankings, which is what the similar-cases
+endpoints rank encounters by; hybrid BM25 fusion (not maintainable
+incrementally) stays on free-text search.  A list's ranking is therefore
+the same as the live dense search it stands in for.
+
+Row layout (``neighbours``):
+  encounter_id   source encounter
+  fingerprint    content fingerprint of the source text
+  ids            neighbour ids, best first, ``\\x1f``-separated
+  scores         float32 cosine scores, same order
+  min_score      score of the last entry (K-th once the list is full)
+  fingerprints   content fingerprints of the neighbours, same order
+
+Configuration (env):
+  NEIGHBOUR_TABLE_ENABLED   1 / 0  (default 1)
+  NEIGHBOUR_TABLE_PATH      SQLite file  (default <CHROMA_PERSIST_DIR>/neighbours.sqlite3)
+  NEIGHBOUR_K               neighbours kept per encounter  (default 20)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+NEIGHBOUR_TABLE_ENABLED = os.getenv("NEIGHBOUR_TABLE_ENABLED", "1") != "0"
+
+NEIGHBOUR_TABLE_PATH = os.getenv("NEIGHBOUR_TABLE_PATH", "")
+
+# The similar-cases API allows top_k up to 20
+NEIGHBOUR_K = int(os.getenv("NEIGHBOUR_K", "20"))
+
+_SEP = "\x1f"
+
+# SQLite limits the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+# (neighbour ids, scores, neighbour fingerprints), best first
+NeighbourList = Tuple[List[str], List[float], List[str]]
+
+
+class NeighbourTable:
+    """SQLite table of per-encounter top-K neighbour lists."""
+
+    def __init__(self, path: str, k: int = NEIGHBOUR_K) -> None:
+        self.path = path
+        self.k = k
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS neighbours ("
+            " encounter_id TEXT PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " ids TEXT NOT NULL,"
+            " scores BLOB NOT NULL,"
+            " min_score REAL NOT NULL,"
+            " fingerprints TEXT NOT NULL DEFAULT ''"
+            ") WITHOUT ROWID"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(neighbours)")]
+        if "fingerprints" not in columns:
+            # Lists from before neighbour fingerprints: stale until recomputed
+            self._db.execute("ALTER TABLE neighbours ADD COLUMN fingerprints TEXT NOT NULL DEFAULT ''")
+        self._db.commit()
+        self._hits = 0
+        self._misses = 0
+
+    # ---- encoding -----------------------------------------------------------
+
+    @staticmethod
+    def _row(
+        encounter_id: str,
+        fingerprint: str,
+        ids: Sequence[str],
+        scores: Sequence[float],
+        fingerprints: Sequence[str],
+    ) -> tuple:
+        return (
+            encounter_id,
+            fingerprint,
+            _SEP.join(ids),
+            np.asarray(scores, dtype=np.float32).tobytes(),
+            float(scores[-1]) if len(scores) else -1.0,
+            _SEP.join(fingerprints),
+        )
+
+    @staticmethod
+    def _decode(ids: str, scores: bytes, fingerprints: str) -> NeighbourList:
+        ids_list = ids.split(_SEP) if ids else []
+        fingerprint_list = fingerprints.split(_SEP) if fingerprints else []
+        if len(fingerprint_list) != len(ids_list):
+            fingerprint_list = [""] * len(ids_list)   # unknown: treated as stale
+        return ids_list, np.frombuffer(scores, dtype=np.float32).tolist(), fingerprint_list
+
+    # ---- reads --------------------------------------------------------------
+
+    def get(self, encounter_id: str, fingerprint: str) -> Optional[NeighbourList]:
+        """The stored list, or ``None`` if missing or computed from other text."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint, ids, scores, fingerprints FROM neighbours WHERE encounter_id = ?",
+                (encounter_id,),
+            ).fetchone()
+        if row is None or row[0] != fingerprint:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return self._decode(row[1], row[2], row[3])
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM neighbours").fetchone()[0]
+
+    # ---- writes -------------------------------------------------------------
+
+    def put_many(self, lists: Dict[str, Tuple[str, NeighbourList]]) -> None:
+        """Store ``{encounter_id: (fingerprint, (ids, scores, fingerprints))}`` (each list best first)."""
+        rows = [
+            self._row(eid, fingerprint, ids[:self.k], scores[:self.k], fingerprints[:self.k])
+            for eid, (fingerprint, (ids, scores, fingerprints)) in lists.items()
+        ]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO neighbours VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def offer(self, candidates: Dict[str, List[Tuple[str, float, str]]]) -> int:
+        """
+        Insert new neighbours into existing lists:
+        ``{encounter_id: [(new id, score, its fingerprint), …]}``.
+
+        An entry is added when the list is not full or the score beats its
+        K-th entry.  An offered id already in the list replaces its entry,
+        whatever its new score, and drops out when that is no longer above
+        the K-th; a list left short is recomputed on lookup.  Encounters
+        without a list are skipped (they get one on their next lookup).
+        Returns the number of lists changed.
+        """
+        targets = list(candidates)
+        changed = []
+        with self._lock, self._db:
+            for start in range(0, len(targets), _SQL_CHUNK):
+                chunk = targets[start:start + _SQL_CHUNK]
+                stored = self._db.execute(
+                    f"SELECT encounter_id, fingerprint, ids, scores, min_score, fingerprints FROM neighbours"
+                    f" WHERE encounter_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for eid, fingerprint, ids_text, scores_blob, min_score, fingerprints_text in stored:
+                    ids, scores, fingerprints = self._decode(ids_text, scores_blob, fingerprints_text)
+                    full = len(ids) >= self.k
+                    entries = {nid: (score, nfp) for nid, score, nfp in zip(ids, scores, fingerprints)}
+                    touched = False
+                    for nid, score, nfp in candidates[eid]:
+                        if nid == eid:
+                            continue
+                        if nid in entries:
+                            # Re-indexed neighbour: its old score no longer holds
+                            del entries[nid]
+                            touched = True
+                            if full and score <= min_score:
+                                continue   # fell out of the top K
+                        elif full and score <= min_score:
+                            continue
+                        entries[nid] = (score, nfp)
+                        touched = True
+                    if not touched:
+                        continue
+                    best = sorted(entries.items(), key=lambda item: item[1][0], reverse=True)[:self.k]
+                    changed.append(self._row(
+                        eid, fingerprint,
+                        [i for i, _ in best], [s for _, (s, _) in best], [f for _, (_, f) in best],
+                    ))
+            self._db.executemany("INSERT OR REPLACE INTO neighbours VALUES (?, ?, ?, ?, ?, ?)", changed)
+        return len(changed)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        ids = list(ids)
+        with self._lock, self._db:
+            for start in range(0, len(ids), _SQL_CHUNK):
+                chunk = ids[start:start + _SQL_CHUNK]
+                self._db.execute(
+                    f"DELETE FROM neighbours WHERE encounter_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+
+    def reset(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM neighbours")
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "path": self.path,
+            "k": self.k,
+            "lists": self.count(),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,291 @@
+"""
+Rolling Patient State
+=====================
+
+Compact, structured per-patient state used for *delta* summarisation.
+
+Instead of re-sending the full vitals block and the whole previous summary
+to the LLM on every follow-up visit, ``save_encounter`` keeps a small state
+document per patient in the Supabase ``patient_state`` table and only sends
+what changed in the new encounter.  The state is bounded in size (capped
+problem list, fixed-length vitals trend, truncated text), so the prompt for
+visit #30 of a chronic-care case is the same size as the prompt for visit #2.
+
+State document (stored as jsonb):
+  - active_problems   (list[str])   — maintained by the LLM, capped
+  - medications       (str)         — current prescription string
+  - allergies         (str)
+  - vitals_trend      (dict[str, list]) — last N readings per vital sign
+  - last_summary      (str)         — latest SUMMARY_TEXT, truncated
+  - last_history_hash (str)         — so an inherited history is not resent
+  - visits            (int)
+
+Concurrent encounters for one patient are merged with optimistic
+concurrency: every row carries a ``version`` (migrations/
+007_add_patient_state_version.sql), a write only lands if the row is still
+at the version that was read, and ``update_state`` reloads and merges again
+when another encounter saved in between.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Number of readings kept per vital sign
+TREND_POINTS = int(os.getenv("PATIENT_STATE_TREND_POINTS", "5"))
+
+# Caps that keep the rendered state (and therefore the prompt) bounded
+MAX_PROBLEMS = 10
+MAX_TEXT_CHARS = 600
+
+PATIENT_STATE_TABLE = "patient_state"
+
+# Reload-and-merge attempts after losing a concurrent write
+SAVE_RETRIES = int(os.getenv("PATIENT_STATE_SAVE_RETRIES", "3"))
+
+# (encounter field, label, unit)
+VITAL_FIELDS = [
+    ("temperature", "Temperature", "°F"),
+    ("blood_pressure", "Blood Pressure", ""),
+    ("heart_rate", "Heart Rate", "bpm"),
+    ("respiratory_rate", "Respiratory Rate", "breaths/min"),
+    ("oxygen_saturation", "O2 Saturation", "%"),
+    ("weight", "Weight", "kg"),
+    ("height", "Height", "cm"),
+]
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _clip(text: Optional[str], limit: int = MAX_TEXT_CHARS) -> str:
+    text = (text or "").strip()
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def _hash(text: Optional[str]) -> str:
+    return hashlib.sha256((text or "").strip().encode("utf-8")).hexdigest()[:16]
+
+
+def empty_state() -> Dict[str, Any]:
+    return {
+        "active_problems": [],
+        "medications": "",
+        "allergies": "",
+        "vitals_trend": {},
+        "last_summary": "",
+        "last_history_hash": "",
+        "visits": 0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------------
+
+def load_state(supabase, patient_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+    """
+    Return ``(state, version)`` for *patient_id*.  The state is None if
+    there is none yet; the version is None if there is no row at all.
+    """
+    result = supabase.table(PATIENT_STATE_TABLE).select('state, version').eq(
+        'patient_id', patient_id
+    ).limit(1).execute()
+    if not result.data:
+        return None, None
+    row = result.data[0]
+    if not row.get('state'):
+        return None, row.get('version') or 0
+    state = empty_state()
+    state.update(row['state'])
+    return state, row.get('version') or 0
+
+
+def save_state(supabase, patient_id: str, state: Dict[str, Any], version: Optional[int]) -> bool:
+    """
+    Store *state* if the row is still at *version* (``None``: there is no
+    row yet).  Returns False, writing nothing, if another encounter saved
+    in between.
+    """
+    now = datetime.utcnow().isoformat()
+    if version is None:
+        # ON CONFLICT DO NOTHING: a row created meanwhile comes back empty
+        result = supabase.table(PATIENT_STATE_TABLE).upsert({
+            'patient_id': patient_id,
+            'state': state,
+            'version': 1,
+            'updated_at': now,
+        }, on_conflict='patient_id', ignore_duplicates=True).execute()
+    else:
+        result = supabase.table(PATIENT_STATE_TABLE).update({
+            'state': state,
+            'version': version + 1,
+            'updated_at': now,
+        }).eq('patient_id', patient_id).eq('version', version).execute()
+    return bool(result.data)
+
+
+def update_state(
+    supabase,
+    patient_id: str,
+    state: Optional[Dict[str, Any]],
+    version: Optional[int],
+    merge: Callable[[Optional[Dict[str, Any]]], Dict[str, Any]],
+    retries: int = SAVE_RETRIES,
+) -> bool:
+    """
+    Save ``merge(state)`` against *version*; when another encounter saved
+    first, reload its state and merge into that instead, up to *retries*
+    times.  Returns False if every attempt lost the race.
+    """
+    for attempt in range(retries + 1):
+        if save_state(supabase, patient_id, merge(state), version):
+            return True
+        if attempt < retries:
+            state, version = load_state(supabase, patient_id)
+    return False
+
+
+# ---------------------------------------------------------------------------
+# Delta computation / rendering
+# ---------------------------------------------------------------------------
+
+def encounter_delta(encounter_data: dict, state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Work out what the new encounter adds on top of *state*.
+
+    Only fields that are new or changed are returned, so an unchanged
+    inherited ``history_of_illness`` or repeat prescription costs nothing.
+    """
+    delta: Dict[str, Any] = {"fields": {}, "vitals": {}}
+
+    for field in ("chief_complaint", "diagnosis", "physical_exam"):
+        if encounter_data.get(field):
+            delta["fields"][field] = _clip(encounter_data[field])
+
+    history = encounter_data.get("history_of_illness")
+    if history and _hash(history) != state.get("last_history_hash"):
+        delta["fields"]["history_of_illness"] = _clip(history)
+
+    medications = encounter_data.get("medications")
+    if medications and medications.strip() != (state.get("medications") or "").strip():
+        delta["fields"]["medications"] = _clip(medications)
+
+    trend = state.get("vitals_trend") or {}
+    for field, _, _ in VITAL_FIELDS:
+        value = encounter_data.get(field)
+        if value is None or value == "":
+            continue
+        previous = trend.get(field, [])
+        delta["vitals"][field] = {
+            "value": value,
+            "previous": previous[-1] if previous else None,
+        }
+
+    return delta
+
+
+def render_state(state: Dict[str, Any]) -> str:
+    """Render *state* as a compact, size-bounded prompt block."""
+    lines = []
+    problems = state.get("active_problems") or []
+    lines.append("Active Problems: " + ("; ".join(problems) if problems else "None recorded"))
+    lines.append(f"Current Medications: {_clip(state.get('medications')) or 'None recorded'}")
+    lines.append(f"Known Allergies: {state.get('allergies') or 'None reported'}")
+
+    trend = state.get("vitals_trend") or {}
+    trend_parts = []
+    for field, label, unit in VITAL_FIELDS:
+        readings = trend.get(field)
+        if readings:
+            trend_parts.append(f"{label} {' → '.join(str(r) for r in readings)}{(' ' + unit) if unit else ''}")
+    lines.append("Vitals Trend (oldest → latest): " + ("; ".join(trend_parts) if trend_parts else "None recorded"))
+
+    if state.get("last_summary"):
+        lines.append(f"Last Summary: {state['last_summary']}")
+    lines.append(f"Visits So Far: {state.get('visits', 0)}")
+    return "\n".join(lines)
+
+
+def render_delta(delta: Dict[str, Any]) -> str:
+    """Render the new-encounter delta as a prompt block."""
+    labels = {
+        "chief_complaint": "Chief Complaint",
+        "history_of_illness": "History of Illness (changed)",
+        "diagnosis": "Diagnosis",
+        "medications": "Medications (changed)",
+        "physical_exam": "Physical Exam",
+    }
+    lines = [f"- {labels[k]}: {v}" for k, v in delta["fields"].items()]
+
+    for field, label, unit in VITAL_FIELDS:
+        reading = delta["vitals"].get(field)
+        if not reading:
+            continue
+        suffix = f" {unit}" if unit else ""
+        if reading["previous"] is not None and reading["previous"] != reading["value"]:
+            lines.append(f"- {label}: {reading['value']}{suffix} (was {reading['previous']})")
+        else:
+            lines.append(f"- {label}: {reading['value']}{suffix}")
+
+    return "\n".join(lines) if lines else "- No new findings recorded"
+
+
+# ---------------------------------------------------------------------------
+# Merge
+# ---------------------------------------------------------------------------
+
+def _parse_problem_list(text: Optional[str]) -> List[str]:
+    problems = []
+    for line in (text or "").split("\n"):
+        item = line.strip().lstrip("-*•").strip()
+        if item and item.lower() not in ("none", "n/a"):
+            problems.append(_clip(item, 120))
+    return problems
+
+
+def merge_state(
+    state: Dict[str, Any],
+    encounter_data: dict,
+    patient_data: dict,
+    summary: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Fold a new encounter and its generated summary back into *state*.
+
+    Vitals and medications are merged deterministically; the active problem
+    list comes from the LLM's ACTIVE_PROBLEMS section (falling back to the
+    encounter diagnosis when the model did not return one).
+    """
+    merged = empty_state()
+    merged.update(state or {})
+
+    trend = {k: list(v) for k, v in (merged.get("vitals_trend") or {}).items()}
+    for field, _, _ in VITAL_FIELDS:
+        value = encounter_data.get(field)
+        if value is None or value == "":
+            continue
+        trend[field] = (trend.get(field, []) + [value])[-TREND_POINTS:]
+    merged["vitals_trend"] = trend
+
+    if encounter_data.get("medications"):
+        merged["medications"] = encounter_data["medications"].strip()
+    if encounter_data.get("history_of_illness"):
+        merged["last_history_hash"] = _hash(encounter_data["history_of_illness"])
+    merged["allergies"] = patient_data.get("allergies") or merged.get("allergies") or ""
+
+    problems = _parse_problem_list(summary.get("active_problems"))
+    if not problems:
+        problems = list(merged.get("active_problems") or [])
+        diagnosis = (encounter_data.get("diagnosis") or "").strip()
+        if diagnosis and diagnosis not in problems:
+            problems.append(_clip(diagnosis, 120))
+    merged["active_problems"] = problems[:MAX_PROBLEMS]
+
+    merged["last_summary"] = _clip(summary.get("summary_text"))
+    merged["visits"] = int(merged.get("visits") or 0) + 1
+    return merged
@@ -0,0 +1,171 @@
+"""
+Index Reconciliation
+====================
+
+Finds and repairs drift between the Supabase ``encounters`` table and the
+case-similarity index without a full reindex.  Drift happens when an
+auto-index in ``save_encounter`` fails (the encounter is saved but never
+becomes searchable), when an encounter is deleted or edited outside the
+app, or when a node's index was restored from an older snapshot.
+
+Both sides are folded into ``RECONCILE_BUCKETS`` buckets by a hash of the
+encounter id.  A bucket's digest is the pair count plus the XOR of the
+hashes of its ``(id, fingerprint)`` pairs (``FingerprintBuckets`` in
+``vector_service.py``), where the fingerprint is the one indexing stores:
+a hash of ``build_case_text`` and ``CASE_TEXT_VERSION``.
+
+  1. table side   keyset pages of the case-text columns, fingerprinted
+                  here; an ``(id, fingerprint)`` pair per encounter is held
+                  until the digests are compared
+  2. index side   ``VectorService.bucket_fingerprints``: one scan of the
+                  stored metadata; only the mismatched buckets' pairs
+                  leave the service
+  3. buckets whose digests match are skipped; for the others the ids are
+     diffed against the index's stored fingerprints:
+       missing   in the table (with case text), not in the index
+       stale     in both, fingerprints differ (edited encounter, or
+                 indexed with an older text builder)
+       orphaned  in the index, not in the table (deleted encounter, or
+                 one without case text any more)
+  4. repair       the candidates are re-read by id, so an encounter saved
+                  or deleted while the run was scanning is judged on its
+                  current row; missing and stale ones are indexed (nothing
+                  else is re-embedded), orphans are deleted
+
+Exposed as ``POST /case-similarity/reconcile`` (``dry_run`` reports
+without repairing).
+
+Configuration (env):
+  RECONCILE_BUCKETS    hashed id buckets per run   (default 1024)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from case_text import CASE_TEXT_VERSION, build_case_text, case_document
+from vector_service import FingerprintBuckets, content_fingerprint, fingerprint_bucket
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+RECONCILE_BUCKETS = int(os.getenv("RECONCILE_BUCKETS", "1024"))
+
+# Encounter ids per by-id re-read of repair candidates (kept short: the ids
+# travel in the query string)
+_FETCH_CHUNK = 100
+
+# Ids of each kind listed in the report (the counts are always complete)
+MAX_REPORTED_IDS = 100
+
+# (after id, page size) -> encounter rows ordered by id
+PageFetcher = Callable[[Optional[str], int], List[dict]]
+
+# encounter ids -> encounter rows (unknown ids are absent)
+RowFetcher = Callable[[List[str]], List[dict]]
+
+
+def _table_fingerprints(
+    fetch_page: PageFetcher, buckets: int, page_size: int
+) -> Tuple[FingerprintBuckets, List[Dict[str, str]], int]:
+    """Digests and per-bucket ``{id: fingerprint}`` of the encounters table."""
+    digests = FingerprintBuckets(buckets)
+    members: List[Dict[str, str]] = [{} for _ in range(buckets)]
+    scanned = 0
+    after_id = None
+    while True:
+        page = fetch_page(after_id, page_size)
+        if not page:
+            break
+        scanned += len(page)
+        for row in page:
+            text = build_case_text(row)
+            if text:
+                fingerprint = content_fingerprint(text, CASE_TEXT_VERSION)
+                members[digests.add(row["id"], fingerprint)][row["id"]] = fingerprint
+        if len(page) < page_size:
+            break
+        after_id = page[-1]["id"]
+    return digests, members, scanned
+
+
+def reconcile(
+    vs,
+    fetch_page: PageFetcher,
+    fetch_rows: RowFetcher,
+    buckets: int = RECONCILE_BUCKETS,
+    page_size: int = 500,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Diff the encounters table against the index of *vs* and, unless
+    *dry_run*, repair the missing, stale and orphaned documents.
+
+    Blocking: call it from a worker thread.  Returns the counts of every
+    step (``diffed``: encounters in mismatched buckets) plus up to
+    ``MAX_REPORTED_IDS`` ids of each kind.
+    """
+    started = time.perf_counter()
+    table_digests, table, scanned = _table_fingerprints(fetch_page, buckets, page_size)
+    mismatched, indexed = vs.bucket_fingerprints(table_digests.digests())
+
+    missing: List[str] = []
+    stale: List[str] = []
+    for bucket in mismatched:
+        for eid, fingerprint in table[bucket].items():
+            stored = indexed.get(eid)
+            if stored is None:
+                missing.append(eid)
+            elif stored != fingerprint:
+                stale.append(eid)
+    orphaned = [eid for eid in indexed if eid not in table[fingerprint_bucket(eid, buckets)]]
+    diffed = sum(len(table[bucket]) for bucket in mismatched) + len(orphaned)
+    del table
+
+    reindexed = deleted = 0
+    if not dry_run and (missing or stale or orphaned):
+        candidates = missing + stale + orphaned
+        rows: Dict[str, dict] = {}
+        for start in range(0, len(candidates), _FETCH_CHUNK):
+            for row in fetch_rows(candidates[start:start + _FETCH_CHUNK]):
+                rows[row["id"]] = row
+
+        documents = [doc for doc in (case_document(rows[eid]) for eid in candidates if eid in rows) if doc]
+        for start in range(0, len(documents), page_size):
+            page_indexed, _ = vs.index_encounters_changed(documents[start:start + page_size])
+            reindexed += page_indexed
+
+        keep = {doc["encounter_id"] for doc in documents}
+        gone = [eid for eid in candidates if eid in indexed and eid not in keep]
+        vs.delete_encounters(gone)
+        deleted = len(gone)
+
+    result = {
+        "dry_run": dry_run,
+        "buckets": buckets,
+        "mismatched_buckets": len(mismatched),
+        "table_rows": scanned,
+        "diffed": diffed,
+        "missing": len(missing),
+        "stale": len(stale),
+        "orphaned": len(orphaned),
+        "reindexed": reindexed,
+        "deleted": deleted,
+        "missing_ids": missing[:MAX_REPORTED_IDS],
+        "stale_ids": stale[:MAX_REPORTED_IDS],
+        "orphaned_ids": orphaned[:MAX_REPORTED_IDS],
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+    logger.info(
+        "Reconciled %d encounters: %d/%d buckets differ, %d missing, %d stale, %d orphaned "
+        "(reindexed %d, deleted %d%s) in %.1f s",
+        scanned, len(mismatched), buckets, len(missing), len(stale), len(orphaned),
+        reindexed, deleted, ", dry run" if dry_run else "", result["elapsed_s"],
+    )
+    return result
@@ -0,0 +1,333 @@
+"""
+Background Reindex Jobs
+=======================
+
+Runs case-similarity backfills as background tasks instead of inside the
+HTTP request, so a long backfill no longer dies on a proxy timeout.
+
+Each job pages through ``encounters`` with keyset pagination (see
+``apis/case_similarity._backfill_pages``) and, after every page, checkpoints its
+cursor (the last encounter id) and counters to a small JSON file next to the
+ChromaDB data.  Because the checkpoint lives with the local index it
+describes, a restarted node picks up exactly where its own index left off:
+
+  - ``cancel``  stops a running job after the current page (resumable)
+  - ``resume``  continues a cancelled / failed / interrupted job from its cursor
+  - jobs whose process is gone (a restart cut them off) are reported
+    ``interrupted``
+
+The file is the job table shared by every worker process: it is re-read
+under an exclusive file lock (``<path>.lock``) for every query and change,
+so a job started in one worker can be followed, cancelled or resumed
+through any other.
+
+Backfills are rate limited (encounters per second) so they leave encoder
+capacity for live similarity queries.
+
+Configuration (env):
+  REINDEX_JOBS_PATH    checkpoint file   (default <CHROMA_PERSIST_DIR>/reindex_jobs.json)
+  REINDEX_RATE_LIMIT   encounters/s per job, 0 = unlimited  (default 200)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+REINDEX_JOBS_PATH = os.getenv(
+    "REINDEX_JOBS_PATH",
+    os.path.join(
+        os.getenv("CHROMA_PERSIST_DIR", os.path.join(os.path.dirname(__file__), ".chromadb")),
+        "reindex_jobs.json",
+    ),
+)
+
+REINDEX_RATE_LIMIT = float(os.getenv("REINDEX_RATE_LIMIT", "200"))
+
+# Completed jobs kept in the checkpoint file
+MAX_FINISHED_JOBS = 50
+
+PENDING = "pending"
+RUNNING = "running"
+CANCELLING = "cancelling"
+CANCELLED = "cancelled"
+COMPLETED = "completed"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+
+RESUMABLE = {CANCELLED, FAILED, INTERRUPTED}
+ACTIVE = {PENDING, RUNNING, CANCELLING}
+
+# (after cursor, page_size) -> async iterator of per-page results
+# {"cursor": last id in the page, "scanned": rows, "indexed": rows indexed}
+PageSource = Callable[[Optional[str], int], AsyncIterator[Dict[str, Any]]]
+
+
+class ReindexJobError(Exception):
+    """Raised for invalid job operations (unknown id, wrong state, duplicate scope)."""
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _process_started(pid: int) -> Optional[str]:
+    """Start time of *pid* (clock ticks since boot), to tell a live owner from a reused pid."""
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            return fh.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _owner() -> Dict[str, Any]:
+    return {"pid": os.getpid(), "started": _process_started(os.getpid())}
+
+
+def _owner_alive(job: Dict[str, Any]) -> bool:
+    owner = job.get("owner") or {}
+    pid = owner.get("pid")
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass   # exists, owned by another user
+    return owner.get("started") is None or _process_started(pid) == owner["started"]
+
+
+class ReindexJobManager:
+    """
+    Owns the job table, its JSON checkpoint and the asyncio tasks running jobs.
+
+    The checkpoint file is the job table: every worker process (``uvicorn
+    --workers N``, ``serve.py``) reads it under an exclusive file lock for
+    every query and change, so any worker can report, cancel or resume any
+    job.  A job records the process running it; an active job whose owner
+    is gone is reported ``interrupted``.
+
+    Every table access blocks on the file lock and disk I/O, so none of it
+    runs on the event loop: ``start``/``resume`` and the runner go through
+    ``asyncio.to_thread``, and async callers of ``get``/``list``/``cancel``
+    run them in the threadpool.
+    """
+
+    def __init__(self, path: str = REINDEX_JOBS_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    # ---- persistence --------------------------------------------------------
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as fh:
+                jobs = {job["id"]: job for job in json.load(fh)}
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning("Ignoring unreadable reindex checkpoint %s: %s", self.path, exc)
+            return {}
+        for job in jobs.values():
+            if job["status"] in ACTIVE and not _owner_alive(job):
+                job["status"] = INTERRUPTED   # the process running it is gone
+        return jobs
+
+    def _write(self, jobs: Dict[str, Dict[str, Any]]) -> None:
+        completed = sorted(
+            (j for j in jobs.values() if j["status"] == COMPLETED),
+            key=lambda j: j["updated_at"],
+        )
+        for job in completed[:-MAX_FINISHED_JOBS]:
+            del jobs[job["id"]]
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(list(jobs.values()), fh, indent=1)
+        os.replace(tmp, self.path)   # atomic: a crash never leaves half a file
+
+    @contextmanager
+    def _locked(self, write: bool = True) -> Iterator[Dict[str, Dict[str, Any]]]:
+        """The current job table, read (and, if *write*, saved) under the file lock."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock, open(f"{self.path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            jobs = self._read()
+            yield jobs
+            if write:
+                self._write(jobs)
+
+    # ---- queries ------------------------------------------------------------
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        with self._locked(write=False) as jobs:
+            job = jobs.get(job_id)
+        if job is None:
+            raise ReindexJobError(f"Reindex job {job_id} not found")
+        return self._view(job)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._locked(write=False) as jobs:
+            ordered = sorted(jobs.values(), key=lambda j: j["created_at"], reverse=True)
+        return [self._view(j) for j in ordered]
+
+    @staticmethod
+    def _view(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job dict plus derived throughput."""
+        view = dict(job)
+        view.pop("owner", None)
+        elapsed = job["elapsed_s"]
+        view["throughput_per_s"] = round(job["indexed"] / elapsed, 1) if elapsed else 0.0
+        return view
+
+    # ---- control ------------------------------------------------------------
+
+    async def start(
+        self,
+        pages: PageSource,
+        doctor_id: Optional[str] = None,
+        rate_limit: Optional[float] = None,
+        page_size: int = 500,
+        force: bool = False,
+    ) -> Dict[str, Any]:
+        """Create a job for *doctor_id* (``None`` = every doctor) and start it."""
+        job = await asyncio.to_thread(self._create, doctor_id, rate_limit, page_size, force)
+        self._spawn(job, pages)
+        return self._view(job)
+
+    async def resume(self, job_id: str, pages: PageSource) -> Dict[str, Any]:
+        job = await asyncio.to_thread(self._reopen, job_id)
+        self._spawn(job, pages)
+        return self._view(job)
+
+    def _create(
+        self, doctor_id: Optional[str], rate_limit: Optional[float], page_size: int, force: bool
+    ) -> Dict[str, Any]:
+        with self._locked() as jobs:
+            for job in jobs.values():
+                if job["doctor_id"] == doctor_id and job["status"] in ACTIVE:
+                    raise ReindexJobError(f"Reindex job {job['id']} is already running for this scope")
+
+            job = {
+                "id": str(uuid.uuid4()),
+                "doctor_id": doctor_id,
+                "status": PENDING,
+                "cursor": None,
+                "scanned": 0,
+                "indexed": 0,
+                "pages": 0,
+                "page_size": page_size,
+                "force": force,
+                "rate_limit": REINDEX_RATE_LIMIT if rate_limit is None else rate_limit,
+                "elapsed_s": 0.0,
+                "error": None,
+                "owner": _owner(),
+                "created_at": _now(),
+                "updated_at": _now(),
+                "finished_at": None,
+            }
+            jobs[job["id"]] = job
+        return job
+
+    def _reopen(self, job_id: str) -> Dict[str, Any]:
+        with self._locked() as jobs:
+            job = jobs.get(job_id)
+            if job is None:
+                raise ReindexJobError(f"Reindex job {job_id} not found")
+            if job["status"] not in RESUMABLE:
+                raise ReindexJobError(f"Reindex job {job_id} is {job['status']} and cannot be resumed")
+            job.update(status=PENDING, error=None, finished_at=None, owner=_owner(), updated_at=_now())
+        return job
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        with self._locked() as jobs:
+            job = jobs.get(job_id)
+            if job is None:
+                raise ReindexJobError(f"Reindex job {job_id} not found")
+            if job["status"] not in (PENDING, RUNNING):
+                raise ReindexJobError(f"Reindex job {job_id} is {job['status']} and cannot be cancelled")
+            # The runner (in whichever worker owns the job) reads this between
+            # pages, so the checkpoint stays consistent
+            job.update(status=CANCELLING, updated_at=_now())
+        return self._view(job)
+
+    def _checkpoint(self, job: Dict[str, Any], **changes: Any) -> str:
+        """
+        Merge *changes* into the runner's copy of *job* and save it; returns
+        the status now stored.  A cancel made meanwhile by any worker wins
+        over the runner's ``running``.
+        """
+        with self._locked() as jobs:
+            stored = jobs.setdefault(job["id"], dict(job))
+            if changes.get("status") == RUNNING and stored["status"] == CANCELLING:
+                del changes["status"]
+            job.update(changes, updated_at=_now())
+            job["status"] = changes.get("status", stored["status"])
+            stored.update(job)
+            return job["status"]
+
+    # ---- runner -------------------------------------------------------------
+
+    def _spawn(self, job: Dict[str, Any], pages: PageSource) -> None:
+        task = asyncio.get_running_loop().create_task(self._run(job, pages))
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+
+    async def _acheckpoint(self, job: Dict[str, Any], **changes: Any) -> str:
+        return await asyncio.to_thread(self._checkpoint, job, **changes)
+
+    async def _run(self, job: Dict[str, Any], pages: PageSource) -> None:
+        if await self._acheckpoint(job, status=RUNNING) == CANCELLING:   # cancelled before it got going
+            await self._acheckpoint(job, status=CANCELLED)
+            return
+        rate = job["rate_limit"]
+        started = time.monotonic()
+        processed_this_run = 0
+        elapsed_before = job["elapsed_s"]
+
+        source = pages(job["cursor"], job["page_size"])
+        try:
+            async for page in source:
+                status = await self._acheckpoint(   # after every page
+                    job,
+                    scanned=job["scanned"] + page["scanned"],
+                    indexed=job["indexed"] + page["indexed"],
+                    pages=job["pages"] + 1,
+                    cursor=page["cursor"],
+                    elapsed_s=round(elapsed_before + time.monotonic() - started, 3),
+                )
+                if status != RUNNING:
+                    break      # cancelled; resume continues after this cursor
+
+                # Rate limit: stay at or below `rate` encounters per second
+                processed_this_run += page["scanned"]
+                if rate:
+                    ahead = processed_this_run / rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        await asyncio.sleep(ahead)
+
+            if await self._acheckpoint(job) == CANCELLING:
+                await self._acheckpoint(job, status=CANCELLED)
+            else:
+                await self._acheckpoint(job, status=COMPLETED, finished_at=_now())
+        except Exception as exc:
+            logger.exception("Reindex job %s failed", job["id"])
+            await self._acheckpoint(job, status=FAILED, error=str(exc))
+        finally:
+            await source.aclose()
@@ -0,0 +1,294 @@
+"""
+Production Server
+=================
+
+Pre-fork entry point for production (``main.py`` is the reload-enabled dev
+server):
+
+    python serve.py --workers 4 --port 8001
+
+The parent process imports the app — every router and Pydantic model, the
+SDKs they load on first use, plus the OpenAPI schema — then
+``gc.freeze()``s the heap and forks the workers.  That code is shared
+copy-on-write instead of being imported again by every worker, as
+``uvicorn --workers N`` does (it spawns fresh interpreters).  The
+embedding model is not part of it: it is loaded once by whoever owns the
+vector store.
+
+The parent only imports; it never loads the model, opens the vector store
+or starts threads, so nothing fork-unsafe crosses the fork.  A worker opens
+its ``VectorService`` before it accepts connections and reports to the
+parent when it is serving.  The parent logs every worker's time-to-ready
+and memory:
+
+  RSS      resident pages of the worker
+  PSS      RSS with shared pages divided between the processes sharing them
+  shared   resident pages also mapped by another process (the parent's
+           frozen heap and libraries)
+
+Workers that die are restarted; SIGTERM / SIGINT stop them gracefully.
+
+The vector store must have a single owner: every open store keeps its own
+row allocation and in-memory index, so two processes writing one store
+directory overwrite each other's rows and never see each other's writes.
+More than one worker therefore requires ``VECTOR_SERVICE=sidecar`` (start
+``vector_sidecar.py`` first): the sidecar owns the store and the only copy
+of the model, and the workers forward to it.  ``serve.py`` refuses
+``--workers > 1`` with a local store; its single worker loads the model
+itself.
+
+Configuration (env; the command-line options override them):
+  SERVER_HOST            bind address                   (default 0.0.0.0)
+  SERVER_PORT            port                           (default 8001)
+  SERVER_WORKERS         worker processes               (default: CPU count with
+                         VECTOR_SERVICE=sidecar, else 1)
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import importlib
+import logging
+import os
+import select
+import signal
+import socket
+import time
+from typing import Dict, List, Optional, Set
+
+import uvicorn
+
+from vector_service import VECTOR_SERVICE
+
+logger = logging.getLogger("serve")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8001"))
+
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0")) or (
+    (os.cpu_count() or 1) if VECTOR_SERVICE == "sidecar" else 1
+)
+
+# ---------------------------------------------------------------------------
+# Memory accounting
+# ---------------------------------------------------------------------------
+
+def memory_mb(pid: int) -> Optional[Dict[str, float]]:
+    """RSS / PSS / shared MB of *pid* from ``smaps_rollup`` (Linux only)."""
+    fields: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as fh:
+            for line in fh:
+                key, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[key] = int(value.split()[0])
+    except OSError:
+        return None
+    return {
+        "rss": fields.get("Rss", 0) / 1024,
+        "pss": fields.get("Pss", 0) / 1024,
+        "shared": (fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)) / 1024,
+    }
+
+
+def _describe(memory: Optional[Dict[str, float]]) -> str:
+    if memory is None:
+        return "memory n/a"
+    return "RSS {rss:.0f} MB, PSS {pss:.0f} MB, shared {shared:.0f} MB".format(**memory)
+
+
+# ---------------------------------------------------------------------------
+# Parent: preload
+# ---------------------------------------------------------------------------
+
+def preload() -> None:
+    """Import the app and its lazily imported SDKs, and build its OpenAPI schema."""
+    from main import app
+
+    app.openapi()   # builds the JSON schema of every Pydantic model once
+    # SDKs the app imports on first use (see main.py's lifespan): import
+    # them here so the workers share the modules
+    for module in ("supabase", "openai", "reportlab.platypus"):
+        importlib.import_module(module)
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+class _WorkerServer(uvicorn.Server):
+    """uvicorn server that tells the parent once it accepts connections."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int) -> None:
+        super().__init__(config)
+        self._ready_fd = ready_fd
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            os.write(self._ready_fd, f"{os.getpid()}\n".encode())
+
+
+def _run_worker(sock: socket.socket, ready_fd: int, open_service: bool) -> None:
+    # The parent's handlers only forward signals; uvicorn installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    from main import app
+    from vector_service import VectorService
+
+    if open_service:
+        # Only ever one worker here (see main()): it owns the store.  Model,
+        # store, indexes and threads are all opened after the fork
+        VectorService.get_instance()
+
+    config = uvicorn.Config(app, log_level="info", timeout_graceful_shutdown=30)
+    _WorkerServer(config, ready_fd).run(sockets=[sock])
+
+
+# ---------------------------------------------------------------------------
+# Parent: fork and supervise
+# ---------------------------------------------------------------------------
+
+class Arbiter:
+    """Forks *workers* copies of the app on one listening socket and keeps them running."""
+
+    def __init__(self, sock: socket.socket, workers: int, open_service: bool) -> None:
+        self.sock = sock
+        self.workers = workers
+        self.open_service = open_service
+        self.children: Dict[int, float] = {}   # pid -> fork time
+        self.booting: Set[int] = set()   # forked, not serving yet
+        self.all_ready = False
+        self.stopping = False
+        self._ready_r, self._ready_w = os.pipe()
+        self._pending = b""
+
+    def spawn(self) -> None:
+        forked_at = time.monotonic()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                os.close(self._ready_r)
+                _run_worker(self.sock, self._ready_w, self.open_service)
+            except BaseException:
+                logger.exception("Worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = forked_at
+        self.booting.add(pid)
+
+    def stop(self, *_) -> None:
+        # Always SIGTERM: on Ctrl+C the workers already got the terminal's
+        # SIGINT, and a second SIGINT makes uvicorn skip the graceful shutdown
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _read_ready(self) -> List[int]:
+        self._pending += os.read(self._ready_r, 4096)
+        *lines, self._pending = self._pending.split(b"\n")
+        return [int(line) for line in lines if line]
+
+    def _reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.children.pop(pid, None)
+            if self.stopping:
+                continue
+            if pid in self.booting:
+                # Failed before serving: a restart would fail the same way
+                logger.error("Worker %d failed to start (status %d); shutting down", pid, status)
+                self.stop()
+            else:
+                logger.warning("Worker %d exited (status %d); restarting", pid, status)
+                self.spawn()
+
+    def _on_ready(self, pid: int, started_at: float) -> None:
+        forked_at = self.children.get(pid)
+        if forked_at is None:
+            return
+        now = time.monotonic()
+        logger.info("Worker %d ready in %.2f s  (%s)", pid, now - forked_at, _describe(memory_mb(pid)))
+        self.booting.discard(pid)
+        if not self.booting and not self.all_ready:
+            self.all_ready = True
+            pss = [m["pss"] for m in map(memory_mb, [os.getpid(), *self.children]) if m]
+            logger.info(
+                "%d workers ready %.2f s after launch  (total PSS incl. parent %s)",
+                len(self.children), now - started_at, f"{sum(pss):.0f} MB" if pss else "n/a",
+            )
+
+    def run(self, started_at: float) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            readable, _, _ = select.select([self._ready_r], [], [], 1.0)
+            if readable:
+                for pid in self._read_ready():
+                    self._on_ready(pid, started_at)
+            self._reap()
+
+
+def bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-fork production server for the MediCoPilot API")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    args = parser.parse_args()
+
+    if args.workers > 1 and VECTOR_SERVICE != "sidecar":
+        parser.error(
+            f"--workers {args.workers} needs one owner of the vector store: start "
+            "vector_sidecar.py and set VECTOR_SERVICE=sidecar, or run a single worker"
+        )
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    started_at = time.monotonic()
+
+    preload()
+    # Objects alive now are never freed: keep the collector from touching
+    # (and so copying) their pages in the workers
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        "Preloaded app in %.2f s  (parent %s)",
+        time.monotonic() - started_at, _describe(memory_mb(os.getpid())),
+    )
+
+    sock = bind(args.host, args.port)
+    logger.info("Listening on %s:%d with %d workers", args.host, args.port, args.workers)
+    Arbiter(sock, max(args.workers, 1), open_service=VECTOR_SERVICE != "sidecar").run(started_at)
+
+
+if __name__ == "__main__":
+    main()
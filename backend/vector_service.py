@@ -14,6 +14,16 @@ Model: ``all-MiniLM-L6-v2``  (384-dim, fast, good quality)
          ``pritamdeka/BioBERT-mnli-snli-scinli-scitail-mednli-stsb``
          if you want a biomedical-domain model at the cost of speed.
 
+Store: ChromaDB by default; ``VECTOR_STORE=numpy`` switches to an exact
+search over a memory-mapped float16 matrix (``VECTOR_COMPRESSION`` picks
+float32, float16 or product quantisation with exact re-ranking), and
+``VECTOR_PARTITIONS=doctor`` adds per-doctor partitions for same-doctor
+queries (see ``vector_stores.py``).
+
+Backend: PyTorch by default; ``EMBEDDING_BACKEND=onnx`` / ``onnx-int8`` runs
+the same model on ONNX Runtime (see ``embedding_backends.py``).  Re-index
+after switching to ``onnx-int8`` so stored and query vectors match.
+
 ChromaDB collection schema (metadata per document):
   - encounter_id   (str)
   - doctor_id      (str)
@@ -21,17 +31,60 @@ ChromaDB collection schema (metadata per document):
   - diagnosis      (str)
   - chief_complaint(str)
   - treatments     (str)
+  - fingerprint    (str)  hash of case text + text-builder version
+  - text_version   (int)  version of the case-text builder used
+
+Retrieval is hybrid by default: a BM25 index over the same case texts
+(``lexical_index.py``) is kept alongside the vector store, and
+``query_similar`` fuses the lexical and dense rankings with reciprocal rank
+fusion so exact drug names and rare diagnosis terms are not lost.
+``HYBRID_SEARCH=0`` returns to dense-only search.  Fusion is for short
+free-text queries; callers ranking one encounter against the others pass
+``hybrid=False`` (a whole case text as a BM25 query mostly matches
+boilerplate), which is what the similar-cases endpoints do.
+
+Each indexed encounter also gets a precomputed top-K dense neighbour list
+(``neighbour_table.py``), maintained as encounters are indexed, so the
+similar-cases panel is a lookup instead of a vector search.
+
+Incremental sync state (the created_at watermark) is kept in
+``sync_state.json`` inside CHROMA_PERSIST_DIR, so it lives and dies with
+the index it describes.
+
+``VECTOR_SERVICE=sidecar`` runs the service once, in ``vector_sidecar.py``,
+for all uvicorn workers; ``get_instance()`` then returns a thin client with
+the same methods.
+
+The whole index can be exported to / imported from a single snapshot file
+(``vector_snapshot.py``) to bring up a node without re-encoding:
+
+    python vector_service.py export /path/vectors.zip
+    python vector_service.py import /path/vectors.zip [--replace]
 """
 
 from __future__ import annotations
 
 import os
+import asyncio
+import functools
+import hashlib
+import json
 import logging
-from typing import List, Optional, Dict, Any
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Sequence, Tuple
+
+import numpy as np
 
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from sentence_transformers import SentenceTransformer
+from embedding_backends import EMBEDDING_BACKEND, load_backend
+from embedding_cache import EMBEDDING_CACHE_ENABLED, EmbeddingCache
+from lexical_index import LEXICAL_INDEX_PATH, LexicalIndex
+from neighbour_table import NEIGHBOUR_K, NEIGHBOUR_TABLE_ENABLED, NEIGHBOUR_TABLE_PATH, NeighbourTable
+from vector_snapshot import SNAPSHOT_PAGE_SIZE, SnapshotError, read_manifest, read_pages, write_snapshot
+from vector_stores import open_store
 
 logger = logging.getLogger(__name__)
 
@@ -54,61 +107,401 @@ CHROMA_PERSIST_DIR = os.getenv(
 # ChromaDB collection name
 CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "case_embeddings")
 
+# local: each process loads its own service; sidecar: one shared process
+# (see vector_sidecar.py) and get_instance() returns a client for it
+VECTOR_SERVICE = os.getenv("VECTOR_SERVICE", "local").lower()
+
+# Incremental-sync watermark, stored beside the ChromaDB data
+SYNC_STATE_PATH = os.path.join(CHROMA_PERSIST_DIR, "sync_state.json")
+
+# Store get() is chunked to keep request sizes bounded
+_FINGERPRINT_CHUNK = 1000
+
+# Threads dedicated to CPU-bound encoding / vector queries, so async
+# handlers never run a BERT forward pass on the event-loop thread
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "2"))
+
+# Micro-batching of single-text encodes: concurrent requests are gathered
+# for up to EMBED_BATCH_MAX_WAIT_MS (or until EMBED_BATCH_MAX_SIZE texts)
+# and run as one forward pass.  A max size of 1 disables batching.
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+# Hybrid retrieval: HYBRID_CANDIDATES results are taken from both the BM25
+# and the dense ranking and fused with reciprocal rank fusion (constant k)
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") != "0"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+
+def content_fingerprint(case_text: str, text_version: int = 0) -> str:
+    """Fingerprint of what an embedding was computed from (text + builder version)."""
+    return hashlib.sha256(f"{text_version}\x00{case_text}".encode("utf-8")).hexdigest()[:32]
+
+
+def fingerprint_bucket(encounter_id: str, buckets: int) -> int:
+    """Reconciliation bucket of an encounter id (stable across processes)."""
+    return int.from_bytes(hashlib.sha256(encounter_id.encode("utf-8")).digest()[:8], "big") % buckets
+
+
+class FingerprintBuckets:
+    """
+    Per-bucket digests of ``(encounter id, fingerprint)`` pairs, as used by
+    ``reconciler.py``: the pair count plus the XOR of the pairs' hashes, so
+    a digest can be built while streaming and does not depend on order.
+    """
+
+    def __init__(self, buckets: int) -> None:
+        self.buckets = buckets
+        self._counts = [0] * buckets
+        self._xors = [0] * buckets
+
+    def add(self, encounter_id: str, fingerprint: str) -> int:
+        bucket = fingerprint_bucket(encounter_id, self.buckets)
+        pair = hashlib.sha256(f"{encounter_id}\x00{fingerprint}".encode("utf-8")).digest()[:16]
+        self._counts[bucket] += 1
+        self._xors[bucket] ^= int.from_bytes(pair, "big")
+        return bucket
+
+    def digests(self) -> List[str]:
+        return [f"{count}:{xor:032x}" for count, xor in zip(self._counts, self._xors)]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = HYBRID_RRF_K) -> List[str]:
+    """Merge best-first id rankings: each id scores ``sum(1 / (k + rank))``."""
+    fused: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, eid in enumerate(ranking, start=1):
+            fused[eid] += 1.0 / (k + rank)
+    return sorted(fused, key=fused.__getitem__, reverse=True)
+
+
+# ---------------------------------------------------------------------------
+# Micro-batching engine
+# ---------------------------------------------------------------------------
+
+class _EmbeddingBatcher:
+    """
+    Collects concurrent single-text encode requests and runs them through
+    the model as one batch on a dedicated thread.
+
+    ``submit`` returns a ``concurrent.futures.Future`` resolved with the
+    embedding (float32 array) once the batch it landed in has been encoded.
+    """
+
+    def __init__(self, model, max_size: int, max_wait_ms: float) -> None:
+        self._model = model
+        self._max_size = max(max_size, 1)
+        self._max_wait_s = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+        self._thread = threading.Thread(
+            target=self._loop, name="vector-service-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._max_wait_s
+        while len(batch) < self._max_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Drain whatever is already queued even once the wait is over
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = [(t, f) for t, f in self._collect() if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                vectors = self._model.encode([t for t, _ in batch], batch_size=len(batch))
+            except Exception as exc:  # hand the error to every caller
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            self._batches += 1
+            self._items += len(batch)
+            self._largest = max(self._largest, len(batch))
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self._max_size,
+            "max_wait_ms": self._max_wait_s * 1000.0,
+            "batches": self._batches,
+            "encoded": self._items,
+            "mean_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._largest,
+        }
+
 
 # ---------------------------------------------------------------------------
 # Singleton service
 # ---------------------------------------------------------------------------
 
 class VectorService:
-    """Singleton: load model + ChromaDB once, reuse everywhere."""
+    """Singleton: load model + vector store once, reuse everywhere."""
 
     _instance: Optional["VectorService"] = None
+    _instance_lock = threading.Lock()
 
     def __init__(self) -> None:
-        logger.info("Loading BERT model '%s' …", BERT_MODEL_NAME)
-        self._model = SentenceTransformer(BERT_MODEL_NAME)
-        self._embedding_dim = self._model.get_sentence_embedding_dimension()
+        logger.info("Loading BERT model '%s' (%s backend) …", BERT_MODEL_NAME, EMBEDDING_BACKEND)
+        self._model = load_backend(BERT_MODEL_NAME, EMBEDDING_BACKEND)
+        self._embedding_dim = self._model.dimension
         logger.info(
-            "BERT model loaded  (dim=%d, persist=%s)",
+            "BERT model loaded  (backend=%s, dim=%d, persist=%s)",
+            self._model.name,
             self._embedding_dim,
             CHROMA_PERSIST_DIR,
         )
 
-        # Persistent ChromaDB client
-        self._chroma = chromadb.Client(
-            ChromaSettings(
-                persist_directory=CHROMA_PERSIST_DIR,
-                anonymized_telemetry=False,
-                is_persistent=True,
+        # Vector store (ChromaDB by default, see vector_stores.py)
+        self._store = open_store(CHROMA_PERSIST_DIR, CHROMA_COLLECTION, self._embedding_dim)
+
+        # BM25 index over the same texts, for hybrid retrieval
+        self._lexical: Optional[LexicalIndex] = None
+        if HYBRID_SEARCH:
+            self._lexical = LexicalIndex(
+                LEXICAL_INDEX_PATH or os.path.join(CHROMA_PERSIST_DIR, "lexical.sqlite3")
             )
+            if self._lexical.count() == 0 and self._store.count() > 0:
+                self._rebuild_lexical()
+
+        # Precomputed similar-case lists (dense rankings), updated as
+        # encounters are indexed
+        self._neighbours: Optional[NeighbourTable] = None
+        if NEIGHBOUR_TABLE_ENABLED:
+            self._neighbours = NeighbourTable(
+                NEIGHBOUR_TABLE_PATH or os.path.join(CHROMA_PERSIST_DIR, "neighbours.sqlite3")
+            )
+
+        # Bounded executor for the async API below
+        self._executor = ThreadPoolExecutor(
+            max_workers=EMBED_THREADS,
+            thread_name_prefix="vector-service",
         )
-        self._collection = self._chroma.get_or_create_collection(
-            name=CHROMA_COLLECTION,
-            metadata={"hnsw:space": "cosine"},   # cosine similarity
-        )
-        logger.info(
-            "ChromaDB collection '%s' ready  (%d documents)",
-            CHROMA_COLLECTION,
-            self._collection.count(),
+
+        # Persistent (model, text-hash) → vector cache checked before encoding
+        self._cache: Optional[EmbeddingCache] = (
+            EmbeddingCache(self._cache_model_key()) if EMBEDDING_CACHE_ENABLED else None
         )
+        self._stored_vector_hits = 0
+
+        # Single-text encodes go through the micro-batcher when enabled
+        self._batcher: Optional[_EmbeddingBatcher] = None
+        if EMBED_BATCH_MAX_SIZE > 1:
+            self._batcher = _EmbeddingBatcher(
+                self._model, EMBED_BATCH_MAX_SIZE, EMBED_BATCH_MAX_WAIT_MS
+            )
+
+    def _rebuild_lexical(self) -> None:
+        """Fill an empty lexical index from the texts already in the vector store."""
+        logger.info("Building lexical index from %d stored documents …", self._store.count())
+        for ids, documents, metadatas in self._store.scan():
+            self._lexical.upsert(ids, [(m or {}).get("doctor_id", "") for m in metadatas], documents)
+
+    @staticmethod
+    def _cache_model_key() -> str:
+        # ONNX / int8 vectors differ slightly from torch ones; keep them apart
+        if EMBEDDING_BACKEND == "torch":
+            return BERT_MODEL_NAME
+        return f"{BERT_MODEL_NAME}:{EMBEDDING_BACKEND}"
 
     # ---- class-level singleton accessor -----------------------------------
 
     @classmethod
     def get_instance(cls) -> "VectorService":
+        """
+        The process-wide service, or with ``VECTOR_SERVICE=sidecar`` a
+        ``VectorServiceClient`` forwarding to the sidecar process (same API).
+        """
+        if VECTOR_SERVICE == "sidecar":
+            from vector_sidecar import VectorServiceClient
+
+            return VectorServiceClient.get_instance()
+        return cls.get_local_instance()
+
+    @classmethod
+    def get_local_instance(cls) -> "VectorService":
+        """The in-process service (always; the sidecar itself uses this)."""
         if cls._instance is None:
-            cls._instance = cls()
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
         return cls._instance
 
+    @classmethod
+    async def aget_instance(cls) -> "VectorService":
+        """Like :meth:`get_instance`, but loads the model off the event loop."""
+        if VECTOR_SERVICE == "sidecar" or cls._instance is not None:
+            return cls.get_instance()
+        return await asyncio.to_thread(cls.get_instance)
+
+    # ---- async API (runs on the dedicated executor) -------------------------
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def aencode(self, text: str) -> np.ndarray:
+        if self._cache is not None:
+            # Only the in-memory LRU is read on the loop; the SQLite tier
+            # (and its lock, held by a backfill's put_many) is read off it
+            cached = self._cache.get_memory(text)
+            if cached is None:
+                cached = await self._run(self._cache.get, text)
+            if cached is not None:
+                return cached
+        if self._batcher is not None:
+            # Awaiting the batch future directly keeps executor threads free,
+            # so every concurrent caller can land in the same batch
+            embedding = await asyncio.wrap_future(self._batcher.submit(text))
+            if self._cache is not None:
+                await self._run(self._cache.put, text, embedding)
+            return embedding
+        return await self._run(self.encode, text)
+
+    async def aindex_encounter(self, encounter_id: str, case_text: str, **metadata) -> int:
+        embedding = await self.aencode(case_text)
+        return await self._run(
+            self.index_encounter, encounter_id, case_text, embedding=embedding, **metadata
+        )
+
+    async def aquery_similar_batch(self, encounters: List[Dict[str, Any]], **kwargs) -> Dict[str, List[Dict[str, Any]]]:
+        return await self._run(self.query_similar_batch, encounters, **kwargs)
+
+    async def aprecomputed_similar(self, encounter_id: str, text: str, **kwargs) -> Optional[List[Dict[str, Any]]]:
+        return await self._run(self.precomputed_similar, encounter_id, text, **kwargs)
+
+    async def aindex_encounters_batch(self, encounters: List[Dict[str, Any]]) -> int:
+        return await self._run(self.index_encounters_batch, encounters)
+
+    async def aindex_encounters_changed(self, encounters: List[Dict[str, Any]]) -> Tuple[int, int]:
+        return await self._run(self.index_encounters_changed, encounters)
+
+    async def aquery_similar(
+        self, text: str, source_id: Optional[str] = None, **kwargs
+    ) -> List[Dict[str, Any]]:
+        embedding = None
+        if source_id:
+            embedding = await self._run(self.stored_embedding, source_id, text)
+        if embedding is None:
+            embedding = await self.aencode(text)
+        return await self._run(self.query_similar, text, embedding=embedding, **kwargs)
+
+    async def atotal_indexed(self) -> int:
+        return await self._run(lambda: self.total_indexed)
+
+    async def astats(self) -> Dict[str, Any]:
+        return await self._run(lambda: self.stats)
+
+    async def aget_sync_watermark(self) -> Optional[Dict[str, str]]:
+        return await self._run(lambda: self.sync_watermark)
+
+    async def aset_sync_watermark(self, created_at: str, encounter_id: str) -> None:
+        await self._run(self.set_sync_watermark, created_at, encounter_id)
+
     # ---- encoding ---------------------------------------------------------
 
-    def encode(self, text: str) -> List[float]:
-        """Return a BERT embedding for *text* (list of floats)."""
-        return self._model.encode(text, normalize_embeddings=True).tolist()
+    def encode(self, text: str) -> np.ndarray:
+        """Return a BERT embedding for *text* (float32 array of ``dim``)."""
+        if self._cache is not None:
+            cached = self._cache.get(text)
+            if cached is not None:
+                return cached
+        if self._batcher is not None:
+            embedding = self._batcher.submit(text).result()
+        else:
+            embedding = self._model.encode([text])[0]
+        if self._cache is not None:
+            self._cache.put(text, embedding)
+        return embedding
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Batch-encode multiple strings into a float32 ``(len(texts), dim)``
+        array, only running the model on cache misses.
+
+        Embeddings stay NumPy arrays all the way to the store: converting a
+        batch to nested Python lists costs more than the store write itself.
+        """
+        if self._cache is None:
+            return self._model.encode(texts)
 
-    def encode_batch(self, texts: List[str]) -> List[List[float]]:
-        """Batch-encode multiple strings."""
-        return self._model.encode(texts, normalize_embeddings=True).tolist()
+        embeddings = np.empty((len(texts), self._embedding_dim), dtype=np.float32)
+        missing = []
+        for i, cached in enumerate(self._cache.get_many(texts)):
+            if cached is None:
+                missing.append(i)
+            else:
+                embeddings[i] = cached
+        if missing:
+            fresh = self._model.encode([texts[i] for i in missing])
+            embeddings[missing] = fresh
+            self._cache.put_many([texts[i] for i in missing], fresh)
+        return embeddings
+
+    def warm_up(self) -> Dict[str, Any]:
+        """
+        Pay the one-off costs of the first request: a forward pass of the
+        model (bypassing the cache) and, with documents indexed, one store
+        query (ChromaDB loads its HNSW index on the first query).
+        """
+        started = time.perf_counter()
+        vector = self._model.encode(["warm-up"])[0]
+        encoded = time.perf_counter()
+        indexed = self._store.count()
+        if indexed:
+            self._store.query(vector, 1)
+        return {
+            "encode_ms": round((encoded - started) * 1000, 1),
+            "query_ms": round((time.perf_counter() - encoded) * 1000, 1),
+            "indexed": indexed,
+        }
+
+    def stored_embedding(self, encounter_id: str, text: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Return the vector already stored in the index for *encounter_id*.
+
+        When *text* is given the stored vector is only returned if it was
+        computed from that exact text, so an edited encounter is re-encoded.
+        """
+        result = self._store.get([encounter_id], include=["embeddings", "documents"])
+        if not result.get("ids"):
+            return None
+        if text is not None and (result.get("documents") or [None])[0] != text:
+            return None
+        self._stored_vector_hits += 1
+        return np.asarray(result["embeddings"][0], dtype=np.float32)
+
+    def stored_embeddings(self, texts: Dict[str, str]) -> Dict[str, np.ndarray]:
+        """Batch :meth:`stored_embedding`: encounter id → vector, for ids whose stored text matches *texts*."""
+        result = self._store.get(list(texts), include=["embeddings", "documents"])
+        out = {
+            eid: np.asarray(vector, dtype=np.float32)
+            for eid, vector, doc in zip(result["ids"], result["embeddings"], result["documents"])
+            if doc == texts[eid]
+        }
+        self._stored_vector_hits += len(out)
+        return out
 
     # ---- indexing ---------------------------------------------------------
 
@@ -121,13 +514,16 @@ class VectorService:
         diagnosis: str = "",
         chief_complaint: str = "",
         treatments: str = "",
+        embedding: Optional[np.ndarray] = None,
+        text_version: int = 0,
     ) -> int:
         """
-        Index (upsert) a single encounter into ChromaDB.
+        Index (upsert) a single encounter into the vector store.
 
         Returns the embedding dimensionality.
         """
-        embedding = self.encode(case_text)
+        if embedding is None:
+            embedding = self.encode(case_text)
 
         metadata: Dict[str, Any] = {
             "doctor_id": doctor_id or "",
@@ -135,15 +531,15 @@ class VectorService:
             "diagnosis": diagnosis or "",
             "chief_complaint": chief_complaint or "",
             "treatments": treatments or "",
+            "fingerprint": content_fingerprint(case_text, text_version),
+            "text_version": text_version,
         }
 
-        # Upsert — ChromaDB uses the `ids` list as unique keys
-        self._collection.upsert(
-            ids=[encounter_id],
-            embeddings=[embedding],
-            documents=[case_text],
-            metadatas=[metadata],
-        )
+        self._store.upsert([encounter_id], [embedding], [case_text], [metadata])
+        if self._lexical is not None:
+            self._lexical.upsert([encounter_id], [metadata["doctor_id"]], [case_text])
+        if self._neighbours is not None:
+            self._update_neighbours([encounter_id], [embedding], [metadata["fingerprint"]])
         return self._embedding_dim
 
     def index_encounters_batch(
@@ -168,19 +564,167 @@ class VectorService:
                 "diagnosis": e.get("diagnosis", ""),
                 "chief_complaint": e.get("chief_complaint", ""),
                 "treatments": e.get("treatments", ""),
+                "fingerprint": content_fingerprint(e["case_text"], e.get("text_version", 0)),
+                "text_version": e.get("text_version", 0),
             }
             for e in encounters
         ]
         embeddings = self.encode_batch(texts)
 
-        self._collection.upsert(
-            ids=ids,
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=metas,
-        )
+        self._store.upsert(ids, embeddings, texts, metas)
+        if self._lexical is not None:
+            self._lexical.upsert(ids, [m["doctor_id"] for m in metas], texts)
+        if self._neighbours is not None:
+            self._update_neighbours(ids, embeddings, [m["fingerprint"] for m in metas])
         return len(ids)
 
+    def stored_fingerprints(self, encounter_ids: List[str]) -> Dict[str, str]:
+        """Map of encounter id → stored fingerprint, for the ids that are indexed."""
+        out: Dict[str, str] = {}
+        for start in range(0, len(encounter_ids), _FINGERPRINT_CHUNK):
+            result = self._store.get(
+                encounter_ids[start:start + _FINGERPRINT_CHUNK], include=["metadatas"]
+            )
+            for eid, meta in zip(result.get("ids") or [], result.get("metadatas") or []):
+                out[eid] = (meta or {}).get("fingerprint", "")
+        return out
+
+    def index_encounters_changed(self, encounters: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Like :meth:`index_encounters_batch`, but skips encounters whose stored
+        fingerprint matches, so unchanged documents are never re-embedded.
+
+        Returns ``(indexed, skipped)``.
+        """
+        if not encounters:
+            return 0, 0
+        stored = self.stored_fingerprints([e["encounter_id"] for e in encounters])
+        changed = [
+            e for e in encounters
+            if stored.get(e["encounter_id"]) != content_fingerprint(e["case_text"], e.get("text_version", 0))
+        ]
+        return self.index_encounters_batch(changed), len(encounters) - len(changed)
+
+    def bucket_fingerprints(self, digests: List[str]) -> Tuple[List[int], Dict[str, str]]:
+        """
+        Compare the index with the caller's per-bucket *digests* (built with
+        :class:`FingerprintBuckets`, one per bucket; see ``reconciler.py``).
+
+        Returns the buckets whose digests differ and the stored fingerprint
+        of every indexed encounter in them, from one scan of the metadata.
+        """
+        ours = FingerprintBuckets(len(digests))
+        members: List[Dict[str, str]] = [{} for _ in digests]
+        for ids, _, metas in self._store.scan(_FINGERPRINT_CHUNK):
+            for eid, meta in zip(ids, metas):
+                fingerprint = (meta or {}).get("fingerprint", "")
+                members[ours.add(eid, fingerprint)][eid] = fingerprint
+        mismatched = [b for b, digest in enumerate(ours.digests()) if digest != digests[b]]
+        stored: Dict[str, str] = {}
+        for bucket in mismatched:
+            stored.update(members[bucket])
+        return mismatched, stored
+
+    # ---- precomputed neighbour lists ----------------------------------------
+
+    def _update_neighbours(self, ids: List[str], embeddings, fingerprints: List[str]) -> None:
+        """
+        Store the neighbour lists of freshly indexed encounters (one batched
+        query) and offer each of them to the lists of its own neighbours.
+        """
+        results = self._store.query_batch(
+            np.asarray(embeddings, dtype=np.float32), NEIGHBOUR_K + 1
+        )
+        lists: Dict[str, Tuple[str, Tuple[List[str], List[float], List[str]]]] = {}
+        offers: Dict[str, List[Tuple[str, float, str]]] = defaultdict(list)
+        for eid, fingerprint, result in zip(ids, fingerprints, results):
+            entries = [
+                (nid, score, (meta or {}).get("fingerprint", ""))
+                for nid, score, meta in zip(result["ids"], result["scores"], result["metadatas"])
+                if nid != eid
+            ][:NEIGHBOUR_K]
+            lists[eid] = (fingerprint, (
+                [n for n, _, _ in entries], [s for _, s, _ in entries], [f for _, _, f in entries]
+            ))
+            for nid, score, _ in entries:
+                offers[nid].append((eid, score, fingerprint))
+        self._neighbours.put_many(lists)
+        self._neighbours.offer(offers)
+
+    def precomputed_similar(
+        self, encounter_id: str, text: str, top_k: int = 5, text_version: int = 0
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Similar cases of an indexed encounter from its precomputed list, in
+        :meth:`query_similar` format (dense ranking, itself excluded).
+
+        A missing or stale list — one holding a neighbour re-indexed with
+        other text since, or one that deleted neighbours have left shorter
+        than *top_k* — is recomputed from the stored vector.  Returns
+        ``None`` — use live search — when the table is off or the encounter
+        is not indexed with *text*.
+        """
+        if self._neighbours is None or top_k > NEIGHBOUR_K:
+            return None
+        fingerprint = content_fingerprint(text, text_version)
+        neighbours = self._neighbours.get(encounter_id, fingerprint)
+        output = self._neighbour_results(neighbours, top_k) if neighbours else None
+        if output is None:
+            embedding = self.stored_embedding(encounter_id, text)
+            if embedding is None:
+                return None
+            self._update_neighbours([encounter_id], [embedding], [fingerprint])
+            neighbours = self._neighbours.get(encounter_id, fingerprint)
+            if neighbours is None:   # indexed under another text version
+                return None
+            output = self._neighbour_results(neighbours, top_k, allow_short=True)
+        return output
+
+    def _neighbour_results(
+        self, neighbours: Tuple[List[str], List[float], List[str]], top_k: int, allow_short: bool = False
+    ) -> Optional[List[Dict[str, Any]]]:
+        ids, scores, fingerprints = neighbours
+        fetched = self._store.get(ids[:NEIGHBOUR_K], include=["documents", "metadatas"])
+        found = {
+            eid: (doc, meta)
+            for eid, doc, meta in zip(fetched["ids"], fetched["documents"], fetched["metadatas"])
+        }
+        recorded = dict(zip(ids, fingerprints))
+        if any(not recorded[eid] or (meta or {}).get("fingerprint") != recorded[eid]
+               for eid, (_, meta) in found.items()):
+            return None   # a neighbour was re-indexed since: its score is stale
+        output = [
+            {
+                "encounter_id": eid,
+                "similarity_score": round(float(score), 4),
+                "case_summary": found[eid][0] or "",
+                **(found[eid][1] or {}),
+                "similarity_method": "bert-cosine",
+            }
+            for eid, score in zip(ids, scores)
+            if eid in found
+        ][:top_k]
+        if len(output) < top_k and len(ids) >= top_k and not allow_short:
+            return None   # neighbours were deleted since the list was built
+        return output
+
+    # ---- incremental-sync watermark ---------------------------------------
+
+    @property
+    def sync_watermark(self) -> Optional[Dict[str, str]]:
+        """``{"created_at", "encounter_id"}`` of the newest encounter synced, if any."""
+        try:
+            with open(SYNC_STATE_PATH) as fh:
+                return json.load(fh).get("watermark")
+        except (OSError, ValueError):
+            return None
+
+    def set_sync_watermark(self, created_at: str, encounter_id: str) -> None:
+        tmp = f"{SYNC_STATE_PATH}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"watermark": {"created_at": created_at, "encounter_id": encounter_id}}, fh)
+        os.replace(tmp, SYNC_STATE_PATH)
+
     # ---- querying ---------------------------------------------------------
 
     def query_similar(
@@ -189,52 +733,132 @@ class VectorService:
         top_k: int = 5,
         exclude_id: Optional[str] = None,
         doctor_id: Optional[str] = None,
+        embedding: Optional[np.ndarray] = None,
+        source_id: Optional[str] = None,
+        hybrid: bool = True,
     ) -> List[Dict[str, Any]]:
         """
-        Find top-K similar cases to *text*.
+        Find top-K similar cases to *text* (or to a precomputed *embedding*).
+
+        If *source_id* is an indexed encounter whose stored text matches
+        *text*, its stored vector is reused instead of re-encoding.
+
+        With hybrid search on (and *hybrid*, which callers ranking whole
+        encounters turn off), the dense ranking and the BM25 ranking of
+        *text* are fused with reciprocal rank fusion; ``similarity_score``
+        stays the cosine similarity of each case.
 
         Returns a list of dicts, each with:
-          encounter_id, similarity_score, case_summary, + all metadata fields.
+          encounter_id, similarity_score, case_summary, similarity_method,
+          + all metadata fields.
         """
+        n_results = self._candidates(top_k, bool(exclude_id), hybrid)
+
+        if embedding is None and source_id:
+            embedding = self.stored_embedding(source_id, text)
+        if embedding is None:
+            embedding = self.encode(text)
+
+        results = self._store.query(embedding, n_results, doctor_id=doctor_id)
+        return self._rank(text, embedding, results, top_k, exclude_id, doctor_id, hybrid)
+
+    def _candidates(self, top_k: int, excluding: bool, hybrid: bool = True) -> int:
         # Request extra results so we can filter and still return top_k
-        n_results = top_k + (2 if exclude_id else 0)
+        n_results = top_k + (2 if excluding else 0)
+        if hybrid and self._lexical is not None:
+            n_results = max(n_results, HYBRID_CANDIDATES)
+        return n_results
 
-        where_filter = None
-        if doctor_id:
-            where_filter = {"doctor_id": doctor_id}
+    def _rank(
+        self,
+        text: str,
+        embedding,
+        results: Dict[str, Any],
+        top_k: int,
+        exclude_id: Optional[str],
+        doctor_id: Optional[str],
+        hybrid: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Turn one store query result into ``query_similar`` output (fusing BM25 if on)."""
+        hits: Dict[str, Dict[str, Any]] = {}
+        for eid, score, doc, meta in zip(
+            results["ids"], results["scores"], results["documents"], results["metadatas"]
+        ):
+            hits[eid] = {
+                "encounter_id": eid,
+                "similarity_score": round(float(score), 4),
+                "case_summary": doc or "",
+                **(meta or {}),
+            }
 
-        results = self._collection.query(
-            query_embeddings=[self.encode(text)],
-            n_results=min(n_results, self._collection.count() or 1),
-            where=where_filter,
-            include=["documents", "metadatas", "distances"],
-        )
+        ranked = list(results["ids"])
+        method = "bert-cosine"
+        if hybrid and self._lexical is not None:
+            lexical = self._lexical.search(text, HYBRID_CANDIDATES, doctor_id=doctor_id)
+            ranked = reciprocal_rank_fusion([ranked, [eid for eid, _ in lexical]])
+            method = "hybrid-rrf"
+        ranked = [eid for eid in ranked if eid != exclude_id][:top_k]
 
-        # Unpack ChromaDB response (lists of lists — one inner list per query)
-        ids = results.get("ids", [[]])[0]
-        docs = results.get("documents", [[]])[0]
-        metas = results.get("metadatas", [[]])[0]
-        distances = results.get("distances", [[]])[0]
+        # Lexical-only hits: fetch text / metadata and score them by cosine too
+        missing = [eid for eid in ranked if eid not in hits]
+        if missing:
+            query = np.asarray(embedding, dtype=np.float32)
+            extra = self._store.get(missing, include=["embeddings", "documents", "metadatas"])
+            for eid, vector, doc, meta in zip(
+                extra["ids"], extra["embeddings"], extra["documents"], extra["metadatas"]
+            ):
+                hits[eid] = {
+                    "encounter_id": eid,
+                    "similarity_score": round(float(np.dot(np.asarray(vector, dtype=np.float32), query)), 4),
+                    "case_summary": doc or "",
+                    **(meta or {}),
+                }
 
-        output: List[Dict[str, Any]] = []
-        for i, eid in enumerate(ids):
-            if exclude_id and eid == exclude_id:
-                continue
+        # Ids only the lexical index still knows about are dropped
+        return [{**hits[eid], "similarity_method": method} for eid in ranked if eid in hits]
 
-            # ChromaDB cosine distance = 1 - cosine_sim  →  convert back
-            cosine_sim = 1.0 - distances[i]
+    def query_similar_batch(
+        self,
+        encounters: List[Dict[str, Any]],
+        top_k: int = 5,
+        same_doctor_only: bool = False,
+        hybrid: bool = True,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        :meth:`query_similar` for many indexed encounters at once.
 
-            output.append({
-                "encounter_id": eid,
-                "similarity_score": round(cosine_sim, 4),
-                "case_summary": docs[i] if docs else "",
-                **(metas[i] if metas else {}),
-            })
+        Each dict needs ``encounter_id`` and ``case_text`` (and ``doctor_id``
+        when *same_doctor_only*).  Stored vectors are reused in one store
+        lookup, the rest are encoded in one batch, and the nearest-neighbour
+        searches run as one batched store query per doctor filter.  Each
+        encounter is excluded from its own results.
 
-            if len(output) >= top_k:
-                break
+        Returns encounter id → results, as :meth:`query_similar`.
+        """
+        if not encounters:
+            return {}
+        texts = {e["encounter_id"]: e["case_text"] for e in encounters}
+        embeddings = self.stored_embeddings(texts)
+        missing = [eid for eid in texts if eid not in embeddings]
+        if missing:
+            fresh = self.encode_batch([texts[eid] for eid in missing])
+            embeddings.update(zip(missing, fresh))
 
-        return output
+        groups: Dict[Optional[str], List[str]] = defaultdict(list)
+        for e in encounters:
+            groups[(e.get("doctor_id") or None) if same_doctor_only else None].append(e["encounter_id"])
+
+        n_results = self._candidates(top_k, excluding=True, hybrid=hybrid)
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for doctor_id, ids in groups.items():
+            vectors = np.asarray([embeddings[eid] for eid in ids], dtype=np.float32)
+            for eid, results in zip(ids, self._store.query_batch(vectors, n_results, doctor_id=doctor_id)):
+                out[eid] = self._rank(texts[eid], embeddings[eid], results, top_k, eid, doctor_id, hybrid)
+        return out
+
+    @property
+    def hybrid(self) -> bool:
+        return self._lexical is not None
 
     # ---- collection stats -------------------------------------------------
 
@@ -242,26 +866,167 @@ class VectorService:
     def stats(self) -> Dict[str, Any]:
         return {
             "model": BERT_MODEL_NAME,
+            "backend": self._model.name,
             "embedding_dim": self._embedding_dim,
-            "total_indexed": self._collection.count(),
+            "total_indexed": self._store.count(),
             "persist_dir": CHROMA_PERSIST_DIR,
             "collection": CHROMA_COLLECTION,
+            "vector_store": self._store.stats,
+            "lexical_index": self._lexical.stats if self._lexical else None,
+            "neighbour_table": self._neighbours.stats if self._neighbours else None,
+            "batching": self._batcher.stats if self._batcher else None,
+            "embedding_cache": self._cache.stats if self._cache else None,
+            "stored_vector_hits": self._stored_vector_hits,
+            "sync_watermark": self.sync_watermark,
         }
 
     @property
     def total_indexed(self) -> int:
-        return self._collection.count()
+        return self._store.count()
 
     # ---- admin ------------------------------------------------------------
 
     def delete_encounter(self, encounter_id: str) -> None:
         """Remove a single encounter from the index."""
-        self._collection.delete(ids=[encounter_id])
+        self.delete_encounters([encounter_id])
+
+    def delete_encounters(self, encounter_ids: List[str]) -> None:
+        """Remove encounters from the index (unknown ids are ignored)."""
+        if not encounter_ids:
+            return
+        self._store.delete(encounter_ids)
+        if self._lexical is not None:
+            self._lexical.delete(encounter_ids)
+        if self._neighbours is not None:
+            self._neighbours.delete(encounter_ids)
 
     def reset_collection(self) -> None:
         """Drop and re-create the collection (destructive!)."""
-        self._chroma.delete_collection(CHROMA_COLLECTION)
-        self._collection = self._chroma.get_or_create_collection(
-            name=CHROMA_COLLECTION,
-            metadata={"hnsw:space": "cosine"},
+        if os.path.exists(SYNC_STATE_PATH):
+            os.remove(SYNC_STATE_PATH)
+        self._store.reset()
+        if self._lexical is not None:
+            self._lexical.reset()
+        if self._neighbours is not None:
+            self._neighbours.reset()
+
+    # ---- snapshots --------------------------------------------------------
+
+    def export_snapshot(self, path: str, case_text_version: int = 0) -> Dict[str, Any]:
+        """
+        Write every indexed encounter (id, stored vector, text, metadata) to
+        the snapshot file *path*; returns its manifest.
+
+        The id list is taken first and pages are then read by id, so each
+        record's vector, text and fingerprint come from the same write.
+        Encounters indexed after the export started are left out; the
+        manifest keeps the sync watermark read before the id list, so a
+        ``/sync`` on the restored node picks up newer encounters (edits are
+        caught by an ``index-all``, which skips unchanged fingerprints).
+        """
+        watermark = self.sync_watermark
+        ids: List[str] = []
+        for page_ids, _, _ in self._store.scan(SNAPSHOT_PAGE_SIZE):
+            ids.extend(page_ids)
+
+        def pages():
+            for start in range(0, len(ids), SNAPSHOT_PAGE_SIZE):
+                page = self._store.get(
+                    ids[start:start + SNAPSHOT_PAGE_SIZE],
+                    include=["embeddings", "documents", "metadatas"],
+                )
+                if not page["ids"]:
+                    continue   # deleted since the id list was taken
+                yield (
+                    list(page["ids"]),
+                    np.asarray(page["embeddings"], dtype=np.float32).reshape(-1, self._embedding_dim),
+                    list(page["documents"]),
+                    list(page["metadatas"]),
+                )
+
+        started = time.perf_counter()
+        manifest = write_snapshot(
+            path,
+            {
+                "model": BERT_MODEL_NAME,
+                "backend": EMBEDDING_BACKEND,
+                "dim": self._embedding_dim,
+                "collection": CHROMA_COLLECTION,
+                "case_text_version": case_text_version,
+                "watermark": watermark,
+            },
+            pages(),
         )
+        logger.info(
+            "Exported %d vectors to %s in %.1f s", manifest["count"], path, time.perf_counter() - started
+        )
+        return manifest
+
+    def import_snapshot(
+        self, path: str, replace: bool = False, case_text_version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Bulk-upsert a snapshot written by :meth:`export_snapshot`.
+
+        With *replace* the current index is dropped first; otherwise the
+        snapshot is merged over it.  The snapshot must come from the same
+        model, backend and dimension.  Neighbour lists of imported
+        encounters are recomputed on their first lookup.  The snapshot's
+        sync watermark is adopted when replacing or when none is set.
+
+        Returns the manifest plus ``imported``, ``elapsed_s`` and
+        ``text_version_matches`` (``False`` when the snapshot was built by
+        another case-text builder version — run ``index-all`` to re-embed).
+        """
+        manifest = read_manifest(path)
+        expected = {"model": BERT_MODEL_NAME, "backend": EMBEDDING_BACKEND, "dim": self._embedding_dim}
+        mismatched = {k: manifest.get(k) for k, v in expected.items() if manifest.get(k) != v}
+        if mismatched:
+            raise SnapshotError(f"Snapshot {path} does not match this service {expected}: {mismatched}")
+
+        started = time.perf_counter()
+        if replace:
+            self.reset_collection()
+        imported = 0
+        for ids, vectors, documents, metadatas in read_pages(path):
+            self._store.upsert(ids, vectors, documents, metadatas)
+            if self._lexical is not None:
+                self._lexical.upsert(ids, [(m or {}).get("doctor_id", "") for m in metadatas], documents)
+            if self._neighbours is not None:
+                self._neighbours.delete(ids)
+            imported += len(ids)
+
+        watermark = manifest.get("watermark")
+        if watermark and (replace or self.sync_watermark is None):
+            self.set_sync_watermark(watermark["created_at"], watermark["encounter_id"])
+
+        elapsed = time.perf_counter() - started
+        logger.info("Imported %d vectors from %s in %.1f s", imported, path, elapsed)
+        return {
+            **manifest,
+            "imported": imported,
+            "elapsed_s": round(elapsed, 3),
+            "text_version_matches": (
+                case_text_version is None or manifest.get("case_text_version") == case_text_version
+            ),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from case_text import CASE_TEXT_VERSION
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export / import vector index snapshots")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path")
+    parser.add_argument("--replace", action="store_true", help="import: drop the current index first")
+    args = parser.parse_args()
+
+    vs = VectorService.get_instance()
+    if args.command == "export":
+        result = vs.export_snapshot(args.path, case_text_version=CASE_TEXT_VERSION)
+    else:
+        result = vs.import_snapshot(args.path, replace=args.replace, case_text_version=CASE_TEXT_VERSION)
+    print(json.dumps(result, indent=2))
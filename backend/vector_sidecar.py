@@ -0,0 +1,291 @@
+"""
+Vector Sidecar
+==============
+
+Runs one ``VectorService`` — embedding model, vector store, lexical index,
+neighbour table — in its own process and serves it to the API workers over
+a local Unix socket.
+
+With ``uvicorn --workers N`` every worker otherwise loads its own copy of
+the model and opens the same persistent store directory: RAM grows with N
+and N processes write one ChromaDB directory.  In sidecar mode
+(``VECTOR_SERVICE=sidecar``) ``VectorService.get_instance()`` returns a
+``VectorServiceClient`` instead: the same public methods, properties and
+``a*`` coroutines, each forwarded to the sidecar.  Start the sidecar
+before the workers:
+
+    python vector_sidecar.py
+    VECTOR_SERVICE=sidecar uvicorn main:app --workers 4
+
+Protocol: ``multiprocessing.connection`` (length-prefixed pickles) over
+the socket; the socket file is created mode 0600, so only the service user
+can connect.
+
+  request   (name, args, kwargs)         a public method or property name
+  response  ("ok", result) | ("error", exception)
+
+Each client process keeps a small pool of connections; the sidecar serves
+every connection on its own thread.  The model still encodes concurrent
+requests in micro-batches, now across all workers.
+
+Configuration (env):
+  VECTOR_SIDECAR_ADDRESS   Unix socket path  (default <CHROMA_PERSIST_DIR>/vector-sidecar.sock)
+  VECTOR_SIDECAR_AUTHKEY   optional shared secret for the connection handshake
+  VECTOR_SIDECAR_POOL      connections (and client threads) per worker  (default 8)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, List, Optional, Tuple
+
+from vector_service import CHROMA_PERSIST_DIR, VectorService
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+VECTOR_SIDECAR_ADDRESS = os.getenv(
+    "VECTOR_SIDECAR_ADDRESS", os.path.join(CHROMA_PERSIST_DIR, "vector-sidecar.sock")
+)
+
+VECTOR_SIDECAR_AUTHKEY = os.getenv("VECTOR_SIDECAR_AUTHKEY", "").encode("utf-8") or None
+
+VECTOR_SIDECAR_POOL = int(os.getenv("VECTOR_SIDECAR_POOL", "8"))
+
+# What the client may call on the sidecar's VectorService
+METHODS = frozenset({
+    "encode",
+    "encode_batch",
+    "warm_up",
+    "stored_embedding",
+    "stored_embeddings",
+    "index_encounter",
+    "index_encounters_batch",
+    "stored_fingerprints",
+    "index_encounters_changed",
+    "bucket_fingerprints",
+    "precomputed_similar",
+    "query_similar",
+    "query_similar_batch",
+    "set_sync_watermark",
+    "delete_encounter",
+    "delete_encounters",
+    "reset_collection",
+    "export_snapshot",
+    "import_snapshot",
+})
+
+PROPERTIES = frozenset({"stats", "total_indexed", "hybrid", "sync_watermark"})
+
+
+class VectorSidecarError(Exception):
+    """The sidecar is not reachable or the connection broke mid-call."""
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+def _serve_connection(vs: VectorService, conn: Connection) -> None:
+    with conn:
+        while True:
+            try:
+                name, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return   # client went away
+            try:
+                if name in METHODS:
+                    reply: Tuple[str, Any] = ("ok", getattr(vs, name)(*args, **kwargs))
+                elif name in PROPERTIES:
+                    reply = ("ok", getattr(vs, name))
+                else:
+                    reply = ("error", AttributeError(f"VectorService has no remote member '{name}'"))
+            except Exception as exc:  # hand the error to the caller
+                reply = ("error", exc)
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                return
+            except Exception as exc:   # unpicklable result / exception
+                conn.send(("error", RuntimeError(f"{name}: {exc!r}")))
+
+
+def _remove_stale_socket(address: str) -> None:
+    if not os.path.exists(address):
+        return
+    probe = socket.socket(socket.AF_UNIX)
+    try:
+        probe.connect(address)
+    except OSError:
+        os.remove(address)   # left behind by a sidecar that died
+    else:
+        raise VectorSidecarError(f"A vector sidecar is already listening on {address}")
+    finally:
+        probe.close()
+
+
+def serve(address: str = VECTOR_SIDECAR_ADDRESS) -> None:
+    """Load the vector service and serve it on *address* until interrupted."""
+    vs = VectorService.get_local_instance()
+    os.makedirs(os.path.dirname(address) or ".", exist_ok=True)
+    _remove_stale_socket(address)
+    old_umask = os.umask(0o177)   # socket file mode 0600
+    try:
+        # Listener's default backlog is 1: every worker connects at once on startup
+        listener = Listener(address, family="AF_UNIX", backlog=128, authkey=VECTOR_SIDECAR_AUTHKEY)
+    finally:
+        os.umask(old_umask)
+    logger.info("Vector sidecar listening on %s  (%d indexed)", address, vs.total_indexed)
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError) as exc:   # failed handshake
+                logger.warning("Rejected sidecar connection: %s", exc)
+                continue
+            threading.Thread(
+                target=_serve_connection, args=(vs, conn), name="vector-sidecar-conn", daemon=True
+            ).start()
+    finally:
+        listener.close()
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class VectorServiceClient:
+    """
+    ``VectorService`` stand-in for API workers: every call is forwarded to
+    the sidecar on a pooled connection.  Async methods run the round trip on
+    a small thread pool (one thread per pooled connection).
+    """
+
+    _instance: Optional["VectorServiceClient"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, address: str = VECTOR_SIDECAR_ADDRESS, pool_size: int = VECTOR_SIDECAR_POOL) -> None:
+        self.address = address
+        self._idle: "queue.LifoQueue[Connection]" = queue.LifoQueue()
+        self._hybrid: Optional[bool] = None   # fixed for the sidecar's lifetime
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="vector-sidecar-client")
+
+    @classmethod
+    def get_instance(cls) -> "VectorServiceClient":
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _connect(self) -> Connection:
+        try:
+            return Client(self.address, family="AF_UNIX", authkey=VECTOR_SIDECAR_AUTHKEY)
+        except (FileNotFoundError, ConnectionRefusedError) as exc:
+            raise VectorSidecarError(
+                f"Vector sidecar not reachable at {self.address} (start it with `python vector_sidecar.py`)"
+            ) from exc
+
+    def _call(self, name: str, *args, **kwargs) -> Any:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            conn.send((name, args, kwargs))
+            status, value = conn.recv()
+        except (EOFError, OSError) as exc:
+            conn.close()
+            raise VectorSidecarError(f"Lost connection to the vector sidecar during {name}()") from exc
+        except BaseException:
+            conn.close()   # mid-call state unknown: never reuse
+            raise
+        self._idle.put(conn)
+        if status == "error":
+            raise value
+        return value
+
+    async def _acall(self, name: str, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self._call(name, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        # Sync methods: forwarded as-is
+        if name in METHODS:
+            return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    # ---- properties -------------------------------------------------------
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {**self._call("stats"), "sidecar": self.address}
+
+    @property
+    def total_indexed(self) -> int:
+        return self._call("total_indexed")
+
+    @property
+    def hybrid(self) -> bool:
+        if self._hybrid is None:
+            self._hybrid = self._call("hybrid")
+        return self._hybrid
+
+    @property
+    def sync_watermark(self) -> Optional[Dict[str, str]]:
+        return self._call("sync_watermark")
+
+    # ---- async API (same signatures as VectorService) ---------------------
+
+    async def aencode(self, text: str):
+        return await self._acall("encode", text)
+
+    async def aindex_encounter(self, encounter_id: str, case_text: str, **metadata) -> int:
+        return await self._acall("index_encounter", encounter_id, case_text, **metadata)
+
+    async def aquery_similar_batch(self, encounters: List[Dict[str, Any]], **kwargs) -> Dict[str, List[Dict[str, Any]]]:
+        return await self._acall("query_similar_batch", encounters, **kwargs)
+
+    async def aprecomputed_similar(self, encounter_id: str, text: str, **kwargs) -> Optional[List[Dict[str, Any]]]:
+        return await self._acall("precomputed_similar", encounter_id, text, **kwargs)
+
+    async def aindex_encounters_batch(self, encounters: List[Dict[str, Any]]) -> int:
+        return await self._acall("index_encounters_batch", encounters)
+
+    async def aindex_encounters_changed(self, encounters: List[Dict[str, Any]]) -> Tuple[int, int]:
+        return await self._acall("index_encounters_changed", encounters)
+
+    async def aquery_similar(self, text: str, source_id: Optional[str] = None, **kwargs) -> List[Dict[str, Any]]:
+        # query_similar reuses the stored vector of source_id itself: one round trip
+        return await self._acall("query_similar", text, source_id=source_id, **kwargs)
+
+    async def atotal_indexed(self) -> int:
+        return await self._acall("total_indexed")
+
+    async def astats(self) -> Dict[str, Any]:
+        return {**await self._acall("stats"), "sidecar": self.address}
+
+    async def aget_sync_watermark(self) -> Optional[Dict[str, str]]:
+        return await self._acall("sync_watermark")
+
+    async def aset_sync_watermark(self, created_at: str, encounter_id: str) -> None:
+        await self._acall("set_sync_watermark", created_at, encounter_id)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    # Leave through serve()'s finally on SIGTERM, so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    serve()
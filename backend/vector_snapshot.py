@@ -0,0 +1,127 @@
+"""
+Vector Snapshots
+================
+
+Single-file export / import of the vector index, so a new backend node (or
+a restore) loads stored vectors instead of re-encoding every encounter.
+
+A snapshot is one ZIP archive (deflate) written page by page, so neither
+export nor import holds the whole index in memory:
+
+  manifest.json        format, model, backend, dim, case_text_version,
+                       count, pages, created_at, sync watermark
+  pages/NNNNN.npy      float16 (n, dim) vectors of one page
+  pages/NNNNN.json     {"ids", "documents", "metadatas"} of the same page
+
+Vectors are L2-normalised, so float16 changes cosine scores by well under
+1e-3 (as in the embedding cache) and halves the file.  The archive is
+written to a temporary name and renamed into place when complete.
+
+Configuration (env):
+  SNAPSHOT_DIR         directory of the admin endpoints' snapshots
+                       (default backend/.snapshots)
+  SNAPSHOT_PAGE_SIZE   vectors per page                   (default 2000)
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import re
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(os.path.dirname(__file__), ".snapshots"))
+
+SNAPSHOT_PAGE_SIZE = int(os.getenv("SNAPSHOT_PAGE_SIZE", "2000"))
+
+SNAPSHOT_FORMAT = 1
+
+_MANIFEST = "manifest.json"
+
+# Names accepted by the admin endpoints (no path components)
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+
+# (ids, vectors, documents, metadatas) of one page
+SnapshotPage = Tuple[List[str], np.ndarray, List[str], List[Dict[str, Any]]]
+
+
+class SnapshotError(Exception):
+    """Unreadable snapshot, or one that does not fit the running service."""
+
+
+def snapshot_path(name: str) -> str:
+    """Path of snapshot *name* inside ``SNAPSHOT_DIR`` (rejects path-like names)."""
+    if not _NAME.match(name):
+        raise SnapshotError(f"Invalid snapshot name '{name}'")
+    if not name.endswith(".zip"):
+        name += ".zip"
+    return os.path.join(SNAPSHOT_DIR, name)
+
+
+def default_name() -> str:
+    return "vectors-" + datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".zip"
+
+
+def write_snapshot(path: str, manifest: Dict[str, Any], pages: Iterable[SnapshotPage]) -> Dict[str, Any]:
+    """
+    Write *pages* and *manifest* (plus ``format``, ``count``, ``pages`` and
+    ``created_at``) to *path*.  Returns the manifest as written.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    count = page_no = 0
+    try:
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for ids, vectors, documents, metadatas in pages:
+                buffer = io.BytesIO()
+                np.save(buffer, np.asarray(vectors, dtype=np.float16))
+                archive.writestr(f"pages/{page_no:05d}.npy", buffer.getvalue())
+                archive.writestr(
+                    f"pages/{page_no:05d}.json",
+                    json.dumps({"ids": ids, "documents": documents, "metadatas": metadatas}),
+                )
+                count += len(ids)
+                page_no += 1
+            manifest = {
+                **manifest,
+                "format": SNAPSHOT_FORMAT,
+                "count": count,
+                "pages": page_no,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+            archive.writestr(_MANIFEST, json.dumps(manifest, indent=2))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return manifest
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    try:
+        with zipfile.ZipFile(path) as archive:
+            manifest = json.loads(archive.read(_MANIFEST))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        raise SnapshotError(f"Cannot read snapshot {path}: {e}") from e
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"Unsupported snapshot format {manifest.get('format')!r} in {path}")
+    return manifest
+
+
+def read_pages(path: str) -> Iterator[SnapshotPage]:
+    """Pages of *path* in order, vectors as float32."""
+    manifest = read_manifest(path)
+    with zipfile.ZipFile(path) as archive:
+        for page_no in range(manifest["pages"]):
+            vectors = np.load(io.BytesIO(archive.read(f"pages/{page_no:05d}.npy")))
+            rows = json.loads(archive.read(f"pages/{page_no:05d}.json"))
+            yield rows["ids"], vectors.astype(np.float32), rows["documents"], rows["metadatas"]
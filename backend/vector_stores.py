@@ -0,0 +1,888 @@
+"""
+Vector Stores
+=============
+
+Storage / nearest-neighbour backends behind ``VectorService``.
+
+  chroma  ChromaDB persistent collection, HNSW cosine index (default)
+  numpy   exact brute-force search over a memory-mapped float16 matrix
+          (or float32, or product-quantised with exact re-ranking)
+
+For our corpus size (hundreds of thousands of encounters, 384-dim) an exact
+scan is competitive with HNSW: the whole matrix is ~300 MB of float16 that
+the OS pages in once and shares between workers, recall is exact, and there
+is no index build or ChromaDB client overhead.
+
+Every store exposes:
+  - ``count()``
+  - ``upsert(ids, embeddings, documents, metadatas)``
+  - ``get(ids, include)``       → ``{"ids", "embeddings", "documents", "metadatas"}``
+  - ``query(embedding, n_results, doctor_id=None)``
+                                → ``{"ids", "scores", "documents", "metadatas"}``
+    where ``scores`` are cosine similarities, best first
+  - ``query_batch(embeddings, n_results, doctor_id=None)``
+                                → one ``query`` result per embedding, searched together
+  - ``scan(batch_size)``        → yields ``(ids, documents, metadatas)`` pages
+  - ``delete(ids)``, ``reset()``, ``stats``
+
+NumPy store layout (``<dir>/``):
+  vectors.npy     float16 (capacity, dim) matrix, opened with ``mmap_mode="r+"``
+  rows.sqlite3    ID table: row → encounter id, doctor_id, document, metadata
+  pq_codebooks.npy  PQ centroids (subvectors, 256, dim / subvectors)   [pq only]
+  pq_codes.npy      uint8 (subvectors, capacity) codes, one row per
+                    sub-quantiser so each lookup reads a contiguous row   [pq only]
+
+Compression (``VECTOR_COMPRESSION``, NumPy store only — Chroma's HNSW keeps
+float32 vectors internally and has no compressed mode):
+
+  float32  4 bytes/dim, exact
+  float16  2 bytes/dim, cosine within ~1e-3 of float32 (default)
+  pq       product quantisation: ``PQ_SUBVECTORS`` bytes per vector are
+           scanned with per-query lookup tables (asymmetric distance), and
+           the best ``PQ_RERANK`` candidates are re-scored exactly from the
+           float16 matrix.  The matrix stays on disk and only candidate rows
+           are paged in, so the resident working set is the codes.  The
+           codebooks are trained by k-means once the store holds
+           ``PQ_TRAIN_ROWS`` vectors; until then queries scan exactly.
+
+Partitioning (``VECTOR_PARTITIONS=doctor``) wraps either store in a
+``PartitionedStore``: the global store plus one store per doctor, so a
+``doctor_id``-filtered query searches a small dedicated index instead of
+filtering the global HNSW graph (which, for a small practice inside a large
+corpus, degrades or returns fewer than ``n_results``).  Every vector is
+stored twice; the NumPy store already filters exactly, so partitioning is
+mainly for ChromaDB.
+
+Configuration (env):
+  VECTOR_STORE        chroma | numpy                       (default chroma)
+  VECTOR_PARTITIONS   none | doctor                        (default none)
+  PARTITION_SEARCH_EF HNSW ef_search of Chroma partitions   (default 200)
+  NUMPY_STORE_DIR     NumPy store directory  (default <CHROMA_PERSIST_DIR>/numpy_store)
+  NUMPY_BLOCK_ROWS    rows per matrix-vector block          (default 1024)
+  VECTOR_COMPRESSION  float32 | float16 | pq                (default float16)
+  PQ_SUBVECTORS       PQ bytes per vector, must divide dim  (default 96)
+  PQ_RERANK           PQ candidates re-scored exactly       (default 1000)
+  PQ_TRAIN_ROWS       vectors stored before PQ is trained   (default 10000)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma").lower()
+
+VECTOR_PARTITIONS = os.getenv("VECTOR_PARTITIONS", "none").lower()
+
+# Chroma's default ef_search (100) loses recall on partitions of a few
+# thousand cases; partitions are small, so a wider search stays cheap
+PARTITION_SEARCH_EF = int(os.getenv("PARTITION_SEARCH_EF", "200"))
+
+NUMPY_STORE_DIR = os.getenv("NUMPY_STORE_DIR", "")
+
+NUMPY_BLOCK_ROWS = int(os.getenv("NUMPY_BLOCK_ROWS", "1024"))
+
+VECTOR_COMPRESSION = os.getenv("VECTOR_COMPRESSION", "float16").lower()
+
+# 4 dims per sub-quantiser: 8× fewer bytes scanned than float16; at 8 dims
+# (48 bytes) recall drops noticeably for queries far from any stored case
+PQ_SUBVECTORS = int(os.getenv("PQ_SUBVECTORS", "96"))
+
+# Re-scoring reads one float16 row (768 B) per candidate
+PQ_RERANK = int(os.getenv("PQ_RERANK", "1000"))
+
+PQ_TRAIN_ROWS = int(os.getenv("PQ_TRAIN_ROWS", "10000"))
+
+STORES = ("chroma", "numpy")
+
+PARTITIONS = ("none", "doctor")
+
+COMPRESSIONS = ("float32", "float16", "pq")
+
+_INITIAL_CAPACITY = 1024
+
+# SQLite limits the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+# k-means sample size and iterations for PQ codebook training
+_PQ_TRAIN_SAMPLE = 20_000
+_PQ_ITERATIONS = 12
+
+# Rows encoded per step when (re)building PQ codes
+_PQ_ENCODE_ROWS = 8192
+
+
+# ---------------------------------------------------------------------------
+# ChromaDB
+# ---------------------------------------------------------------------------
+
+class ChromaStore:
+    """ChromaDB persistent collection with an HNSW cosine index."""
+
+    name = "chroma"
+
+    def __init__(self, persist_dir: str, collection: str, search_ef: Optional[int] = None) -> None:
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
+        self._collection_name = collection
+        self._metadata: Dict[str, Any] = {"hnsw:space": "cosine"}   # cosine similarity
+        if search_ef:
+            self._metadata["hnsw:search_ef"] = search_ef
+        self._chroma = chromadb.Client(
+            ChromaSettings(
+                persist_directory=persist_dir,
+                anonymized_telemetry=False,
+                is_persistent=True,
+            )
+        )
+        self._collection = self._open()
+        logger.info(
+            "ChromaDB collection '%s' ready  (%d documents)",
+            collection,
+            self._collection.count(),
+        )
+
+    def _open(self):
+        return self._chroma.get_or_create_collection(
+            name=self._collection_name,
+            metadata=self._metadata,
+        )
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def upsert(self, ids, embeddings, documents, metadatas) -> None:
+        # Upsert — ChromaDB uses the `ids` list as unique keys
+        self._collection.upsert(
+            ids=list(ids),
+            embeddings=embeddings,
+            documents=list(documents),
+            metadatas=list(metadatas),
+        )
+
+    def get(self, ids: Sequence[str], include: Sequence[str]) -> Dict[str, Any]:
+        return self._collection.get(ids=list(ids), include=list(include))
+
+    def scan(self, batch_size: int = 1000) -> Iterator[Tuple[List[str], List[str], List[Dict[str, Any]]]]:
+        offset = 0
+        while True:
+            page = self._collection.get(
+                include=["documents", "metadatas"], limit=batch_size, offset=offset
+            )
+            if not page["ids"]:
+                return
+            yield page["ids"], page["documents"], page["metadatas"]
+            offset += len(page["ids"])
+
+    def query(self, embedding, n_results: int, doctor_id: Optional[str] = None) -> Dict[str, Any]:
+        return self.query_batch([embedding], n_results, doctor_id)[0]
+
+    def query_batch(self, embeddings, n_results: int, doctor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        if len(embeddings) == 0:
+            return []
+        results = self._collection.query(
+            query_embeddings=embeddings,
+            n_results=min(n_results, self._collection.count() or 1),
+            where={"doctor_id": doctor_id} if doctor_id else None,
+            include=["documents", "metadatas", "distances"],
+        )
+        return self._unpack(results)
+
+    @staticmethod
+    def _unpack(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Lists of lists — one inner list per query
+        ids = results.get("ids") or [[]]
+        distances = results.get("distances") or [[] for _ in ids]
+        documents = results.get("documents") or [[] for _ in ids]
+        metadatas = results.get("metadatas") or [[] for _ in ids]
+        return [
+            {
+                "ids": i,
+                # ChromaDB cosine distance = 1 - cosine_sim  →  convert back
+                "scores": [1.0 - d for d in dist],
+                "documents": doc,
+                "metadatas": meta,
+            }
+            for i, dist, doc, meta in zip(ids, distances, documents, metadatas)
+        ]
+
+    def delete(self, ids: Sequence[str]) -> None:
+        self._collection.delete(ids=list(ids))
+
+    def reset(self) -> None:
+        self._chroma.delete_collection(self._collection_name)
+        self._collection = self._open()
+
+    def drop(self) -> None:
+        """Delete the collection for good (the store is unusable afterwards)."""
+        self._chroma.delete_collection(self._collection_name)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"store": self.name, "collection": self._collection_name}
+
+
+# ---------------------------------------------------------------------------
+# Product quantisation
+# ---------------------------------------------------------------------------
+
+class ProductQuantizer:
+    """
+    Splits a vector into ``m`` contiguous sub-vectors and encodes each as the
+    index of its nearest of 256 centroids (one byte).
+
+    Scores are inner products, so a query is scored against every code with
+    one ``(m, 256)`` lookup table of query·centroid products.
+    """
+
+    def __init__(self, codebooks: np.ndarray) -> None:
+        self.codebooks = np.ascontiguousarray(codebooks, dtype=np.float32)   # (m, 256, dsub)
+        self.m, _, self.dsub = self.codebooks.shape
+        self._half_norms = 0.5 * (self.codebooks ** 2).sum(axis=2)           # (m, 256)
+
+    @classmethod
+    def train(cls, sample: np.ndarray, m: int, iterations: int = _PQ_ITERATIONS, seed: int = 0) -> "ProductQuantizer":
+        """k-means (256 centroids) per sub-space over *sample* (n, dim)."""
+        sample = np.asarray(sample, dtype=np.float32)
+        n, dim = sample.shape
+        dsub = dim // m
+        rng = np.random.default_rng(seed)
+        codebooks = np.empty((m, 256, dsub), dtype=np.float32)
+        for j in range(m):
+            x = sample[:, j * dsub:(j + 1) * dsub]
+            centroids = x[rng.choice(n, 256, replace=n < 256)].copy()
+            for _ in range(iterations):
+                assign = cls._nearest(x, centroids, 0.5 * (centroids ** 2).sum(axis=1))
+                counts = np.bincount(assign, minlength=256)
+                for d in range(dsub):
+                    centroids[:, d] = np.bincount(assign, weights=x[:, d], minlength=256)
+                filled = counts > 0
+                centroids[filled] /= counts[filled, None]
+                # Re-seed empty clusters from random points
+                centroids[~filled] = x[rng.choice(n, int((~filled).sum()))]
+            codebooks[j] = centroids
+        return cls(codebooks)
+
+    @staticmethod
+    def _nearest(x: np.ndarray, centroids: np.ndarray, half_norms: np.ndarray) -> np.ndarray:
+        # argmin ||x - c||² == argmax (x·c - ||c||²/2)
+        return np.argmax(x @ centroids.T - half_norms, axis=1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """uint8 codes, transposed to ``(m, n)`` to match the codes file."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = np.empty((self.m, len(vectors)), dtype=np.uint8)
+        for j in range(self.m):
+            x = vectors[:, j * self.dsub:(j + 1) * self.dsub]
+            codes[j] = self._nearest(x, self.codebooks[j], self._half_norms[j])
+        return codes
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate inner products of *query* with every column of *codes* (m, n)."""
+        table = np.einsum("jcd,jd->jc", self.codebooks, query.reshape(self.m, self.dsub))
+        out = np.zeros(codes.shape[1], dtype=np.float32)
+        for j in range(self.m):
+            out += table[j].take(codes[j])
+        return out
+
+
+def _grow_npy(path: str, array: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """Copy *array* into the top-left of a larger ``.npy`` at *path* and map it."""
+    tmp = f"{path}.tmp"
+    grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=array.dtype, shape=shape)
+    grown[:array.shape[0], :array.shape[1]] = array
+    grown.flush()
+    del grown
+    os.replace(tmp, path)
+    # Queries already holding the old mapping keep reading the old inode
+    return np.load(path, mmap_mode="r+")
+
+
+# ---------------------------------------------------------------------------
+# NumPy (exact, memory-mapped)
+# ---------------------------------------------------------------------------
+
+class NumpyStore:
+    """
+    Exact cosine search over a memory-mapped float16 matrix of normalised
+    vectors.
+
+    Queries take one blocked matrix-vector product (``NUMPY_BLOCK_ROWS`` rows
+    upcast to float32 at a time) and keep each block's best rows with
+    ``argpartition``.  The ``doctor_id`` filter uses per-doctor row sets kept
+    alongside the ID table, so a filtered query only touches that doctor's
+    rows.  Deleted rows are tombstoned and reused by later inserts.
+
+    With ``compression="pq"`` queries scan the PQ codes instead and re-score
+    the best ``PQ_RERANK`` candidates against the matrix (see module docs).
+    """
+
+    name = "numpy"
+
+    def __init__(
+        self,
+        directory: str,
+        dim: int,
+        block_rows: int = NUMPY_BLOCK_ROWS,
+        compression: str = VECTOR_COMPRESSION,
+    ) -> None:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown VECTOR_COMPRESSION '{compression}' (expected one of {COMPRESSIONS})")
+        if compression == "pq" and dim % PQ_SUBVECTORS:
+            raise ValueError(f"PQ_SUBVECTORS={PQ_SUBVECTORS} does not divide the embedding dimension {dim}")
+        self.directory = directory
+        self.dim = dim
+        self.block_rows = block_rows
+        self.compression = compression
+        self._lock = threading.RLock()
+        self._vectors_path = os.path.join(directory, "vectors.npy")
+        self._codebooks_path = os.path.join(directory, "pq_codebooks.npy")
+        self._codes_path = os.path.join(directory, "pq_codes.npy")
+        self._open()
+
+    # ---- open / persistence -------------------------------------------------
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(self.directory, "rows.sqlite3"), check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rows (
+                row       INTEGER PRIMARY KEY,
+                id        TEXT NOT NULL UNIQUE,
+                doctor_id TEXT NOT NULL,
+                document  TEXT,
+                metadata  TEXT
+            )
+            """
+        )
+        self._db.commit()
+
+        dtype = np.float32 if self.compression == "float32" else np.float16
+        if os.path.exists(self._vectors_path):
+            self._matrix = np.load(self._vectors_path, mmap_mode="r+")
+            if self._matrix.shape[1] != self.dim:
+                raise ValueError(
+                    f"{self._vectors_path} holds {self._matrix.shape[1]}-dim vectors, "
+                    f"model produces {self.dim}"
+                )
+            if self._matrix.dtype != dtype:
+                logger.warning(
+                    "%s is %s, not %s for VECTOR_COMPRESSION=%s; keeping %s until the store is reset",
+                    self._vectors_path, self._matrix.dtype, np.dtype(dtype), self.compression,
+                    self._matrix.dtype,
+                )
+        else:
+            self._matrix = np.lib.format.open_memmap(
+                self._vectors_path, mode="w+", dtype=dtype, shape=(_INITIAL_CAPACITY, self.dim)
+            )
+
+        self._pq: Optional[ProductQuantizer] = None
+        self._codes: Optional[np.ndarray] = None
+        if self.compression == "pq" and os.path.exists(self._codebooks_path):
+            self._pq = ProductQuantizer(np.load(self._codebooks_path))
+            self._codes = np.load(self._codes_path, mmap_mode="r+")
+
+        rows = self._db.execute("SELECT row, id, doctor_id FROM rows").fetchall()
+        self._row_of: Dict[str, int] = {eid: row for row, eid, _ in rows}
+        self._doctor_of_row: Dict[int, str] = {row: doc for row, _, doc in rows}
+        self._n = max((row for row, _, _ in rows), default=-1) + 1
+        self._alive = np.zeros(self._matrix.shape[0], dtype=bool)
+        if rows:
+            self._alive[[row for row, _, _ in rows]] = True
+        self._free = sorted(set(range(self._n)) - set(self._doctor_of_row), reverse=True)
+
+        by_doctor: Dict[str, List[int]] = {}
+        for row, _, doctor in rows:
+            by_doctor.setdefault(doctor, []).append(row)
+        self._doctor_rows = {d: np.array(sorted(r), dtype=np.int64) for d, r in by_doctor.items()}
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        self._matrix = _grow_npy(self._vectors_path, self._matrix, (new_capacity, self.dim))
+        if self._codes is not None:
+            self._codes = _grow_npy(self._codes_path, self._codes, (self._pq.m, new_capacity))
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:capacity] = self._alive
+        self._alive = alive
+
+    def _set_doctor_rows(self, doctor: str, add: Sequence[int] = (), remove: Sequence[int] = ()) -> None:
+        rows = self._doctor_rows.get(doctor, np.empty(0, dtype=np.int64))
+        if remove:
+            rows = np.setdiff1d(rows, np.asarray(remove, dtype=np.int64), assume_unique=True)
+        if add:
+            rows = np.union1d(rows, np.asarray(add, dtype=np.int64))
+        if rows.size:
+            self._doctor_rows[doctor] = rows
+        else:
+            self._doctor_rows.pop(doctor, None)
+
+    # ---- store interface ----------------------------------------------------
+
+    def count(self) -> int:
+        return len(self._row_of)
+
+    def upsert(self, ids, embeddings, documents, metadatas) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float16).reshape(len(ids), self.dim)
+        with self._lock:
+            rows: List[int] = []
+            added: Dict[str, List[int]] = {}
+            removed: Dict[str, List[int]] = {}
+            for eid, meta in zip(ids, metadatas):
+                doctor = (meta or {}).get("doctor_id") or ""
+                row = self._row_of.get(eid)
+                if row is None:
+                    row = self._free.pop() if self._free else self._n
+                    self._n = max(self._n, row + 1)
+                    self._row_of[eid] = row
+                    added.setdefault(doctor, []).append(row)
+                elif self._doctor_of_row[row] != doctor:
+                    removed.setdefault(self._doctor_of_row[row], []).append(row)
+                    added.setdefault(doctor, []).append(row)
+                self._doctor_of_row[row] = doctor
+                rows.append(row)
+
+            self._grow(self._n)
+            self._matrix[rows] = vectors
+            self._matrix.flush()
+            if self._codes is not None:
+                self._codes[:, rows] = self._pq.encode(vectors)
+                self._codes.flush()
+            self._alive[rows] = True
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO rows (row, id, doctor_id, document, metadata) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (row, eid, self._doctor_of_row[row], doc, json.dumps(meta or {}))
+                    for row, eid, doc, meta in zip(rows, ids, documents, metadatas)
+                ],
+            )
+            self._db.commit()
+
+            for doctor, doctor_rows in removed.items():
+                self._set_doctor_rows(doctor, remove=doctor_rows)
+            for doctor, doctor_rows in added.items():
+                self._set_doctor_rows(doctor, add=doctor_rows)
+
+            if self.compression == "pq" and self._pq is None and len(self._row_of) >= PQ_TRAIN_ROWS:
+                self._train_pq()
+
+    def _train_pq(self) -> None:
+        """Train the PQ codebooks on a sample of stored rows and encode every row."""
+        rows = np.flatnonzero(self._alive[:self._n])
+        if rows.size > _PQ_TRAIN_SAMPLE:
+            rows = np.sort(np.random.default_rng(0).choice(rows, _PQ_TRAIN_SAMPLE, replace=False))
+        logger.info("Training PQ codebooks (%d subvectors) on %d vectors …", PQ_SUBVECTORS, rows.size)
+        pq = ProductQuantizer.train(self._matrix[rows], PQ_SUBVECTORS)
+
+        codes = np.lib.format.open_memmap(
+            f"{self._codes_path}.tmp", mode="w+", dtype=np.uint8, shape=(pq.m, self._matrix.shape[0])
+        )
+        for start in range(0, self._n, _PQ_ENCODE_ROWS):
+            stop = min(start + _PQ_ENCODE_ROWS, self._n)
+            codes[:, start:stop] = pq.encode(self._matrix[start:stop])
+        codes.flush()
+        del codes
+        os.replace(f"{self._codes_path}.tmp", self._codes_path)
+        # The codebooks file marks the store as trained, so it is written last
+        with open(f"{self._codebooks_path}.tmp", "wb") as fh:
+            np.save(fh, pq.codebooks)
+        os.replace(f"{self._codebooks_path}.tmp", self._codebooks_path)
+
+        self._codes = np.load(self._codes_path, mmap_mode="r+")
+        self._pq = pq
+
+    def _fetch_rows(self, rows: Sequence[int]) -> Dict[int, tuple]:
+        """row → (id, document, metadata dict)."""
+        out: Dict[int, tuple] = {}
+        rows = [int(r) for r in rows]
+        with self._lock:
+            for start in range(0, len(rows), _SQL_CHUNK):
+                chunk = rows[start:start + _SQL_CHUNK]
+                for row, eid, doc, meta in self._db.execute(
+                    f"SELECT row, id, document, metadata FROM rows "
+                    f"WHERE row IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ):
+                    out[row] = (eid, doc, json.loads(meta or "{}"))
+        return out
+
+    def get(self, ids: Sequence[str], include: Sequence[str]) -> Dict[str, Any]:
+        with self._lock:
+            rows = [self._row_of[eid] for eid in ids if eid in self._row_of]
+            matrix = self._matrix
+        fetched = self._fetch_rows(rows)
+        rows = [r for r in rows if r in fetched]
+        result: Dict[str, Any] = {"ids": [fetched[r][0] for r in rows]}
+        if "embeddings" in include:
+            result["embeddings"] = (
+                np.asarray(matrix[rows], dtype=np.float32) if rows else np.empty((0, self.dim), np.float32)
+            )
+        if "documents" in include:
+            result["documents"] = [fetched[r][1] for r in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [fetched[r][2] for r in rows]
+        return result
+
+    def scan(self, batch_size: int = 1000) -> Iterator[Tuple[List[str], List[str], List[Dict[str, Any]]]]:
+        after = -1
+        while True:
+            with self._lock:
+                page = self._db.execute(
+                    "SELECT row, id, document, metadata FROM rows WHERE row > ? ORDER BY row LIMIT ?",
+                    (after, batch_size),
+                ).fetchall()
+            if not page:
+                return
+            yield (
+                [eid for _, eid, _, _ in page],
+                [doc for _, _, doc, _ in page],
+                [json.loads(meta or "{}") for _, _, _, meta in page],
+            )
+            after = page[-1][0]
+
+    def query(self, embedding, n_results: int, doctor_id: Optional[str] = None) -> Dict[str, Any]:
+        return self.query_batch([embedding], n_results, doctor_id)[0]
+
+    def query_batch(self, embeddings, n_results: int, doctor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """All queries in one pass over the matrix: each block is a (queries × rows) product."""
+        queries = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        empty = [{"ids": [], "scores": [], "documents": [], "metadatas": []} for _ in queries]
+        with self._lock:
+            matrix, n, alive = self._matrix, self._n, self._alive
+            pq, codes = self._pq, self._codes
+            doctor_rows = self._doctor_rows.get(doctor_id) if doctor_id else None
+
+        if n == 0 or len(queries) == 0 or (doctor_id and (doctor_rows is None or doctor_rows.size == 0)):
+            return empty
+
+        rows = doctor_rows if doctor_id else None
+        searched = rows.size if doctor_id else n
+        if pq is not None and searched > max(PQ_RERANK, n_results):
+            tops = [self._search_pq(q, n_results, pq, codes, matrix, n, alive, rows) for q in queries]
+        else:
+            tops = self._search_exact(queries, n_results, matrix, n, alive, rows)
+
+        fetched = self._fetch_rows(np.unique(np.concatenate([r[np.isfinite(sc)] for r, sc in tops])))
+        results = []
+        for top_rows, top_scores in tops:
+            keep = [(int(r), float(sc)) for r, sc in zip(top_rows, top_scores) if np.isfinite(sc) and int(r) in fetched]
+            results.append({
+                "ids": [fetched[r][0] for r, _ in keep],
+                "scores": [sc for _, sc in keep],
+                "documents": [fetched[r][1] for r, _ in keep],
+                "metadatas": [fetched[r][2] for r, _ in keep],
+            })
+        return results
+
+    def _search_exact(self, queries, n_results, matrix, n, alive, rows) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Best ``(rows, scores)`` per query from a full scan, or of *rows* only."""
+        if rows is not None:
+            scores = queries @ np.asarray(matrix[rows], dtype=np.float32).T
+            k = min(n_results, scores.shape[1])
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            cand_rows = rows[best]
+            cand_scores = np.take_along_axis(scores, best, axis=1)
+        else:
+            parts_rows, parts_scores = [], []
+            # Upcast block by block into one cache-sized float32 buffer
+            block = np.empty((min(self.block_rows, n), self.dim), dtype=np.float32)
+            for start in range(0, n, self.block_rows):
+                stop = min(start + self.block_rows, n)
+                upcast = block[:stop - start]
+                upcast[...] = matrix[start:stop]
+                scores = queries @ upcast.T
+                scores[:, ~alive[start:stop]] = -np.inf
+                k = min(n_results, scores.shape[1])
+                best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                parts_rows.append(best + start)
+                parts_scores.append(np.take_along_axis(scores, best, axis=1))
+            cand_rows = np.concatenate(parts_rows, axis=1)
+            cand_scores = np.concatenate(parts_scores, axis=1)
+
+        order = np.argsort(-cand_scores, axis=1, kind="stable")[:, :n_results]
+        return list(zip(
+            np.take_along_axis(cand_rows, order, axis=1),
+            np.take_along_axis(cand_scores, order, axis=1),
+        ))
+
+    @staticmethod
+    def _search_pq(query, n_results, pq, codes, matrix, n, alive, rows) -> Tuple[np.ndarray, np.ndarray]:
+        """PQ scan for ``PQ_RERANK`` candidates, then exact scores from the matrix."""
+        if rows is None:
+            approx = pq.scores(query, codes[:, :n])
+            approx[~alive[:n]] = -np.inf
+            rows = np.arange(n)
+        else:
+            approx = pq.scores(query, codes[:, rows])
+        k = max(PQ_RERANK, n_results)
+        best = np.argpartition(-approx, k - 1)[:k]
+        candidates = np.sort(rows[best[np.isfinite(approx[best])]])   # sorted: sequential page reads
+        exact = np.asarray(matrix[candidates], dtype=np.float32) @ query
+        order = np.argsort(-exact, kind="stable")[:n_results]
+        return candidates[order], exact[order]
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            rows = [self._row_of.pop(eid) for eid in ids if eid in self._row_of]
+            if not rows:
+                return
+            self._alive[rows] = False
+            self._db.executemany("DELETE FROM rows WHERE row = ?", [(r,) for r in rows])
+            self._db.commit()
+            by_doctor: Dict[str, List[int]] = {}
+            for row in rows:
+                by_doctor.setdefault(self._doctor_of_row.pop(row), []).append(row)
+            for doctor, doctor_rows in by_doctor.items():
+                self._set_doctor_rows(doctor, remove=doctor_rows)
+            self._free = sorted(set(self._free) | set(rows), reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._db.close()
+            del self._matrix
+            self._codes = None
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._open()
+
+    def drop(self) -> None:
+        """Delete the store directory for good (the store is unusable afterwards)."""
+        with self._lock:
+            self._db.close()
+            del self._matrix
+            self._codes = None
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "store": self.name,
+                "directory": self.directory,
+                "rows": len(self._row_of),
+                "capacity": int(self._matrix.shape[0]),
+                "matrix_mb": round(self._matrix.nbytes / 1e6, 1),
+                "compression": self.compression,
+                "dtype": str(self._matrix.dtype),
+                "pq_trained": self._pq is not None,
+                "codes_mb": round(self._codes.nbytes / 1e6, 1) if self._codes is not None else 0.0,
+                "doctors": len(self._doctor_rows),
+                "block_rows": self.block_rows,
+            }
+
+
+# ---------------------------------------------------------------------------
+# Per-doctor partitions
+# ---------------------------------------------------------------------------
+
+class PartitionedStore:
+    """
+    A global store plus one store per doctor, with the same interface.
+
+    Writes go to both; ``doctor_id``-filtered queries go to the doctor's
+    partition, everything else to the global store.  The set of partitions
+    is recorded in ``partitions.json``; when that file is missing (first
+    start with partitioning on) the partitions are built from the global
+    store.
+    """
+
+    def __init__(self, global_store, open_partition: Callable[[str], Any], registry_path: str) -> None:
+        self._global = global_store
+        self._open_partition = open_partition   # partition name → store
+        self._registry_path = registry_path
+        self._lock = threading.RLock()
+        self._partitions: Dict[str, Any] = {}   # doctor_id → open store
+        self._names: Dict[str, str] = {}        # doctor_id → partition name
+
+        if os.path.exists(registry_path):
+            with open(registry_path) as fh:
+                self._names = json.load(fh)["partitions"]
+        else:
+            self._build()
+
+    @property
+    def name(self) -> str:
+        return f"{self._global.name}+doctor-partitions"
+
+    @staticmethod
+    def partition_name(doctor_id: str) -> str:
+        # Collection / directory-safe and stable for any doctor id
+        return "doctor-" + hashlib.sha1(doctor_id.encode("utf-8")).hexdigest()[:20]
+
+    def _save_registry(self) -> None:
+        tmp = f"{self._registry_path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"key": "doctor_id", "partitions": self._names}, fh)
+        os.replace(tmp, self._registry_path)
+
+    def _partition(self, doctor_id: str, create: bool = True):
+        with self._lock:
+            store = self._partitions.get(doctor_id)
+            if store is not None:
+                return store
+            if doctor_id not in self._names:
+                if not create:
+                    return None
+                self._names[doctor_id] = self.partition_name(doctor_id)
+                self._save_registry()
+            store = self._partitions[doctor_id] = self._open_partition(self._names[doctor_id])
+            return store
+
+    def _build(self) -> None:
+        total = self._global.count()
+        if total:
+            logger.info("Building doctor partitions from %d stored vectors …", total)
+        for ids, documents, metadatas in self._global.scan():
+            embeddings = self._global.get(ids, include=["embeddings"])["embeddings"]
+            self._upsert_partitions(ids, embeddings, documents, metadatas)
+        self._save_registry()
+
+    # ---- store interface ----------------------------------------------------
+
+    def count(self) -> int:
+        return self._global.count()
+
+    def _upsert_partitions(self, ids, embeddings, documents, metadatas) -> None:
+        groups: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            groups.setdefault((meta or {}).get("doctor_id") or "", []).append(i)
+        for doctor_id, idx in groups.items():
+            if not doctor_id:
+                continue   # unassigned encounters only live in the global store
+            self._partition(doctor_id).upsert(
+                [ids[i] for i in idx],
+                [embeddings[i] for i in idx],
+                [documents[i] for i in idx],
+                [metadatas[i] for i in idx],
+            )
+
+    def upsert(self, ids, embeddings, documents, metadatas) -> None:
+        ids, metadatas = list(ids), list(metadatas)
+        # An encounter moved to another doctor leaves its old partition
+        previous = self._global.get(ids, include=["metadatas"])
+        new_doctor = {eid: (m or {}).get("doctor_id") or "" for eid, m in zip(ids, metadatas)}
+        for eid, meta in zip(previous["ids"], previous["metadatas"]):
+            old = (meta or {}).get("doctor_id") or ""
+            if old and old != new_doctor[eid]:
+                self._partition(old).delete([eid])
+
+        self._global.upsert(ids, embeddings, documents, metadatas)
+        self._upsert_partitions(ids, embeddings, list(documents), metadatas)
+
+    def get(self, ids: Sequence[str], include: Sequence[str]) -> Dict[str, Any]:
+        return self._global.get(ids, include)
+
+    def scan(self, batch_size: int = 1000):
+        return self._global.scan(batch_size)
+
+    def query(self, embedding, n_results: int, doctor_id: Optional[str] = None) -> Dict[str, Any]:
+        if not doctor_id:
+            return self._global.query(embedding, n_results)
+        partition = self._partition(doctor_id, create=False)
+        if partition is None or partition.count() == 0:
+            return {"ids": [], "scores": [], "documents": [], "metadatas": []}
+        return partition.query(embedding, n_results)
+
+    def query_batch(self, embeddings, n_results: int, doctor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        if not doctor_id:
+            return self._global.query_batch(embeddings, n_results)
+        partition = self._partition(doctor_id, create=False)
+        if partition is None or partition.count() == 0:
+            return [{"ids": [], "scores": [], "documents": [], "metadatas": []} for _ in embeddings]
+        return partition.query_batch(embeddings, n_results)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        existing = self._global.get(list(ids), include=["metadatas"])
+        by_doctor: Dict[str, List[str]] = {}
+        for eid, meta in zip(existing["ids"], existing["metadatas"]):
+            doctor_id = (meta or {}).get("doctor_id") or ""
+            if doctor_id:
+                by_doctor.setdefault(doctor_id, []).append(eid)
+        for doctor_id, doctor_ids in by_doctor.items():
+            self._partition(doctor_id).delete(doctor_ids)
+        self._global.delete(ids)
+
+    def reset(self) -> None:
+        with self._lock:
+            for doctor_id in list(self._names):
+                self._partition(doctor_id).drop()
+            self._partitions.clear()
+            self._names.clear()
+            self._save_registry()
+            self._global.reset()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = [store.count() for store in self._partitions.values()]
+            return {
+                **self._global.stats,
+                "store": self.name,
+                "partitions": len(self._names),
+                "partitions_open": len(self._partitions),
+                "largest_open_partition": max(sizes, default=0),
+            }
+
+
+# ---------------------------------------------------------------------------
+# Factory
+# ---------------------------------------------------------------------------
+
+def open_store(
+    persist_dir: str,
+    collection: str,
+    dim: int,
+    kind: Optional[str] = None,
+    partitions: Optional[str] = None,
+):
+    """
+    Open the vector store named by *kind* / ``VECTOR_STORE``, split into
+    per-doctor partitions when *partitions* / ``VECTOR_PARTITIONS`` is ``doctor``.
+    """
+    kind = (kind or VECTOR_STORE).lower()
+    partitions = (partitions or VECTOR_PARTITIONS).lower()
+    if partitions not in PARTITIONS:
+        raise ValueError(f"Unknown VECTOR_PARTITIONS '{partitions}' (expected one of {PARTITIONS})")
+
+    numpy_dir = NUMPY_STORE_DIR or os.path.join(persist_dir, "numpy_store")
+
+    def open_partition(name: str):
+        if kind == "chroma":
+            return ChromaStore(persist_dir, f"{collection}-{name}", search_ef=PARTITION_SEARCH_EF)
+        # Beside, not inside, the global directory: its reset() removes the tree
+        return NumpyStore(os.path.join(f"{numpy_dir}_partitions", name), dim)
+
+    if kind == "chroma":
+        store = ChromaStore(persist_dir, collection)
+    elif kind == "numpy":
+        store = NumpyStore(numpy_dir, dim)
+    else:
+        raise ValueError(f"Unknown VECTOR_STORE '{kind}' (expected one of {STORES})")
+
+    if partitions == "doctor":
+        store = PartitionedStore(
+            store, open_partition, os.path.join(persist_dir, f"{collection}_partitions.json")
+        )
+    return store
@@ -0,0 +1,218 @@
+"""
+Startup Warmup
+==============
+
+Pays a fresh worker's first-request costs before the load balancer sends
+it traffic.  Without it, the first ``/case-similarity/similar`` after a
+deploy loads the BERT model and opens the vector store inside the request,
+and the first Supabase / Groq calls pay for DNS and TLS.
+
+The app's lifespan (``main.py``) starts :func:`run` in the background, so
+the worker answers ``/health/live`` at once, while ``/health/ready``
+(``apis/health.py``) answers 503 until the local tasks are done.
+
+Tasks (``WARMUP_TASKS``), run concurrently:
+  vector     load VectorService, one model forward pass and one store query
+  supabase   one small query: DNS, TLS and a pooled HTTP connection
+  llm        list the models of the LLM endpoint: same, for Groq
+  pdf        render one medicine PDF (imports reportlab, loads its fonts)
+
+Only the local tasks (``GATING``: vector, pdf) hold back readiness.  The
+external ones are warmed and reported in the same body, but an outage of
+Supabase or Groq is not this worker's fault, and taking every worker out
+of the load balancer for it would turn it into a full outage.
+
+Each task is ``pending`` → ``warming`` → ``ready``.  A task whose
+dependency is not configured (no key) is ``skipped``.  A task that fails is
+retried every ``WARMUP_RETRY_S``.  An attempt that runs past
+``WARMUP_TIMEOUT_S`` is reported as failed, but its thread cannot be
+stopped: the task waits for it to end before another attempt starts, so
+attempts never overlap.
+
+Configuration (env):
+  WARMUP_TASKS       comma-separated tasks (default vector,supabase,llm,pdf;
+                     empty: none, ready at once)
+  WARMUP_RETRY_S     delay before retrying a failed task   (default 10)
+  WARMUP_TIMEOUT_S   time limit of one attempt             (default 120)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+TASKS = ("vector", "supabase", "llm", "pdf")
+
+WARMUP_TASKS = [
+    t.strip().lower() for t in os.getenv("WARMUP_TASKS", ",".join(TASKS)).split(",") if t.strip()
+]
+
+WARMUP_RETRY_S = float(os.getenv("WARMUP_RETRY_S", "10"))
+
+WARMUP_TIMEOUT_S = float(os.getenv("WARMUP_TIMEOUT_S", "120"))
+
+# Tasks that must be done before the worker is ready (local work only)
+GATING = frozenset({"vector", "pdf"})
+
+# States that count as warm for readiness
+DONE = ("ready", "skipped")
+
+
+class NotConfigured(Exception):
+    """The dependency is not configured here; the task is skipped."""
+
+
+# ---------------------------------------------------------------------------
+# Tasks (blocking; run on worker threads)
+# ---------------------------------------------------------------------------
+
+def _warm_vector() -> Dict[str, Any]:
+    from vector_service import VectorService
+
+    return VectorService.get_instance().warm_up()
+
+
+def _warm_supabase() -> Dict[str, Any]:
+    if not settings.SUPABASE_URL or not settings.SUPABASE_SECRET_KEY:
+        raise NotConfigured("SUPABASE_URL / SUPABASE_SECRET_KEY not set")
+    from db import get_supabase
+
+    get_supabase().table("encounters").select("id").limit(1).execute()
+    return {}
+
+
+def _warm_llm() -> Dict[str, Any]:
+    from llm_client import llm
+
+    if not llm.available:
+        raise NotConfigured("GROQ_API_KEY not set")
+    llm.warm_up()
+    return {"base_url": llm.base_url}
+
+
+def _warm_pdf() -> Dict[str, Any]:
+    from medicine_pdf_generator import generate_medicine_pdf_from_string
+
+    pdf = generate_medicine_pdf_from_string(
+        "Paracetamol\nDosage: 500 mg\nFrequency: Every 6 hours as needed", "Warm-up", "Warm-up"
+    )
+    return {"pdf_bytes": len(pdf)}
+
+
+_TASK_FUNCTIONS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "vector": _warm_vector,
+    "supabase": _warm_supabase,
+    "llm": _warm_llm,
+    "pdf": _warm_pdf,
+}
+
+
+# ---------------------------------------------------------------------------
+# State
+# ---------------------------------------------------------------------------
+
+_started_at = time.monotonic()   # reset by run()
+
+_state: Dict[str, Dict[str, Any]] = {
+    name: {
+        "state": "pending", "gates_readiness": name in GATING,
+        "attempts": 0, "elapsed_ms": None, "error": None, "detail": None,
+    }
+    for name in WARMUP_TASKS
+    if name in _TASK_FUNCTIONS
+}
+
+_ready_after_s: Optional[float] = None
+
+
+def is_ready() -> bool:
+    return all(task["state"] in DONE for name, task in _state.items() if name in GATING)
+
+
+def status() -> Dict[str, Any]:
+    """Readiness plus the state of every warmup task (for ``/health/ready``)."""
+    return {
+        "ready": is_ready(),
+        "uptime_s": round(time.monotonic() - _started_at, 2),
+        "ready_after_s": _ready_after_s,
+        "dependencies": {name: dict(task) for name, task in _state.items()},
+    }
+
+
+def _mark_ready() -> None:
+    global _ready_after_s
+    if _ready_after_s is None and is_ready():
+        _ready_after_s = round(time.monotonic() - _started_at, 2)
+        logger.info("Worker ready %.2f s after start", _ready_after_s)
+
+
+async def _warm(name: str) -> None:
+    task = _state[name]
+    attempt: Optional[asyncio.Future] = None
+    while True:
+        if attempt is None:
+            task["state"] = "warming"
+            task["attempts"] += 1
+            started = time.perf_counter()
+            attempt = asyncio.ensure_future(asyncio.to_thread(_TASK_FUNCTIONS[name]))
+        done, _ = await asyncio.wait({attempt}, timeout=WARMUP_TIMEOUT_S)
+        if not done:
+            # The thread cannot be cancelled: report it, and keep waiting for it
+            task.update(
+                state="failed",
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+                error=f"TimeoutError: attempt still running after {WARMUP_TIMEOUT_S:.0f} s",
+            )
+            logger.warning("Warmup %s attempt %d still running after %.0f s",
+                           name, task["attempts"], WARMUP_TIMEOUT_S)
+            continue
+        try:
+            detail = attempt.result()
+        except NotConfigured as e:
+            task.update(state="skipped", error=str(e))
+            logger.info("Warmup %s skipped: %s", name, e)
+            _mark_ready()
+            return
+        except Exception as e:   # retried below
+            task.update(
+                state="failed",
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+                error=f"{type(e).__name__}: {e}",
+            )
+            logger.warning("Warmup %s failed (attempt %d): %s; retrying in %.0f s",
+                           name, task["attempts"], task["error"], WARMUP_RETRY_S)
+            attempt = None
+            await asyncio.sleep(WARMUP_RETRY_S)
+            continue
+        task.update(
+            state="ready",
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            error=None,
+            detail=detail or None,
+        )
+        logger.info("Warmup %s ready in %.0f ms", name, task["elapsed_ms"])
+        _mark_ready()
+        return
+
+
+async def run() -> None:
+    """Run every configured task until each one is ready or skipped."""
+    global _started_at
+    _started_at = time.monotonic()
+    unknown = [t for t in WARMUP_TASKS if t not in _TASK_FUNCTIONS]
+    if unknown:
+        logger.warning("Unknown WARMUP_TASKS %s (expected some of %s)", unknown, TASKS)
+    _mark_ready()   # no local tasks configured
+    await asyncio.gather(*(_warm(name) for name in _state))
+    logger.info("Warmup complete %.2f s after start", time.monotonic() - _started_at)
@@ -210,6 +210,44 @@ class ApiService {
     );
   }
 
+  // Streams generated education text (SSE) as it is written by the model.
+  // Yields each text delta; the backend saves the content when the stream
+  // ends (or saves it as partial if the stream is interrupted).
+  Stream<String> streamPatientEducation(String encounterId) async* {
+    final url = Uri.parse(
+      '${ApiConfig.baseUrl}/patient-education/generate/$encounterId/stream',
+    );
+    final request = http.Request('POST', url)
+      ..headers['Accept'] = 'text/event-stream';
+    final client = http.Client();
+
+    try {
+      final response = await client.send(request);
+      if (response.statusCode != 200) {
+        // Throws an ApiException with the backend's error detail
+        _handleResponse(await http.Response.fromStream(response));
+      }
+
+      String event = 'message';
+      await for (final line in response.stream
+          .transform(utf8.decoder)
+          .transform(const LineSplitter())) {
+        if (line.startsWith('event:')) {
+          event = line.substring(6).trim();
+        } else if (line.startsWith('data:')) {
+          final data = jsonDecode(line.substring(5).trim());
+          if (event == 'token') {
+            yield data['delta'] as String;
+          } else if (event == 'error') {
+            throw ApiException(data['detail']?.toString() ?? 'Stream failed');
+          }
+        }
+      }
+    } finally {
+      client.close();
+    }
+  }
+
   // Medicine/Medication endpoints
   Future<dynamic> generateMedicinePdf({
     required String encounterId,